@@ -0,0 +1,319 @@
+"""
+HTTP API плана на том же aiohttp-сервере, что и /health.
+
+    GET  /verse?ref=Ин 3:16[&ref=...]   — текст стиха (несколько ref — пакетом)
+    POST /verses  {"refs": [...]}        — пакетный поиск
+    GET  /day/{YYYY-MM-DD}               — сообщение дня
+    GET  /week/{YYYY-MM-DD}              — 7 сообщений недели с этой датой начала
+    GET  /search?q=так возлюбил&limit=20 — полнотекстовый поиск по стихам
+
+GET  /translations                   — установленные переводы
+
+Стихи, дни и недели принимают ?translation=<код> (по умолчанию — основной
+перевод). Ответы — JSON, либо HTML-страница при ?format=html. Готовые тела ответов
+лежат в LRU-кэше с TTL, так что горячие запросы не трогают ни базу, ни
+сериализацию; промахи читают базу через пул потоков источника текстов.
+"""
+import functools
+import html
+import json
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from aiohttp import web
+
+# Максимум ссылок в одном пакетном запросе
+MAX_BATCH = 200
+
+# Максимум результатов поиска в одном ответе
+MAX_SEARCH_LIMIT = 100
+
+
+class APIError(Exception):
+    """Ошибка запроса: обработчики API отвечают на неё JSON {"error": message}"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_errors(handler):
+    """Обработчик, отвечающий на APIError через _error()"""
+    @functools.wraps(handler)
+    async def wrapper(self, request):
+        try:
+            return await handler(self, request)
+        except APIError as e:
+            return _error(e.status, e.message)
+    return wrapper
+
+
+class TTLCache:
+    """LRU-кэш с ограничением размера и временем жизни записей"""
+
+    def __init__(self, maxsize=4096, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+class PlanAPI:
+    """
+    Обработчики API. Зависимости передаются корутинами, чтобы модуль
+    не импортировал main:
+        lookup_verses(refs, translation) -> {ref: текст или None}
+        get_schedule()      -> ScheduleIndex или None (без обращения к сети)
+        render_week(row, translation)    -> список из 7 сообщений
+        search_verses(query, limit) -> список SearchHit или None (индекс не загружен)
+    Обычная функция list_translations() возвращает описания переводов
+    (code, name, language); translation=None — перевод по умолчанию.
+    Кэшированные verses() и week() используют и команды бота (webhook.py).
+    """
+
+    def __init__(self, lookup_verses, get_schedule, render_week, search_verses=None, list_translations=None,
+                 cache_size=4096, ttl=300.0):
+        self.lookup_verses = lookup_verses
+        self.get_schedule = get_schedule
+        self.render_week = render_week
+        self.search_verses = search_verses
+        self.list_translations = list_translations or (lambda: [])
+        self.cache = TTLCache(cache_size, ttl)
+
+    def register(self, app):
+        app.router.add_get('/verse', self.handle_verse)
+        app.router.add_post('/verses', self.handle_verses)
+        app.router.add_get('/day/{date}', self.handle_day)
+        app.router.add_get('/week/{date}', self.handle_week)
+        app.router.add_get('/search', self.handle_search)
+        app.router.add_get('/translations', self.handle_translations)
+
+    # -------------------------------------------------------------------------
+    # Стихи
+    # -------------------------------------------------------------------------
+
+    def _translation(self, request):
+        """Код перевода из ?translation= (None — по умолчанию); 400 для неизвестного"""
+        code = request.query.get('translation', '').strip() or None
+        if code is not None and code not in {translation.code for translation in self.list_translations()}:
+            raise APIError(400, f"Неизвестный перевод: {code}")
+        return code
+
+    async def verses(self, refs, translation=None):
+        """{ref: текст или None}: из кэша, остальное — одним пакетом"""
+        result = {}
+        missing = []
+        for ref in refs:
+            cached = self.cache.get(('verse', translation, ref))
+            if cached is None:
+                missing.append(ref)
+            else:
+                result[ref] = cached[0]
+        if missing:
+            found = await self.lookup_verses(missing, translation)
+            for ref in missing:
+                result[ref] = found.get(ref)
+                self.cache.put(('verse', translation, ref), (result[ref],))
+        return result
+
+    @_json_errors
+    async def handle_verse(self, request):
+        refs = [ref.strip() for ref in request.query.getall('ref', []) if ref.strip()]
+        if not refs:
+            return _error(400, "Укажите параметр ref, например /verse?ref=Ин 3:16")
+        translation = self._translation(request)
+        if len(refs) == 1 and request.query.get('format') != 'html':
+            key = ('verse_body', translation, refs[0])
+            body = self.cache.get(key)
+            if body is None:
+                text = (await self.verses(refs, translation))[refs[0]]
+                body = _dumps({'ref': refs[0], 'text': text, 'found': text is not None})
+                self.cache.put(key, body)
+            return web.Response(body=body, content_type='application/json')
+        return await self._verses_response(request, refs)
+
+    @_json_errors
+    async def handle_verses(self, request):
+        try:
+            refs = (await request.json())['refs']
+        except (ValueError, KeyError, TypeError):
+            refs = None
+        if not isinstance(refs, list) or not all(isinstance(ref, str) for ref in refs):
+            return _error(400, 'Ожидается JSON вида {"refs": ["Ин 3:16", ...]}')
+        refs = [ref.strip() for ref in refs]
+        return await self._verses_response(request, refs)
+
+    async def _verses_response(self, request, refs):
+        if len(refs) > MAX_BATCH:
+            return _error(400, f"Не больше {MAX_BATCH} ссылок за запрос")
+        verses = await self.verses(refs, self._translation(request))
+        if request.query.get('format') == 'html':
+            blocks = [
+                f"<p><b>{html.escape(ref)}</b><br>{html.escape(text) if text else '<i>не найдено</i>'}</p>"
+                for ref, text in ((ref, verses[ref]) for ref in refs)
+            ]
+            return _html_page("Стихи", ''.join(blocks))
+        return web.json_response(
+            {'verses': [{'ref': ref, 'text': verses[ref], 'found': verses[ref] is not None} for ref in refs]},
+            dumps=_dumps_str,
+        )
+
+    async def handle_translations(self, request):
+        return web.json_response(
+            {'translations': [
+                {'code': translation.code, 'name': translation.name, 'language': translation.language}
+                for translation in self.list_translations()
+            ]},
+            dumps=_dumps_str,
+        )
+
+    # -------------------------------------------------------------------------
+    # Поиск
+    # -------------------------------------------------------------------------
+
+    async def handle_search(self, request):
+        query = request.query.get('q', '').strip()
+        if not query:
+            return _error(400, "Укажите параметр q, например /search?q=так возлюбил")
+        try:
+            limit = min(max(int(request.query.get('limit', 20)), 1), MAX_SEARCH_LIMIT)
+        except ValueError:
+            return _error(400, "limit должен быть числом")
+        as_html = request.query.get('format') == 'html'
+
+        key = ('search', query, limit, as_html)
+        response = self.cache.get(key)
+        if response is None:
+            try:
+                hits = await self.search_verses(query, limit) if self.search_verses else None
+            except ValueError as e:
+                return _error(400, str(e))
+            if hits is None:
+                return _error(503, "Поисковый индекс ещё не загружен")
+            if as_html:
+                blocks = ''.join(f"<p><b>{html.escape(hit.ref)}</b><br>{html.escape(hit.text)}</p>" for hit in hits)
+                response = (f"Поиск: {query}", blocks or '<i>ничего не найдено</i>')
+            else:
+                response = _dumps({
+                    'query': query,
+                    'results': [{'ref': hit.ref, 'text': hit.text, 'score': round(hit.score, 4)} for hit in hits],
+                })
+            self.cache.put(key, response)
+        if as_html:
+            return _html_page(*response)
+        return web.Response(body=response, content_type='application/json')
+
+    # -------------------------------------------------------------------------
+    # Дни и недели
+    # -------------------------------------------------------------------------
+
+    async def week(self, day, translation=None):
+        """
+        (дата начала недели, сообщения) для недели, содержащей day, или None.
+        Без расписания или при ошибке рендера — APIError
+        """
+        schedule = self.get_schedule()
+        if schedule is None:
+            raise APIError(503, "Расписание ещё не загружено")
+        week = schedule.week_of(day)
+        if week is None:
+            return None
+        start, row = week
+        key = ('week', start, schedule.content_hash, translation)
+        messages = self.cache.get(key)
+        if messages is None:
+            messages = await self.render_week(row, translation)
+            if not messages:
+                raise APIError(500, "Не удалось сгенерировать сообщения недели")
+            self.cache.put(key, messages)
+        return start, messages
+
+    @_json_errors
+    async def handle_day(self, request):
+        day = _parse_date(request.match_info['date'])
+        week = await self.week(day, self._translation(request))
+        if week is None:
+            return _error(404, f"Нет недели, содержащей {day.isoformat()}")
+        start, messages = week
+        message = messages[(day - start).days]
+        if request.query.get('format') == 'html':
+            return _html_page(day.isoformat(), _message_html(message))
+        return web.json_response(
+            {'date': day.isoformat(), 'week_start': start.isoformat(), 'message': message},
+            dumps=_dumps_str,
+        )
+
+    @_json_errors
+    async def handle_week(self, request):
+        day = _parse_date(request.match_info['date'])
+        week = await self.week(day, self._translation(request))
+        if week is None or week[0] != day:
+            return _error(404, f"Нет недели, начинающейся {day.isoformat()}")
+        start, messages = week
+        if request.query.get('format') == 'html':
+            return _html_page(f"Неделя {start.isoformat()}", '<hr>'.join(_message_html(m) for m in messages))
+        return web.json_response(
+            {
+                'week_start': start.isoformat(),
+                'days': [
+                    {'date': (start + timedelta(days=i)).isoformat(), 'message': message}
+                    for i, message in enumerate(messages)
+                ],
+            },
+            dumps=_dumps_str,
+        )
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise APIError(400, f"Неверная дата '{value}', ожидается YYYY-MM-DD")
+
+
+def _dumps_str(data):
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _dumps(data):
+    return _dumps_str(data).encode('utf-8')
+
+
+def _error(status, message):
+    return web.json_response({'error': message}, status=status, dumps=_dumps_str)
+
+
+def _message_html(message):
+    """Сообщение в HTML-разметке Telegram уже экранировано — сохраняем переводы строк"""
+    return f'<div style="white-space: pre-wrap">{message}</div>'
+
+
+def _html_page(title, body):
+    return web.Response(
+        text=f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+             f'</head><body>{body}</body></html>',
+        content_type='text/html',
+    )
@@ -0,0 +1,124 @@
+"""
+Нагрузочный тест HTTP API (/verse, /verses, /day).
+
+Сервер запускается отдельным процессом на одном ядре; клиент держит
+--concurrency одновременных запросов в течение --duration секунд.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_api.py --db synodal.sqlite --csv plan.csv
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from processes import free_port, wait_for_port  # noqa: E402
+
+
+def serve(args):
+    """Режим сервера: main.create_app() с заданными базой и планом"""
+    from aiohttp import web
+
+    import main
+    from render_cache import RenderCache
+    from schedule_index import ScheduleIndex
+    from text_index import TextIndex
+    from verse_store import VerseStore
+
+    main.VERSE_STORE = VerseStore(args.db)
+    main.VERSE_SOURCE = TextIndex.from_db(args.db) if args.index else main.VERSE_STORE
+    with open(args.csv, encoding='utf-8', newline='') as f:
+        main._SCHEDULE = ScheduleIndex.from_lines(line.rstrip('\r\n') for line in f)
+    main.RENDER_CACHE = RenderCache(tempfile.mkdtemp(), salt='bench')
+    web.run_app(main.create_app(), host='127.0.0.1', port=args.port, access_log=None, print=None)
+
+
+def make_urls(args, count=5000, seed=11):
+    from schedule_index import ScheduleIndex
+
+    with open(args.csv, encoding='utf-8', newline='') as f:
+        schedule = ScheduleIndex.from_lines(line.rstrip('\r\n') for line in f)
+    rng = random.Random(seed)
+    books = ['Быт', 'Исх', 'Пс', 'Ин', 'Мф', 'Рим', 'Откр']
+    refs = [f"{rng.choice(books)} {rng.randint(1, 3)}:{rng.randint(1, 9)}" for _ in range(500)]
+    days = [date.fromordinal(start) + timedelta(days=rng.randint(0, 6)) for start in schedule.starts]
+    urls = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            urls.append(('GET', f"/verse?ref={rng.choice(refs)}", None))
+        elif kind < 0.9:
+            urls.append(('GET', f"/day/{rng.choice(days).isoformat()}", None))
+        else:
+            urls.append(('POST', "/verses", {'refs': rng.sample(refs, 20)}))
+    return urls
+
+
+async def load(args, base_url, urls):
+    import aiohttp
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(base_url, connector=connector) as session:
+        async def worker(offset):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                method, url, payload = urls[i % len(urls)]
+                i += args.concurrency
+                started = time.perf_counter()
+                async with session.request(method, url, json=payload) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pick = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000  # noqa: E731
+    print(f"📊 {len(latencies)} запросов за {elapsed:.1f} с: {len(latencies) / elapsed:.0f} req/s, ошибок {errors}; "
+          f"p50 {pick(50):.1f} мс, p95 {pick(95):.1f} мс, p99 {pick(99):.1f} мс", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default='synodal.sqlite')
+    parser.add_argument('--csv', required=True, help="CSV плана (формат выгрузки Google Sheets)")
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--index', action='store_true', help="читать стихи из TextIndex вместо SQLite")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    port = free_port()
+    command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port),
+               '--db', args.db, '--csv', args.csv] + (['--index'] if args.index else [])
+    server = subprocess.Popen(command)
+    try:
+        wait_for_port(port, server)
+        asyncio.run(load(args, f"http://127.0.0.1:{port}", make_urls(args)))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
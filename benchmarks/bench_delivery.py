@@ -0,0 +1,64 @@
+"""
+Нагрузочный тест рассылки против локальной имитации Telegram
+(имитация запускается отдельным процессом, чтобы не делить с движком CPU).
+
+Запуск из корня репозитория:
+    python benchmarks/bench_delivery.py --chats 2000 --rate 500 --server-rate 400
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot  # noqa: E402
+from telegram.request import HTTPXRequest  # noqa: E402
+
+from delivery import DeliveryEngine  # noqa: E402
+from processes import start_process  # noqa: E402
+
+
+def start_fake_server(args):
+    options = ['--latency', str(args.latency / 1000), '--per-chat-interval', '1']
+    if args.server_rate:
+        options += ['--global-rate', str(args.server_rate)]
+    process, port = start_process('fake_telegram.py', *options)
+    return process, f"http://127.0.0.1:{port}/bot"
+
+
+async def run(args):
+    process, base_url = start_fake_server(args)
+    bot = Bot(token='123:FAKE', base_url=base_url, request=HTTPXRequest(connection_pool_size=args.workers))
+
+    async def send(chat_id, text):
+        await bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+
+    engine = DeliveryEngine(send, workers=args.workers, global_rate=args.rate, base_backoff=0.1)
+    items = [(str(100000 + i), f"Сообщение <b>{i}</b>") for i in range(args.chats)]
+    try:
+        report = await engine.deliver(items)
+        stats = await bot.do_api_request('getStats')
+    finally:
+        await bot.shutdown()
+        process.terminate()
+
+    print(f"📊 {args.chats} чатов, {args.workers} воркеров, лимит {args.rate}/с, "
+          f"сервер {args.server_rate or '∞'}/с, задержка {args.latency} мс", flush=True)
+    print(report.summary(), flush=True)
+    print(f"📨 Принято сервером: {stats['accepted']}, отклонено 429: {stats['rejected']}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chats', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--rate', type=float, default=500.0, help="лимит движка, сообщений/с")
+    parser.add_argument('--server-rate', type=int, default=None, help="лимит имитации, сообщений/с")
+    parser.add_argument('--latency', type=float, default=20.0, help="задержка ответа имитации, мс")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
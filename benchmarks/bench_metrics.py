@@ -0,0 +1,47 @@
+"""
+Накладные расходы инструментации: один и тот же вызов без обёртки
+и под @timed (гистограмма + счётчик неудач).
+
+Запуск из корня репозитория:
+    python benchmarks/bench_metrics.py [--count 200000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bible_ref import BOOK_ALIASES, RefParser  # noqa: E402
+from metrics import Registry, timed  # noqa: E402
+
+
+def measure(func, refs):
+    started = time.perf_counter()
+    for ref in refs:
+        func(ref)
+    return (time.perf_counter() - started) / len(refs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=200000)
+    args = parser.parse_args()
+
+    ref_parser = RefParser(BOOK_ALIASES)
+    refs = [f"Ин {i % 21 + 1}:{i % 25 + 1}" for i in range(args.count)]
+    plain = ref_parser.parse
+    wrapped = timed('bench_parse', "Разбор ссылки", failed=lambda parsed: parsed is None,
+                    registry=Registry())(ref_parser.parse)
+    noop = timed('bench_noop', "Пустая функция", registry=Registry())(lambda ref: ref)
+
+    measure(plain, refs[:1000])
+    base = measure(plain, refs)
+    instrumented = measure(wrapped, refs)
+    print(f"⏱️ parse без метрик  {base * 1e6:7.2f} мкс/вызов", flush=True)
+    print(f"⏱️ parse с @timed    {instrumented * 1e6:7.2f} мкс/вызов", flush=True)
+    print(f"⏱️ @timed на пустой функции {measure(noop, refs) * 1e6:7.2f} мкс/вызов", flush=True)
+
+
+if __name__ == "__main__":
+    main()
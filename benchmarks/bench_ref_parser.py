@@ -0,0 +1,108 @@
+"""
+Бенчмарк парсера ссылок: RefParser против прежнего parse_bible_ref
+(точный поиск + линейный перебор BOOK_NUMBERS по подстроке).
+
+Запуск из корня репозитория:
+    python benchmarks/bench_ref_parser.py --count 300000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bible_ref import BOOK_NUMBERS, RefParser  # noqa: E402
+
+
+def legacy_parse_bible_ref(ref):
+    """Копия прежней реализации (без вывода предупреждений)"""
+    try:
+        parts = ref.strip().split()
+        if parts[0].isdigit():
+            book_name = f"{parts[0]} {parts[1]}".lower()
+            chapter_verse = parts[2]
+        else:
+            book_name = parts[0].lower()
+            chapter_verse = parts[1]
+        book_number = BOOK_NUMBERS.get(book_name)
+        if not book_number:
+            for key, value in BOOK_NUMBERS.items():
+                if book_name in key or key in book_name:
+                    book_number = value
+                    break
+        if not book_number:
+            return None
+        chapter_verse_parts = chapter_verse.split(':')
+        chapter = int(chapter_verse_parts[0])
+        if '-' in chapter_verse_parts[1]:
+            verse_parts = chapter_verse_parts[1].split('-')
+            verse_start, verse_end = int(verse_parts[0]), int(verse_parts[1])
+        else:
+            verse_start = verse_end = int(chapter_verse_parts[1])
+        return (book_number, chapter, verse_start, verse_end)
+    except Exception:
+        return None
+
+
+def make_corpus(count, distinct=None, seed=7):
+    """
+    Корпус ссылок в формах, понятных обоим парсерам: однословные названия
+    (полные и обрезанные до префикса — путь линейного перебора) и «Книга C:V[-V]».
+    distinct — размер пула различных ссылок (как в многолетнем плане).
+    """
+    rng = random.Random(seed)
+    if distinct:
+        pool = make_corpus(distinct, seed=seed)
+        return [rng.choice(pool) for _ in range(count)]
+    names = [name for name in BOOK_NUMBERS if ' ' not in name or name[0].isdigit()]
+    corpus = []
+    for _ in range(count):
+        name = rng.choice(names).title()
+        if not name[0].isdigit() and rng.random() < 0.3:
+            name = name[:max(4, len(name) - 2)]
+        chapter, verse = rng.randint(1, 50), rng.randint(1, 30)
+        if rng.random() < 0.5:
+            corpus.append(f"{name} {chapter}:{verse}")
+        else:
+            corpus.append(f"{name} {chapter}:{verse}-{verse + rng.randint(1, 5)}")
+    return corpus
+
+
+def timed(label, func, count):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed * 1000:9.1f} мс  {count / elapsed:12.0f} ссылок/с", flush=True)
+    return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=300000)
+    parser.add_argument('--distinct', type=int, default=5000, help="различных ссылок в корпусе (0 — все разные)")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.count, args.distinct)
+    print(f"📊 Корпус: {len(corpus)} ссылок, различных {len(set(corpus))}", flush=True)
+
+    started = time.perf_counter()
+    ref_parser = RefParser()
+    print(f"{'RefParser() — сборка дерева':<28} {(time.perf_counter() - started) * 1000:9.1f} мс", flush=True)
+
+    legacy_time, legacy = timed("legacy parse_bible_ref", lambda: [legacy_parse_bible_ref(r) for r in corpus], len(corpus))
+    cold_parser = RefParser(cache_size=0)
+    timed("RefParser.parse (без кэша)", lambda: [cold_parser.parse(r) for r in corpus], len(corpus))
+    new_time, parsed = timed("RefParser.parse", lambda: [ref_parser.parse(r) for r in corpus], len(corpus))
+
+    # Расхождения — это случаи, где перебор по подстроке зависел от порядка словаря
+    mismatches = sum(
+        1 for old, new in zip(legacy, parsed)
+        if old is None or len(new.spans) != 1 or old != tuple(new.spans[0])
+    )
+    print(f"⚡ Ускорение x{legacy_time / new_time:.1f}; расхождений с legacy: {mismatches}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
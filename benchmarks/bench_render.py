@@ -0,0 +1,124 @@
+"""
+Пропускная способность сборки сообщений при росте числа треков и недель.
+
+Для каждой пары (треков, недель) генерируется план с треками 0_3, 3_15 и
+дополнительными track3, track4, ... (benchmarks/synthetic.py) и замеряются:
+
+    assembly — MessageRenderer.render_week с заранее полученными текстами
+               (только шаблоны, экранирование и join)
+    full     — main.generate_messages_from_data: разбор ссылок, чтение
+               стихов из SQLite и сборка
+    split    — split_message для всех сообщений и для сообщений длиннее
+               лимита Telegram (неделя, склеенная в одно сообщение)
+
+Каждый замер прогоняется один раз вхолостую, затем --repeat раз; в отчёт
+идёт медиана.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_render.py --tracks 1,2,4,8 --weeks 52,520
+"""
+import argparse
+import contextlib
+import csv
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic import PLAN_TRACKS, make_db, make_plan_csv  # noqa: E402
+
+
+def track_names(count):
+    """count треков: сначала встроенные, затем track3, track4, ..."""
+    extra = [f"track{number}" for number in range(len(PLAN_TRACKS) + 1, count + 1)]
+    return (list(PLAN_TRACKS) + extra)[:count]
+
+
+def measure(function, repeat):
+    """Медиана времени function() в секундах после одного прогона вхолостую"""
+    function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tracks', default='1,2,4,8', help="числа треков через запятую")
+    parser.add_argument('--weeks', default='52,520', help="числа недель через запятую")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'synodal.sqlite')
+        sizes = make_db(db_path, chapters=30, verses=30)
+        # Конфигурация main читается при импорте
+        os.environ.update({
+            'DB_PATH': db_path,
+            'CACHE_DIR': os.path.join(workdir, 'cache'),
+            'TRANSLATIONS_FILE': '',
+            'TEMPLATES_FILE': '',
+            'VERSE_SEARCH_PATH': '',
+            'VERSE_INDEX_MODE': '',
+            'JSON_LOGS': '0',
+        })
+        with contextlib.redirect_stdout(io.StringIO()):
+            import main as bot
+        from templates import split_message
+
+        print(f"{'треков':>6} {'недель':>6} {'assembly, сообщ./с':>19} {'full, сообщ./с':>15} "
+              f"{'split, мкс/сообщ.':>18} {'split длинных, мс':>18}", flush=True)
+        for weeks in [int(value) for value in args.weeks.split(',')]:
+            for tracks in [int(value) for value in args.tracks.split(',')]:
+                csv_path = os.path.join(workdir, f"plan-{tracks}-{weeks}.csv")
+                make_plan_csv(csv_path, sizes, weeks=weeks, tracks=track_names(tracks))
+                with open(csv_path, encoding='utf-8', newline='') as f:
+                    rows = list(csv.DictReader(f))
+                verses = {}
+
+                def prefetch(refs):
+                    found = bot.get_verses_from_db(refs)
+                    verses.update(found)
+                    return found
+
+                messages = [bot.RENDERER.render_week(row, prefetch) for row in rows]
+                flat = [message for week in messages for message in week]
+                long_messages = ['\n\n'.join(week) * (1 + 8192 // sum(map(len, week))) for week in messages[:20]]
+
+                def assembly():
+                    for row in rows:
+                        bot.RENDERER.render_week(row, lambda refs: verses)
+
+                def full():
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        for row in rows:
+                            bot.generate_messages_from_data(row)
+
+                def split_all():
+                    for message in flat:
+                        split_message(message)
+
+                def split_long():
+                    for message in long_messages:
+                        split_message(message)
+
+                assembly_seconds = measure(assembly, args.repeat)
+                full_seconds = measure(full, args.repeat)
+                split_seconds = measure(split_all, args.repeat)
+                split_long_seconds = measure(split_long, args.repeat)
+                print(f"{tracks:>6} {weeks:>6} {len(flat) / assembly_seconds:>19,.0f} "
+                      f"{len(flat) / full_seconds:>15,.0f} {split_seconds / len(flat) * 1e6:>18.1f} "
+                      f"{split_long_seconds / len(long_messages) * 1000:>18.2f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
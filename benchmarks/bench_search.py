@@ -0,0 +1,104 @@
+"""
+Полнотекстовый поиск: индекс FTS5 против наивного LIKE по таблице verses.
+
+Измеряет время построения и размер индекса, затем задержку запросов трёх
+видов — слова, фраза, префикс — на словах, взятых из самой базы. LIKE
+выполняется по исходному тексту без свёртки ё/регистра (как сделал бы
+наивный поиск), поэтому находит не всё, что находит FTS5.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_search.py --db synodal.sqlite [--queries 200]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from verse_search import VerseSearch, fold  # noqa: E402
+
+
+def make_queries(db_path, count, seed=5):
+    """(вид, запрос FTS, фрагменты для LIKE) на словах из случайных стихов"""
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    texts = [text for (text,) in conn.execute("SELECT text FROM verses WHERE verse > 0")]
+    conn.close()
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < count:
+        words = [word for word in fold(rng.choice(texts)).split() if len(word) > 3 and not word.isdigit()]
+        if len(words) < 2:
+            continue
+        kind = ('words', 'phrase', 'prefix')[len(queries) % 3]
+        if kind == 'words':
+            picked = rng.sample(words, 2)
+            queries.append((kind, ' '.join(picked), picked))
+        elif kind == 'phrase':
+            start = rng.randrange(len(words) - 1)
+            picked = words[start:start + 2]
+            queries.append((kind, f'"{" ".join(picked)}"', [' '.join(picked)]))
+        else:
+            stem = rng.choice(words)[:4]
+            queries.append((kind, f"{stem}*", [stem]))
+    return queries
+
+
+def like_search(conn, fragments, limit):
+    where = ' AND '.join('text LIKE ?' for _ in fragments)
+    return conn.execute(
+        f"SELECT book, chapter, verse, text FROM verses WHERE {where} LIMIT ?",
+        [f"%{fragment}%" for fragment in fragments] + [limit],
+    ).fetchall()
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000  # noqa: E731
+    return f"p50 {pick(50):7.2f} мс  p99 {pick(99):7.2f} мс  среднее {sum(ordered) / len(ordered) * 1000:7.2f} мс"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default='synodal.sqlite')
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        index_path = os.path.join(directory, 'bench.fts')
+        started = time.perf_counter()
+        VerseSearch.build(args.db, index_path)
+        build_time = time.perf_counter() - started
+        print(f"🏗️ Построение индекса: {build_time:.2f} с, {os.path.getsize(index_path) / 1024 / 1024:.1f} МБ "
+              f"(база {os.path.getsize(args.db) / 1024 / 1024:.1f} МБ)", flush=True)
+
+        queries = make_queries(args.db, args.queries)
+        search = VerseSearch(index_path, pool_size=1, max_workers=1)
+        conn = sqlite3.connect(f"file:{os.path.abspath(args.db)}?mode=ro&immutable=1", uri=True)
+
+        for kind in ('words', 'phrase', 'prefix'):
+            fts_times, like_times = [], []
+            fts_found = like_found = 0
+            for query_kind, query, fragments in queries:
+                if query_kind != kind:
+                    continue
+                started = time.perf_counter()
+                fts_found += len(search.search(query, args.limit))
+                fts_times.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                like_found += len(like_search(conn, fragments, args.limit))
+                like_times.append(time.perf_counter() - started)
+            print(f"\n🔎 {kind} ({len(fts_times)} запросов)", flush=True)
+            print(f"   FTS5  {percentiles(fts_times)}  найдено {fts_found}", flush=True)
+            print(f"   LIKE  {percentiles(like_times)}  найдено {like_found}", flush=True)
+
+        conn.close()
+        search.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Холодный старт бота: время до первого ответа /health и память процесса.
+
+Запускает main.py отдельным процессом на синтетических данных (Google Sheets
+и Telegram — локальные имитации) и опрашивает /health, пока тот не ответит.
+Для каждого запуска: время до первого 200 на /health и RSS в этот момент,
+время до полного запуска («Бот полностью запущен») и RSS после него, плюс
+разбивка этапов из JSON-строки startup. С --importtime дополнительно
+печатает самые дорогие импорты `import main` (python -X importtime).
+
+--main позволяет сравнить с другой версией (например, git worktree старого
+коммита): python benchmarks/bench_startup.py --main /tmp/old/main.py
+
+Запуск из корня репозитория:
+    python benchmarks/bench_startup.py --runs 5 --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from processes import free_port, health_ok, start_process  # noqa: E402
+from synthetic import make_db, make_plan_csv  # noqa: E402
+
+
+def rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+def start_once(main_path, env, timeout=60.0):
+    """Один холодный старт: словарь замеров"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, main_path], env={**env, 'PORT': str(port)},
+        cwd=os.path.dirname(main_path), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    ready = threading.Event()
+    startup = {}
+
+    def read_output():
+        for line in process.stdout:
+            if line.startswith('{') and '"event": "startup"' in line:
+                startup.update(json.loads(line))
+            if 'Бот полностью запущен' in line:
+                ready.set()
+
+    threading.Thread(target=read_output, daemon=True).start()
+    try:
+        while not health_ok(port):
+            if process.poll() is not None or time.perf_counter() - started > timeout:
+                raise RuntimeError(f"main.py не ответил на /health (код {process.returncode})")
+            time.sleep(0.002)
+        result = {'health_ms': (time.perf_counter() - started) * 1000, 'health_rss_mb': rss_mb(process.pid)}
+        if not ready.wait(timeout):
+            raise RuntimeError("main.py не сообщил о полном запуске")
+        result['ready_ms'] = (time.perf_counter() - started) * 1000
+        time.sleep(0.5)
+        result['ready_rss_mb'] = rss_mb(process.pid)
+        result['startup'] = startup
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def import_breakdown(main_path, env, top):
+    """Самые дорогие модули верхнего уровня `import main` (накопительное время, мс)"""
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        env=env, cwd=os.path.dirname(main_path), capture_output=True, text=True,
+    ).stderr
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Только модули, импортированные самим main (на уровень глубже него)
+        if not name.startswith('   ') or name.startswith('     ') or not cumulative.strip().isdigit():
+            continue
+        modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--main', default=os.path.join(os.path.dirname(BENCH_DIR), 'main.py'))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--importtime', action='store_true')
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+    main_path = os.path.abspath(args.main)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'synodal.sqlite')
+        csv_path = os.path.join(workdir, 'plan.csv')
+        make_plan_csv(csv_path, make_db(db_path), weeks=52)
+        sheets, sheets_port = start_process('fake_sheets.py', '--csv', csv_path)
+        telegram, telegram_port = start_process('fake_telegram.py')
+        env = {
+            **os.environ,
+            'DB_PATH': db_path,
+            'CACHE_DIR': os.path.join(workdir, 'cache'),
+            'OUTBOX_PATH': os.path.join(workdir, 'outbox.sqlite'),
+            'TRANSLATIONS_FILE': '',
+            'VERSE_SEARCH_PATH': os.path.join(workdir, 'synodal.sqlite.fts'),
+            'GOOGLE_SHEET_ID': 'bench',
+            'GOOGLE_SHEETS_URL': f"http://127.0.0.1:{sheets_port}",
+            'TELEGRAM_API_URL': f"http://127.0.0.1:{telegram_port}",
+            'TELEGRAM_BOT_TOKEN': '123:FAKE',
+            'TELEGRAM_CHAT_ID': '1001',
+        }
+        try:
+            start_once(main_path, env)  # прогрев: .pyc и индекс поиска
+            runs = [start_once(main_path, env) for _ in range(args.runs)]
+            modules = import_breakdown(main_path, env, args.top) if args.importtime else []
+        finally:
+            sheets.terminate()
+            telegram.terminate()
+
+    median = lambda key: statistics.median(run[key] for run in runs)  # noqa: E731
+    print(f"📊 {main_path}, запусков {args.runs} (медиана)", flush=True)
+    print(f"   /health отвечает   {median('health_ms'):8.0f} мс   RSS {median('health_rss_mb'):6.1f} МБ", flush=True)
+    print(f"   полный запуск      {median('ready_ms'):8.0f} мс   RSS {median('ready_rss_mb'):6.1f} МБ", flush=True)
+    phases = runs[-1]['startup']
+    if phases:
+        print("⏱️ Этапы (последний запуск, мс):", flush=True)
+        for name, value in phases.items():
+            if name not in ('ts', 'event'):
+                print(f"   {name:<40} {value}", flush=True)
+    if modules:
+        print("📦 Импорт main (накопительно):", flush=True)
+        for milliseconds, name in modules:
+            print(f"   {name:<40} {milliseconds:8.1f} мс", flush=True)
+
+
+if __name__ == "__main__":
+    main()
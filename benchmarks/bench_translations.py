@@ -0,0 +1,71 @@
+"""
+Реестр переводов: стоимость запроса и память в зависимости от числа
+установленных переводов.
+
+Все «переводы» — одна и та же база (по отдельному источнику на код), так
+что меняется только размер реестра. Для каждого N измеряется горячий
+fetch_many в одном переводе и RSS процесса после обращения ко всем N
+переводам по очереди (открытыми остаются не больше --max-open).
+
+Запуск из корня репозитория:
+    python benchmarks/bench_translations.py --db synodal.sqlite --index mmap
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bible_ref import VerseSpan  # noqa: E402
+from translations import Translation, TranslationRegistry  # noqa: E402
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except OSError:
+        return float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default='synodal.sqlite')
+    parser.add_argument('--index', default='sqlite', choices=['sqlite', 'mmap', 'memory'])
+    parser.add_argument('--max-open', type=int, default=2)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    batches = [
+        [VerseSpan(rng.randint(1, 66), rng.randint(1, 5), verse, verse + rng.randint(0, 3))
+         for verse in rng.sample(range(1, 20), 7)]
+        for _ in range(args.lookups)
+    ]
+    print(f"📊 База {args.db}, индекс {args.index}, открытых не больше {args.max_open}; "
+          f"RSS до начала {rss_mb():.1f} МБ", flush=True)
+
+    for count in (1, 10, 100):
+        translations = [
+            Translation(f"t{i}", f"Перевод {i}", 'ru', args.db, args.index, 'kjv' if i % 2 else 'synodal')
+            for i in range(count)
+        ]
+        registry = TranslationRegistry(translations, translations[0], max_open=args.max_open)
+        for translation in translations:
+            registry.fetch_many(batches[0], translation.code)
+
+        hot = translations[-1].code
+        registry.fetch_many(batches[0], hot)
+        started = time.perf_counter()
+        for batch in batches:
+            registry.fetch_many(batch, hot)
+        per_lookup = (time.perf_counter() - started) / len(batches)
+        print(f"   {count:>3} переводов: {per_lookup * 1e6:8.1f} мкс на пакет из 7 ссылок, "
+              f"открыто {len(registry.open_codes())}, RSS {rss_mb():.1f} МБ", flush=True)
+        registry.close()
+
+
+if __name__ == "__main__":
+    main()
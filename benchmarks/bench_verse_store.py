@@ -0,0 +1,119 @@
+"""
+Микро-бенчмарк: VerseStore и TextIndex против старого get_verse_from_db
+(новое соединение sqlite3.connect на каждую ссылку).
+
+Запуск из корня репозитория:
+    python benchmarks/bench_verse_store.py --db synodal.sqlite --weeks 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_index import TextIndex  # noqa: E402
+from verse_store import VerseStore  # noqa: E402
+
+
+def legacy_get_verse(db_path, parsed):
+    """Копия прежней реализации: connect/execute/close на каждую ссылку"""
+    book_number, chapter, verse_start, verse_end = parsed
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    if verse_start == verse_end:
+        cursor.execute("""
+            SELECT text FROM verses
+            WHERE book = ? AND chapter = ? AND verse = ?
+        """, (book_number, chapter, verse_start))
+        result = cursor.fetchone()
+        verse_text = result[0] if result else None
+    else:
+        cursor.execute("""
+            SELECT text FROM verses
+            WHERE book = ? AND chapter = ? AND verse BETWEEN ? AND ?
+            ORDER BY verse
+        """, (book_number, chapter, verse_start, verse_end))
+        results = cursor.fetchall()
+        verse_text = ' '.join([row[0] for row in results]) if results else None
+    conn.close()
+    return verse_text
+
+
+def sample_weeks(db_path, weeks, seed=42):
+    """Случайные недели по 14 ссылок; ссылки недели кучкуются в 2-3 главах"""
+    conn = sqlite3.connect(db_path)
+    chapters = conn.execute("SELECT book, chapter, MAX(verse) FROM verses GROUP BY book, chapter").fetchall()
+    conn.close()
+    rng = random.Random(seed)
+    result = []
+    for _ in range(weeks):
+        week_chapters = rng.sample(chapters, 3)
+        week = []
+        for _ in range(14):
+            book, chapter, max_verse = rng.choice(week_chapters)
+            start = rng.randint(1, max_verse)
+            end = min(max_verse, start + rng.choice([0, 0, 1, 2, 4]))
+            week.append((book, chapter, start, end))
+        result.append(week)
+    return result
+
+
+def timed(label, func, count):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed * 1000:9.1f} мс  {count / elapsed:12.0f} ссылок/с", flush=True)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default='synodal.sqlite')
+    parser.add_argument('--weeks', type=int, default=200)
+    args = parser.parse_args()
+
+    weeks = sample_weeks(args.db, args.weeks)
+    refs = [ref for week in weeks for ref in week]
+    store = VerseStore(args.db)
+
+    # Проверяем, что результаты совпадают
+    for ref in refs[:200]:
+        assert legacy_get_verse(args.db, ref) == store.fetch(*ref), ref
+
+    print(f"📊 {len(refs)} ссылок, {len(weeks)} недель, база {args.db}", flush=True)
+    base = timed("legacy: connect на ссылку", lambda: [legacy_get_verse(args.db, r) for r in refs], len(refs))
+    single = timed("VerseStore.fetch", lambda: [store.fetch(*r) for r in refs], len(refs))
+    batch = timed("VerseStore.fetch_many (неделя)", lambda: [store.fetch_many(w) for w in weeks], len(refs))
+
+    async def run_async():
+        await asyncio.gather(*(store.fetch_many_async(w) for w in weeks))
+
+    concurrent = timed("VerseStore.fetch_many_async", lambda: asyncio.run(run_async()), len(refs))
+    store.close()
+
+    started = time.perf_counter()
+    index = TextIndex.from_db(args.db)
+    print(f"{'TextIndex.from_db (загрузка)':<34} {(time.perf_counter() - started) * 1000:9.1f} мс", flush=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, 'verses.idx')
+        index.save(index_path)
+        started = time.perf_counter()
+        mapped = TextIndex.load(index_path)
+        print(f"{'TextIndex.load (mmap)':<34} {(time.perf_counter() - started) * 1000:9.1f} мс", flush=True)
+        for ref in refs:
+            assert legacy_get_verse(args.db, ref) == mapped.fetch(*ref), ref
+        in_memory = timed("TextIndex.fetch (память)", lambda: [index.fetch(*r) for r in refs], len(refs))
+        timed("TextIndex.fetch (mmap)", lambda: [mapped.fetch(*r) for r in refs], len(refs))
+        mapped.close()
+
+    print(f"⚡ Ускорение: fetch x{base / single:.1f}, fetch_many x{base / batch:.1f}, "
+          f"async x{base / concurrent:.1f}, TextIndex x{base / in_memory:.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Нагрузочный тест интерактивного режима: всплеск обновлений на вебхук.
+
+Сервер (main.create_app() с WEBHOOK_URL) запускается отдельным процессом
+на синтетических данных, ответы уходят в локальную имитацию Telegram,
+которая записывает время приёма каждого сообщения. Клиент отправляет
+--updates обновлений (смесь /today, /tomorrow, /verse, /week, по чату на
+обновление) с --concurrency одновременных POST и ждёт все ответы.
+
+Задержка ответа — от POST обновления до приёма последнего сообщения ответа
+имитацией. Лимит рассылки по умолчанию снят (--rate), чтобы мерить сам бот:
+на настоящем Telegram пропускную способность ограничит лимит ~30 сообщений/с.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_webhook.py --updates 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from processes import free_port, health_ok, start_process  # noqa: E402
+from synthetic import make_db, make_plan_csv  # noqa: E402
+
+SECRET = 'bench-secret'
+TOKEN = '123:FAKE'
+
+# Доли команд во всплеске и число сообщений в ответе на каждую
+COMMANDS = [('/today', 0.4, 1), ('/tomorrow', 0.1, 1), ('/verse', 0.45, 1), ('/week', 0.05, 7)]
+
+
+def serve(args):
+    """Режим сервера: main.create_app() с расписанием из CSV (без загрузки таблицы)"""
+    from aiohttp import web
+
+    import main
+    from schedule_index import ScheduleIndex
+
+    with open(args.csv, encoding='utf-8', newline='') as f:
+        main._SCHEDULE = ScheduleIndex.from_lines(line.rstrip('\r\n') for line in f)
+    web.run_app(main.create_app(), host='127.0.0.1', port=args.port, access_log=None, print=None)
+
+
+def make_updates(count, refs, seed=13):
+    """[(chat_id, команда, обновление)]: по одному чату на обновление"""
+    rng = random.Random(seed)
+    names = [name for name, _, _ in COMMANDS]
+    weights = [weight for _, weight, _ in COMMANDS]
+    updates = []
+    for i in range(count):
+        command = rng.choices(names, weights)[0]
+        text = f"/verse {rng.choice(refs)}" if command == '/verse' else command
+        chat_id = 500000 + i
+        updates.append((str(chat_id), command, {
+            'update_id': i + 1,
+            'message': {
+                'message_id': i + 1,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+                'text': text,
+            },
+        }))
+    return updates
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else float('nan')
+
+
+async def burst(args, server_url, telegram_url, updates):
+    import aiohttp
+
+    expected = sum(dict((name, replies) for name, _, replies in COMMANDS)[command] for _, command, _ in updates)
+    posted_at = {}
+    post_latencies = []
+    errors = 0
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        queue = list(reversed(updates))
+
+        async def worker():
+            nonlocal errors
+            while queue:
+                chat_id, _, update = queue.pop()
+                posted_at[chat_id] = time.time()
+                started = time.perf_counter()
+                async with session.post(f"{server_url}/telegram", json=update,
+                                        headers={'X-Telegram-Bot-Api-Secret-Token': SECRET}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                post_latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        posted = time.perf_counter() - started
+
+        # Ждём, пока имитация примет все ответы
+        deadline = time.perf_counter() + args.timeout
+        while True:
+            async with session.post(f"{telegram_url}/bot{TOKEN}/getStats") as response:
+                accepted = (await response.json())['result']['accepted']
+            if accepted >= expected or time.perf_counter() > deadline:
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        async with session.post(f"{telegram_url}/bot{TOKEN}/getReceived") as response:
+            received = (await response.json())['result']
+
+    last_reply = {}
+    for chat_id, at in received:
+        last_reply[chat_id] = max(at, last_reply.get(chat_id, 0.0))
+    by_command = {}
+    for chat_id, command, _ in updates:
+        if chat_id in last_reply:
+            by_command.setdefault(command, []).append(last_reply[chat_id] - posted_at[chat_id])
+    return {
+        'posted': posted, 'elapsed': elapsed, 'errors': errors, 'expected': expected, 'accepted': accepted,
+        'post_latencies': post_latencies, 'by_command': by_command,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--updates', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=32, help="BOT_WORKERS сервера")
+    parser.add_argument('--rate', type=float, default=1e6, help="DELIVERY_RATE сервера, сообщений/с")
+    parser.add_argument('--latency', type=float, default=20.0, help="задержка имитации Telegram, мс")
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--csv', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'synodal.sqlite')
+        csv_path = os.path.join(workdir, 'plan.csv')
+        today = date.today()
+        # План покрывает сегодняшнюю неделю и несколько соседних
+        refs = make_plan_csv(csv_path, make_db(db_path), weeks=8,
+                             start=today - timedelta(days=today.weekday(), weeks=4))
+        telegram, telegram_port = start_process('fake_telegram.py', '--latency', str(args.latency / 1000))
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port), '--csv', csv_path],
+            env={
+                **os.environ,
+                'DB_PATH': db_path,
+                'CACHE_DIR': os.path.join(workdir, 'cache'),
+                'TRANSLATIONS_FILE': '',
+                'VERSE_SEARCH_PATH': '',
+                'TELEGRAM_BOT_TOKEN': TOKEN,
+                'TELEGRAM_API_URL': f"http://127.0.0.1:{telegram_port}",
+                'WEBHOOK_URL': 'http://bench.invalid',
+                'WEBHOOK_SECRET': SECRET,
+                'BOT_WORKERS': str(args.workers),
+                'DELIVERY_WORKERS': str(args.workers),
+                'DELIVERY_RATE': str(args.rate),
+                'JSON_LOGS': '0',
+            },
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            while not health_ok(port):
+                if server.poll() is not None:
+                    raise RuntimeError("Сервер не запустился")
+                time.sleep(0.05)
+            result = asyncio.run(burst(
+                args, f"http://127.0.0.1:{port}", f"http://127.0.0.1:{telegram_port}", make_updates(args.updates, refs),
+            ))
+        finally:
+            server.terminate()
+            telegram.terminate()
+
+    print(f"📊 {args.updates} обновлений, {args.concurrency} одновременных POST, {args.workers} воркеров бота, "
+          f"задержка Telegram {args.latency:.0f} мс", flush=True)
+    print(f"   Вебхук принял всё за {result['posted']:.2f} с ({args.updates / result['posted']:.0f} обновл./с), "
+          f"ошибок {result['errors']}; ответ вебхука p50 {percentile(result['post_latencies'], 50) * 1000:.1f} мс, "
+          f"p99 {percentile(result['post_latencies'], 99) * 1000:.1f} мс", flush=True)
+    print(f"   Ответы: {result['accepted']} из {result['expected']} сообщений за {result['elapsed']:.2f} с", flush=True)
+    everything = [latency for latencies in result['by_command'].values() for latency in latencies]
+    for command, latencies in sorted(result['by_command'].items()) + [('всего', everything)]:
+        print(f"   {command:<10} {len(latencies):>6}  p50 {percentile(latencies, 50) * 1000:8.1f} мс  "
+              f"p95 {percentile(latencies, 95) * 1000:8.1f} мс  p99 {percentile(latencies, 99) * 1000:8.1f} мс",
+              flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Локальная имитация CSV-экспорта Google Sheets для нагрузочных тестов.
+
+Отдаёт файл плана на /spreadsheets/d/<id>/export (как docs.google.com)
+с ETag и Last-Modified, отвечает 304 на условный запрос к неизменившемуся
+файлу. Файл перечитывается при каждом изменении, так что тест может
+подменить план на лету. Как и настоящий экспорт, может сначала
+перенаправить на другой адрес (--redirect).
+
+Запуск отдельно (main.py — с GOOGLE_SHEETS_URL=http://127.0.0.1:8082):
+    python benchmarks/fake_sheets.py --csv plan.csv --port 8082
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+from email.utils import formatdate
+
+from aiohttp import web
+
+
+class FakeSheets:
+    """aiohttp-приложение, отдающее один CSV-файл для любой таблицы"""
+
+    def __init__(self, csv_path, latency=0.0, redirect=False, chunk_size=16384):
+        self.csv_path = csv_path
+        self.latency = latency
+        self.redirect = redirect
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.not_modified = 0
+        self._stamp = None
+        self._body = b''
+        self._etag = ''
+        self._last_modified = ''
+        self.app = web.Application()
+        self.app.router.add_get('/spreadsheets/d/{sheet_id}/export', self.handle_export)
+        self.app.router.add_get('/export-data', self.handle_data)
+        self.app.router.add_get('/stats', self.handle_stats)
+        self.runner = None
+        self.port = None
+
+    def _load(self):
+        stat = os.stat(self.csv_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            with open(self.csv_path, 'rb') as f:
+                self._body = f.read()
+            self._etag = '"' + hashlib.sha1(self._body).hexdigest()[:16] + '"'
+            self._last_modified = formatdate(stat.st_mtime, usegmt=True)
+            self._stamp = stamp
+
+    async def handle_export(self, request):
+        if self.redirect:
+            raise web.HTTPTemporaryRedirect(f"/export-data?{request.query_string}")
+        return await self.handle_data(request)
+
+    async def handle_data(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._load()
+        headers = {'ETag': self._etag, 'Last-Modified': self._last_modified}
+        if request.headers.get('If-None-Match') == self._etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+
+        # Тело по частям, как потоковый ответ настоящего экспорта
+        response = web.StreamResponse(headers={**headers, 'Content-Type': 'text/csv; charset=utf-8'})
+        await response.prepare(request)
+        for start in range(0, len(self._body), self.chunk_size):
+            await response.write(self._body[start:start + self.chunk_size])
+        await response.write_eof()
+        return response
+
+    async def handle_stats(self, request):
+        return web.json_response({'requests': self.requests, 'not_modified': self.not_modified})
+
+    async def start(self, host='127.0.0.1', port=0):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}"
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+async def _serve(args):
+    fake = FakeSheets(args.csv, latency=args.latency, redirect=args.redirect)
+    base_url = await fake.start(port=args.port)
+    print(f"✅ Fake Sheets: {base_url}/spreadsheets/d/<id>/export ({args.csv})", flush=True)
+    while True:
+        await asyncio.sleep(60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная имитация CSV-экспорта Google Sheets")
+    parser.add_argument('--csv', default='plan.csv')
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--redirect', action='store_true')
+    asyncio.run(_serve(parser.parse_args()))
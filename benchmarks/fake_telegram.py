@@ -0,0 +1,123 @@
+"""
+Локальная имитация Bot API для нагрузочных тестов рассылки.
+
+Отвечает на /bot<token>/sendMessage как настоящий Telegram и при желании
+эмулирует лимиты: больше global_rate сообщений в секунду на бота или
+чаще раза в секунду в один чат — ответ 429 с retry_after.
+
+Запуск отдельно:
+    python benchmarks/fake_telegram.py --port 8081
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+from aiohttp import web
+
+
+class FakeTelegram:
+    """aiohttp-приложение с журналом принятых сообщений"""
+
+    def __init__(self, latency=0.0, global_rate=None, per_chat_interval=None, retry_after=1):
+        self.latency = latency
+        self.global_rate = global_rate
+        self.per_chat_interval = per_chat_interval
+        self.retry_after = retry_after
+        self.messages = []          # (chat_id, text)
+        self.received_at = []       # time.time() приёма каждого сообщения из messages
+        self.rejected = 0
+        self._recent = deque()      # время последних принятых сообщений
+        self._last_by_chat = {}
+        self._message_id = 0
+        self.app = web.Application()
+        self.app.router.add_post('/bot{token}/{method}', self.handle)
+        self.runner = None
+        self.port = None
+
+    async def handle(self, request):
+        method = request.match_info['method']
+        if request.content_type == 'application/json':
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == 'getMe':
+            return _ok({'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'})
+        if method == 'getStats':
+            # Не из Bot API: счётчики для нагрузочных тестов
+            return _ok({'accepted': len(self.messages), 'rejected': self.rejected})
+        if method == 'getReceived':
+            # Не из Bot API: [chat_id, время приёма] каждого сообщения (замер задержек)
+            return _ok([[chat_id, at] for (chat_id, _), at in zip(self.messages, self.received_at)])
+        if method != 'sendMessage':
+            return _ok(True)
+
+        chat_id = str(params.get('chat_id'))
+        now = time.monotonic()
+        if self._limited(chat_id, now):
+            self.rejected += 1
+            return web.json_response({
+                'ok': False,
+                'error_code': 429,
+                'description': f"Too Many Requests: retry after {self.retry_after}",
+                'parameters': {'retry_after': self.retry_after},
+            }, status=429)
+
+        self._recent.append(now)
+        self._last_by_chat[chat_id] = now
+        self.messages.append((chat_id, params.get('text')))
+        self.received_at.append(time.time())
+        self._message_id += 1
+        return _ok({
+            'message_id': self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id) if chat_id.lstrip('-').isdigit() else 0, 'type': 'private'},
+            'text': params.get('text'),
+        })
+
+    def _limited(self, chat_id, now):
+        if self.per_chat_interval and now - self._last_by_chat.get(chat_id, -1e9) < self.per_chat_interval:
+            return True
+        if self.global_rate:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.global_rate:
+                return True
+        return False
+
+    async def start(self, host='127.0.0.1', port=0):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}/bot"
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+def _ok(result):
+    return web.Response(text=json.dumps({'ok': True, 'result': result}), content_type='application/json')
+
+
+async def _serve(args):
+    fake = FakeTelegram(latency=args.latency, global_rate=args.global_rate, per_chat_interval=args.per_chat_interval)
+    base_url = await fake.start(port=args.port)
+    print(f"✅ Fake Telegram: {base_url}<token>/sendMessage", flush=True)
+    while True:
+        await asyncio.sleep(60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная имитация Telegram Bot API")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--global-rate', type=int, default=None)
+    parser.add_argument('--per-chat-interval', type=float, default=None)
+    asyncio.run(_serve(parser.parse_args()))
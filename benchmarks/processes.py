@@ -0,0 +1,63 @@
+"""
+Вспомогательные процессы бенчмарков: имитации Google Sheets и Telegram
+и серверы под нагрузкой на свободных локальных портах.
+
+Общий модуль для suite.py и bench_*.py — импортируется после
+sys.path.insert(0, BENCH_DIR), как synthetic.py.
+"""
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    """Свободный TCP-порт на 127.0.0.1"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_process(script, *args):
+    """
+    Запускает скрипт из benchmarks/ (имитацию) с --port на свободном порту
+    и ждёт первую строку вывода — сообщение о старте; (процесс, порт)
+    """
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, script), '--port', str(port), *args],
+        stdout=subprocess.PIPE, text=True,
+    )
+    process.stdout.readline()
+    return process, port
+
+
+def health_ok(port):
+    """Отвечает ли /health на порту статусом 200"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=0.5)
+    try:
+        conn.request('GET', '/health')
+        return conn.getresponse().status == 200
+    except OSError:
+        return False
+    finally:
+        conn.close()
+
+
+def wait_for_port(port, process=None, timeout=10.0):
+    """Ждёт, пока порт начнёт принимать соединения; RuntimeError, если процесс завершился или время вышло"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return
+        except OSError:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"Процесс завершился с кодом {process.returncode}, порт {port} не открыт")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Порт {port} не открылся за {timeout:.0f} с")
+            time.sleep(0.1)
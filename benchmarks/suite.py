@@ -0,0 +1,285 @@
+"""
+Сквозной набор тестов производительности main.py с базовой линией.
+
+Полностью офлайн: база стихов и план генерируются (benchmarks/synthetic.py)
+во временном каталоге, Google Sheets и Telegram заменяются локальными
+имитациями (fake_sheets.py, fake_telegram.py) в отдельных процессах —
+main.py направляется на них через GOOGLE_SHEETS_URL и TELEGRAM_API_URL.
+
+Этапы:
+    ref_parse        — разбор всех ссылок плана холодным RefParser
+    verse_lookup     — get_verses_from_db по неделям (14 ссылок за вызов)
+    week_render      — generate_messages_from_data для всех недель
+    sheet_load_full  — load_schedule с пустым кэшем (загрузка и разбор CSV)
+    sheet_load_304   — load_schedule при неизменившейся таблице
+    sheet_refresh    — фоновое обновление снимка (SHEET_REFRESHER.refresh_once)
+    fanout_send      — DeliveryEngine.deliver одного сообщения всем чатам
+    daily_job        — daily_job целиком: снимок таблицы, рендер, outbox, рассылка
+
+Каждый этап прогоняется один раз вхолостую (прогрев), затем --repeat раз;
+в отчёт идут медиана и минимум.
+--save записывает результаты в JSON; --compare сравнивает медианы с
+сохранёнными и завершается с кодом 1, если какой-то этап медленнее
+базовой линии больше чем на --threshold (доля). Базовая линия зависит от
+машины, поэтому сохраняется локально и не коммитится.
+
+Запуск из корня репозитория:
+    python benchmarks/suite.py --scale medium --save benchmarks/baseline.json
+    python benchmarks/suite.py --scale medium --compare benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from processes import start_process  # noqa: E402
+from synthetic import make_db, make_plan_csv  # noqa: E402
+
+SCALES = {
+    'small': {'chapters': 10, 'verses': 20, 'weeks': 52, 'chats': 200},
+    'medium': {'chapters': 30, 'verses': 30, 'weeks': 520, 'chats': 1000},
+    'large': {'chapters': 50, 'verses': 40, 'weeks': 2600, 'chats': 5000},
+}
+
+STAGES = [
+    'ref_parse', 'verse_lookup', 'week_render', 'sheet_load_full', 'sheet_load_304', 'sheet_refresh',
+    'fanout_send', 'daily_job',
+]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Подавляет построчные print из main.py на время замера"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class Suite:
+    """Окружение набора: данные, имитации и импортированный main"""
+
+    def __init__(self, workdir, scale):
+        self.workdir = workdir
+        self.scale = scale
+        self.db_path = os.path.join(workdir, 'synodal.sqlite')
+        self.csv_path = os.path.join(workdir, 'plan.csv')
+        self.cache_dir = os.path.join(workdir, 'cache')
+        self.subscribers_path = os.path.join(workdir, 'subscribers.txt')
+        self.processes = []
+        self.run_number = 0
+
+    def prepare(self):
+        sizes = make_db(self.db_path, self.scale['chapters'], self.scale['verses'])
+        self.refs = make_plan_csv(self.csv_path, sizes, self.scale['weeks'])
+        with open(self.csv_path, encoding='utf-8', newline='') as f:
+            self.rows = list(csv.DictReader(f))
+
+        sheets, sheets_port = start_process('fake_sheets.py', '--csv', self.csv_path)
+        telegram, telegram_port = start_process('fake_telegram.py')
+        self.processes = [sheets, telegram]
+
+        # Окружение задаётся до импорта main: конфигурация читается при импорте
+        os.environ.update({
+            'DB_PATH': self.db_path,
+            'CACHE_DIR': self.cache_dir,
+            'OUTBOX_PATH': os.path.join(self.workdir, 'outbox.sqlite'),
+            'TRANSLATIONS_FILE': '',
+            'VERSE_SEARCH_PATH': '',
+            'VERSE_INDEX_MODE': '',
+            'GOOGLE_SHEET_ID': 'bench',
+            'GOOGLE_SHEETS_URL': f"http://127.0.0.1:{sheets_port}",
+            'TELEGRAM_API_URL': f"http://127.0.0.1:{telegram_port}",
+            'TELEGRAM_BOT_TOKEN': '123:FAKE',
+            'TELEGRAM_CHAT_ID': '',
+            'SUBSCRIBERS_FILE': self.subscribers_path,
+            'DELIVERY_RATE': '1000000',
+            'DELIVERY_WINDOW': '0',
+            'JSON_LOGS': '0',
+        })
+        import main
+        self.main = main
+
+    async def close(self):
+        if getattr(self, 'main', None) is not None and self.main._BOT is not None:
+            await self.main._BOT.shutdown()
+        for process in self.processes:
+            process.terminate()
+            process.wait()
+
+    def next_chats(self):
+        """Новые chat_id на каждый прогон: лимит «сообщение в секунду на чат» не мешает повторам"""
+        self.run_number += 1
+        first = self.run_number * 10_000_000
+        return [str(first + i) for i in range(self.scale['chats'])]
+
+    # -------------------------------------------------------------------------
+    # Этапы: каждый возвращает число обработанных элементов
+    # -------------------------------------------------------------------------
+
+    async def ref_parse(self):
+        from bible_ref import BOOK_ALIASES, RefParser
+        parser = RefParser(BOOK_ALIASES)
+        for ref in self.refs:
+            parser.parse(ref)
+        return len(self.refs)
+
+    async def verse_lookup(self):
+        for start in range(0, len(self.refs), 14):
+            self.main.get_verses_from_db(self.refs[start:start + 14])
+        return len(self.refs)
+
+    async def week_render(self):
+        for row in self.rows:
+            self.main.generate_messages_from_data(row)
+        return len(self.rows)
+
+    def _reset_sheet_cache(self):
+        for name in ('sheet.csv', 'sheet.json', 'schedule.json'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.cache_dir, name))
+        self.main.SHEET_FETCHER._meta = None
+        self.main._SCHEDULE = None
+
+    async def sheet_load_full(self):
+        self._reset_sheet_cache()
+        schedule = await self.main.load_schedule()
+        return len(schedule)
+
+    async def sheet_load_304(self):
+        schedule = await self.main.load_schedule()
+        return len(schedule)
+
+    async def sheet_refresh(self):
+        if not await self.main.SHEET_REFRESHER.refresh_once():
+            raise RuntimeError(f"sheet_refresh: {self.main.SHEET_REFRESHER.last_error}")
+        return len(self.main.current_schedule())
+
+    async def fanout_send(self):
+        message = self.main.generate_messages_from_data(self.rows[-1])[0]
+        report = await self.main.get_delivery_engine().deliver([(chat_id, message) for chat_id in self.next_chats()])
+        if report.failed:
+            raise RuntimeError(f"fanout_send: {report.failed} неудачных отправок")
+        return report.sent
+
+    async def daily_job(self):
+        from outbox import Outbox
+        chats = self.next_chats()
+        with open(self.subscribers_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(chats) + '\n')
+        # Чистый outbox и кэш рендера: прогон делает всю работу дня
+        if self.main._OUTBOX is not None:
+            self.main._OUTBOX.close()
+        self.main._OUTBOX = Outbox(os.path.join(self.workdir, f"outbox-{self.run_number}.sqlite"))
+        shutil.rmtree(os.path.join(self.cache_dir, 'renders'), ignore_errors=True)
+        day = self.main.datetime.now(self.main.TIMEZONE).date().isoformat()
+        await self.main.daily_job()
+        counts = self.main._OUTBOX.counts(day)
+        if counts.get('sent', 0) != len(chats):
+            raise RuntimeError(f"daily_job: отправлено не всем чатам ({counts})")
+        return len(chats)
+
+
+async def run_suite(args):
+    scale = SCALES[args.scale]
+    workdir = tempfile.mkdtemp(prefix='maranatha-bench-')
+    suite = Suite(workdir, scale)
+    results = {}
+    try:
+        suite.prepare()
+        for stage in args.stages:
+            samples = []
+            items = 0
+            # Первый прогон не засчитывается: кэши, пулы соединений и ленивые импорты
+            with quiet():
+                await getattr(suite, stage)()
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                with quiet():
+                    items = await getattr(suite, stage)()
+                samples.append(time.perf_counter() - started)
+            results[stage] = {
+                'median': statistics.median(samples),
+                'min': min(samples),
+                'items': items,
+            }
+    finally:
+        await suite.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Строки отчёта и список этапов, медленнее базовой линии больше чем на threshold"""
+    lines = []
+    regressions = []
+    for stage, result in results.items():
+        line = (f"   {stage:<16} {result['median'] * 1000:10.2f} мс  (мин {result['min'] * 1000:9.2f} мс, "
+                f"{result['items']} шт., {result['median'] / max(result['items'], 1) * 1e6:9.1f} мкс/шт.)")
+        base = baseline.get(stage) if baseline else None
+        if base:
+            ratio = result['median'] / base['median']
+            mark = '❌' if ratio > 1 + threshold else '✅'
+            line += f"  {mark} ×{ratio:.2f} к базовой"
+            if ratio > 1 + threshold:
+                regressions.append(stage)
+        lines.append(line)
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', default='small', choices=list(SCALES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--save', help="записать результаты как базовую линию (JSON)")
+    parser.add_argument('--compare', help="сравнить с базовой линией из JSON")
+    parser.add_argument('--threshold', type=float, default=0.25, help="допустимое замедление медианы, доля")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved['meta']['scale'] != args.scale:
+            parser.error(f"базовая линия снята на масштабе {saved['meta']['scale']}, а не {args.scale}")
+        baseline = saved['stages']
+
+    print(f"📊 Масштаб {args.scale} {SCALES[args.scale]}, повторов {args.repeat}", flush=True)
+    results = asyncio.run(run_suite(args))
+    lines, regressions = compare(results, baseline, args.threshold)
+    for line in lines:
+        print(line, flush=True)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'scale': args.scale,
+                    'repeat': args.repeat,
+                    'python': platform.python_version(),
+                    'machine': platform.machine(),
+                    'saved': time.strftime('%Y-%m-%d %H:%M:%S'),
+                },
+                'stages': results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"💾 Базовая линия записана: {args.save}", flush=True)
+
+    if regressions:
+        print(f"❌ Регрессия (порог +{args.threshold:.0%}): {', '.join(regressions)}", flush=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
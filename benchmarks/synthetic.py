@@ -0,0 +1,172 @@
+"""
+Синтетические данные для тестов производительности: база стихов той же
+схемы, что synodal.sqlite, и CSV плана в формате Google Sheets.
+
+Слова стихов распределены по Ципфу (как в настоящем тексте: немного частых
+слов и длинный хвост редких), ссылки плана — во всех поддерживаемых формах
+(стих, диапазон, список, целая глава, переход через главу) и всегда
+указывают на существующие стихи. Всё детерминировано по seed.
+
+Запуск из корня репозитория:
+    python benchmarks/synthetic.py --db /tmp/bench/synodal.sqlite --csv /tmp/bench/plan.csv --chapters 20 --weeks 520
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bible_ref import BOOK_ABBREVIATIONS, BOOK_NUMBERS  # noqa: E402
+
+# Возрастные группы плана (суффиксы столбцов); дополнительные треки — любые суффиксы
+PLAN_TRACKS = ('0_3', '3_15')
+
+
+def plan_columns(tracks=PLAN_TRACKS):
+    """Столбцы CSV плана для треков tracks"""
+    columns = ['start_date', 'status']
+    for track in tracks:
+        columns.extend([f'lesson_url_{track}', f'main_point_{track}', f'days_json_{track}'])
+    return columns
+
+
+_LETTERS = 'абвгдеёжзийклмнопрстуфхцчшщыэюя'
+
+
+def _vocabulary(rng, size):
+    return [
+        ''.join(rng.choice(_LETTERS) for _ in range(rng.randint(2, 10)))
+        for _ in range(size)
+    ]
+
+
+def chapter_sizes(chapters, verses, seed=1):
+    """{(книга, глава): число стихов} — от трети до полного verses стихов в главе"""
+    rng = random.Random(seed)
+    sizes = {}
+    for book in range(1, 67):
+        for chapter in range(1, rng.randint(max(1, chapters // 3), chapters) + 1):
+            sizes[(book, chapter)] = rng.randint(max(1, verses // 3), verses)
+    return sizes
+
+
+def make_db(path, chapters=20, verses=25, seed=1, vocabulary=20000):
+    """
+    Пишет базу стихов (66 книг, до chapters глав по до verses стихов).
+    Возвращает {(книга, глава): число стихов} для генератора плана
+    """
+    sizes = chapter_sizes(chapters, verses, seed)
+    rng = random.Random(seed)
+    words = _vocabulary(rng, vocabulary)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+
+    def verse_text():
+        text = ' '.join(rng.choices(words, weights, k=rng.randint(8, 30)))
+        return text[0].upper() + text[1:] + '.'
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE verses (book INTEGER, chapter INTEGER, verse INTEGER, text TEXT)")
+        with conn:
+            conn.executemany(
+                "INSERT INTO verses VALUES (?, ?, ?, ?)",
+                ((book, chapter, verse, verse_text())
+                 for (book, chapter), count in sorted(sizes.items())
+                 for verse in range(1, count + 1)),
+            )
+        conn.execute("CREATE INDEX verses_index ON verses(book, chapter, verse)")
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return sizes
+
+
+def _book_names():
+    """Номер книги -> варианты названия, как их пишут в таблице"""
+    names = {}
+    for aliases in (BOOK_NUMBERS, BOOK_ABBREVIATIONS):
+        for alias, number in aliases.items():
+            names.setdefault(number, []).append(' '.join(part.capitalize() for part in alias.split(' ')))
+    return names
+
+
+def make_ref(rng, sizes, names):
+    """Случайная существующая ссылка в одной из поддерживаемых форм"""
+    book, chapter = rng.choice(list(sizes))
+    count = sizes[(book, chapter)]
+    name = rng.choice(names[book])
+    verse = rng.randint(1, count)
+    form = rng.random()
+    if form < 0.45:
+        return f"{name} {chapter}:{verse}"
+    if form < 0.75:
+        return f"{name} {chapter}:{verse}-{min(count, verse + rng.randint(1, 8))}"
+    if form < 0.85:
+        others = sorted(rng.sample(range(1, count + 1), min(count, 3)))
+        return f"{name} {chapter}:{','.join(map(str, others))}"
+    if form < 0.95 or (book, chapter + 1) not in sizes:
+        return f"{name} {chapter}"
+    return f"{name} {chapter}:{verse}-{chapter + 1}:{rng.randint(1, sizes[(book, chapter + 1)])}"
+
+
+def make_plan_csv(path, sizes, weeks=52, start=date(2024, 1, 1), seed=2, tracks=PLAN_TRACKS):
+    """
+    Пишет CSV плана: weeks недель подряд с понедельника start, последняя
+    неделя помечена status=active, по набору столбцов на каждый трек из
+    tracks. Возвращает список всех ссылок плана
+    """
+    rng = random.Random(seed)
+    names = _book_names()
+    refs = []
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=plan_columns(tracks))
+        writer.writeheader()
+        for week in range(weeks):
+            row = {
+                'start_date': (start + timedelta(weeks=week)).strftime('%d.%m.%Y'),
+                'status': 'active' if week == weeks - 1 else '',
+            }
+            for group in tracks:
+                days = [
+                    {'ref': make_ref(rng, sizes, names), 'note': f"Заметка {week}.{day} <для родителей>"}
+                    for day in range(7)
+                ]
+                refs.extend(day['ref'] for day in days)
+                row[f'lesson_url_{group}'] = f"https://example.org/lessons/{group}/{week}"
+                row[f'main_point_{group}'] = f"Главная мысль недели {week} & группы {group}"
+                row[f'days_json_{group}'] = json.dumps(days, ensure_ascii=False)
+            writer.writerow(row)
+    os.replace(tmp_path, path)
+    return refs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default='synodal.sqlite')
+    parser.add_argument('--csv', default='plan.csv')
+    parser.add_argument('--chapters', type=int, default=20, help="глав в книге, не больше")
+    parser.add_argument('--verses', type=int, default=25, help="стихов в главе, не больше")
+    parser.add_argument('--weeks', type=int, default=52)
+    parser.add_argument('--start', default='2024-01-01', help="понедельник первой недели")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--tracks', default=','.join(PLAN_TRACKS), help="треки плана через запятую")
+    args = parser.parse_args()
+
+    sizes = make_db(args.db, args.chapters, args.verses, args.seed)
+    refs = make_plan_csv(args.csv, sizes, args.weeks, date.fromisoformat(args.start), args.seed + 1,
+                         args.tracks.split(','))
+    print(f"✅ {args.db}: {sum(sizes.values())} стихов в {len(sizes)} главах "
+          f"({os.path.getsize(args.db) / 1024 / 1024:.1f} МБ)", flush=True)
+    print(f"✅ {args.csv}: {args.weeks} недель, {len(refs)} ссылок "
+          f"({os.path.getsize(args.csv) / 1024:.0f} КБ)", flush=True)
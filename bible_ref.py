@@ -0,0 +1,379 @@
+"""
+Разбор библейских ссылок.
+
+Названия книг нормализуются (регистр, ё/е, точки, «1Кор» → «1 кор») и
+ищутся в префиксном дереве: побеждает самое длинное совпадение, за которым
+идёт граница слова, поэтому результат не зависит от порядка словаря.
+Незаконченный префикс принимается как сокращение, если он ведёт ровно
+к одной книге («быт», «откр»).
+
+Поддерживаемые формы после названия книги:
+    3:16          — один стих
+    22:1-3        — диапазон стихов
+    1:30-2:3      — диапазон через границу глав
+    3:16,18       — список (число после запятой — стих той же главы)
+    5:3-12; 6:9   — список через точку с запятой (каждый элемент с главы)
+    22  /  22-23  — целые главы
+"""
+import re
+from typing import NamedTuple
+
+# Конец главы: больше любого номера стиха
+WHOLE_CHAPTER = 999
+
+# Наибольший номер главы (Псалтирь, в Синодальном переводе — 151 псалом)
+# и предел отрезков в одной ссылке: ссылка вроде «Пс 1-3000000»
+# отклоняется до построения отрезков
+MAX_CHAPTER = 151
+MAX_SPANS = 200
+
+# =============================================================================
+# МАППИНГ КНИГ БИБЛИИ
+# =============================================================================
+BOOK_NUMBERS = {
+    'бытие': 1, 'бытия': 1, 'исход': 2, 'исхода': 2, 'левит': 3, 'левита': 3,
+    'числа': 4, 'чисел': 4, 'второзаконие': 5, 'второзакония': 5,
+    'иисус навин': 6, 'иисуса навина': 6, 'навин': 6,
+    'судьи': 7, 'судей': 7, 'руфь': 8, 'руфи': 8,
+    '1 царств': 9, '2 царств': 10, '3 царств': 11, '4 царств': 12,
+    '1 паралипоменон': 13, '2 паралипоменон': 14,
+    'ездра': 15, 'ездры': 15, 'неемия': 16, 'неемии': 16,
+    'есфирь': 17, 'есфири': 17, 'иов': 18, 'иова': 18,
+    'псалом': 19, 'псалтирь': 19, 'псалмы': 19,
+    'притчи': 20, 'екклесиаст': 21, 'екклесиаста': 21,
+    'песнь песней': 22, 'песни песней': 22,
+    'исаия': 23, 'исаии': 23, 'иеремия': 24, 'иеремии': 24,
+    'плач': 25, 'плач иеремии': 25,
+    'иезекииль': 26, 'иезекииля': 26, 'даниил': 27, 'даниила': 27,
+    'осия': 28, 'осии': 28, 'иоиль': 29, 'иоиля': 29,
+    'амос': 30, 'амоса': 30, 'авдий': 31, 'авдия': 31,
+    'иона': 32, 'ионы': 32, 'михей': 33, 'михея': 33,
+    'наум': 34, 'наума': 34, 'аввакум': 35, 'аввакума': 35,
+    'софония': 36, 'софонии': 36, 'аггей': 37, 'аггея': 37,
+    'захария': 38, 'захарии': 38, 'малахия': 39, 'малахии': 39,
+    # Новый Завет
+    'матфей': 40, 'матфея': 40, 'от матфея': 40,
+    'марк': 41, 'марка': 41, 'от марка': 41,
+    'лука': 42, 'луки': 42, 'от луки': 42,
+    'иоанн': 43, 'иоанна': 43, 'от иоанна': 43,
+    'деяния': 44, 'деяний': 44,
+    'римлянам': 45,
+    '1 коринфянам': 46, '2 коринфянам': 47,
+    'галатам': 48, 'ефесянам': 49, 'филиппийцам': 50, 'колоссянам': 51,
+    '1 фессалоникийцам': 52, '2 фессалоникийцам': 53,
+    '1 тимофею': 54, '2 тимофею': 55, 'титу': 56, 'филимону': 57,
+    'евреям': 58,
+    'иакова': 59, '1 петра': 60, '2 петра': 61,
+    '1 иоанна': 62, '2 иоанна': 63, '3 иоанна': 64,
+    'иуды': 65, 'откровение': 66, 'откровения': 66, 'апокалипсис': 66
+}
+
+# Общепринятые сокращения синодального перевода
+BOOK_ABBREVIATIONS = {
+    'быт': 1, 'исх': 2, 'лев': 3, 'чис': 4, 'втор': 5, 'нав': 6, 'иис нав': 6,
+    'суд': 7, 'руф': 8, '1 цар': 9, '2 цар': 10, '3 цар': 11, '4 цар': 12,
+    '1 пар': 13, '2 пар': 14, 'езд': 15, 'ездр': 15, 'неем': 16, 'есф': 17,
+    'пс': 19, 'псал': 19, 'псалтырь': 19, 'прит': 20, 'притч': 20, 'еккл': 21,
+    'песн': 22, 'ис': 23, 'иер': 24, 'иез': 26, 'дан': 27, 'ос': 28, 'иоил': 29,
+    'ам': 30, 'авд': 31, 'ион': 32, 'мих': 33, 'авв': 35, 'соф': 36, 'агг': 37,
+    'зах': 38, 'мал': 39,
+    'мф': 40, 'мат': 40, 'мк': 41, 'мар': 41, 'лк': 42, 'лук': 42, 'ин': 43, 'иоан': 43,
+    'деян': 44, 'рим': 45, '1 кор': 46, '2 кор': 47, 'гал': 48, 'еф': 49,
+    'флп': 50, 'фил': 50, 'кол': 51, '1 фес': 52, '2 фес': 53, '1 тим': 54, '2 тим': 55,
+    'тит': 56, 'флм': 57, 'евр': 58, 'иак': 59, '1 пет': 60, '2 пет': 61,
+    '1 ин': 62, '2 ин': 63, '3 ин': 64, 'иуд': 65, 'откр': 66, 'отк': 66,
+}
+
+BOOK_ALIASES = {**BOOK_NUMBERS, **BOOK_ABBREVIATIONS}
+
+# Украинские названия (перевод Огиенко) и сокращения
+BOOK_ALIASES_UK = {
+    'буття': 1, 'бут': 1, 'вихід': 2, 'вих': 2, 'левит': 3, 'лев': 3, 'числа': 4, 'чис': 4,
+    'повторення закону': 5, 'повт': 5, 'ісус навин': 6, 'іс нав': 6, 'нав': 6,
+    'судді': 7, 'суд': 7, 'рут': 8,
+    '1 самуїлова': 9, '1 сам': 9, '2 самуїлова': 10, '2 сам': 10,
+    '1 царів': 11, '1 цар': 11, '2 царів': 12, '2 цар': 12,
+    '1 хронік': 13, '1 хр': 13, '2 хронік': 14, '2 хр': 14,
+    'ездра': 15, 'езд': 15, 'неемія': 16, 'неем': 16, 'естер': 17, 'ест': 17, 'йов': 18,
+    'псалми': 19, 'псалом': 19, 'пс': 19, 'приповісті': 20, 'прип': 20,
+    'екклезіяст': 21, 'екл': 21, 'пісня над піснями': 22, 'пісн': 22,
+    'ісая': 23, 'іс': 23, 'єремія': 24, 'єр': 24, 'плач єремії': 25, 'плач': 25,
+    'єзекіїль': 26, 'єз': 26, 'даниїл': 27, 'дан': 27, 'осія': 28, 'ос': 28, 'йоіл': 29,
+    'амос': 30, 'ам': 30, 'овдій': 31, 'овд': 31, 'йона': 32, 'йон': 32, 'михей': 33, 'мих': 33,
+    'наум': 34, 'авакум': 35, 'ав': 35, 'софонія': 36, 'соф': 36, 'огій': 37, 'ог': 37,
+    'захарія': 38, 'зах': 38, 'малахія': 39, 'мал': 39,
+    'від матвія': 40, 'матвія': 40, 'матв': 40, 'мт': 40, 'від марка': 41, 'марка': 41, 'мк': 41,
+    'від луки': 42, 'луки': 42, 'лк': 42, 'від івана': 43, 'івана': 43, 'ів': 43,
+    'дії': 44, 'до римлян': 45, 'римлян': 45, 'рим': 45,
+    '1 до коринтян': 46, '1 коринтян': 46, '1 кор': 46, '2 до коринтян': 47, '2 коринтян': 47, '2 кор': 47,
+    'до галатів': 48, 'галатів': 48, 'гал': 48, 'до ефесян': 49, 'ефесян': 49, 'еф': 49,
+    "до филип'ян": 50, "филип'ян": 50, 'флп': 50, 'до колосян': 51, 'колосян': 51, 'кол': 51,
+    '1 до солунян': 52, '1 солунян': 52, '1 сол': 52, '2 до солунян': 53, '2 солунян': 53, '2 сол': 53,
+    '1 до тимофія': 54, '1 тимофія': 54, '1 тим': 54, '2 до тимофія': 55, '2 тимофія': 55, '2 тим': 55,
+    'до тита': 56, 'тита': 56, 'тит': 56, 'до филимона': 57, 'филимона': 57, 'флм': 57,
+    'до євреїв': 58, 'євреїв': 58, 'євр': 58, 'якова': 59, 'як': 59,
+    '1 петра': 60, '1 пет': 60, '2 петра': 61, '2 пет': 61,
+    '1 івана': 62, '1 ів': 62, '2 івана': 63, '2 ів': 63, '3 івана': 64, '3 ів': 64,
+    'юди': 65, 'юд': 65, "об'явлення": 66, "об'яв": 66,
+}
+
+# Английские названия и распространённые сокращения
+BOOK_ALIASES_EN = {
+    'genesis': 1, 'gen': 1, 'exodus': 2, 'exod': 2, 'ex': 2, 'leviticus': 3, 'lev': 3,
+    'numbers': 4, 'num': 4, 'deuteronomy': 5, 'deut': 5, 'dt': 5, 'joshua': 6, 'josh': 6,
+    'judges': 7, 'judg': 7, 'ruth': 8,
+    '1 samuel': 9, '1 sam': 9, '2 samuel': 10, '2 sam': 10, '1 kings': 11, '1 kgs': 11, '2 kings': 12, '2 kgs': 12,
+    '1 chronicles': 13, '1 chr': 13, '2 chronicles': 14, '2 chr': 14,
+    'ezra': 15, 'nehemiah': 16, 'neh': 16, 'esther': 17, 'esth': 17, 'job': 18,
+    'psalms': 19, 'psalm': 19, 'ps': 19, 'psa': 19, 'proverbs': 20, 'prov': 20,
+    'ecclesiastes': 21, 'eccl': 21, 'song of solomon': 22, 'song of songs': 22, 'song': 22,
+    'isaiah': 23, 'isa': 23, 'jeremiah': 24, 'jer': 24, 'lamentations': 25, 'lam': 25,
+    'ezekiel': 26, 'ezek': 26, 'daniel': 27, 'dan': 27, 'hosea': 28, 'hos': 28, 'joel': 29,
+    'amos': 30, 'obadiah': 31, 'obad': 31, 'jonah': 32, 'micah': 33, 'mic': 33, 'nahum': 34, 'nah': 34,
+    'habakkuk': 35, 'hab': 35, 'zephaniah': 36, 'zeph': 36, 'haggai': 37, 'hag': 37,
+    'zechariah': 38, 'zech': 38, 'malachi': 39, 'mal': 39,
+    'matthew': 40, 'matt': 40, 'mt': 40, 'mark': 41, 'mk': 41, 'luke': 42, 'lk': 42,
+    'john': 43, 'jn': 43, 'acts': 44, 'romans': 45, 'rom': 45,
+    '1 corinthians': 46, '1 cor': 46, '2 corinthians': 47, '2 cor': 47,
+    'galatians': 48, 'gal': 48, 'ephesians': 49, 'eph': 49, 'philippians': 50, 'phil': 50,
+    'colossians': 51, 'col': 51, '1 thessalonians': 52, '1 thess': 52, '2 thessalonians': 53, '2 thess': 53,
+    '1 timothy': 54, '1 tim': 54, '2 timothy': 55, '2 tim': 55, 'titus': 56, 'philemon': 57, 'phlm': 57,
+    'hebrews': 58, 'heb': 58, 'james': 59, 'jas': 59, '1 peter': 60, '1 pet': 60, '2 peter': 61, '2 pet': 61,
+    '1 john': 62, '1 jn': 62, '2 john': 63, '2 jn': 63, '3 john': 64, '3 jn': 64,
+    'jude': 65, 'revelation': 66, 'rev': 66,
+}
+
+# Таблицы названий по коду языка (для реестра переводов)
+LANGUAGE_ALIASES = {
+    'ru': BOOK_ALIASES,
+    'uk': BOOK_ALIASES_UK,
+    'en': BOOK_ALIASES_EN,
+}
+
+# Короткое название книги для вывода ссылок: первое сокращение из списка
+BOOK_SHORT_NAMES = {}
+for _alias, _number in BOOK_ABBREVIATIONS.items():
+    BOOK_SHORT_NAMES.setdefault(_number, ' '.join(part.capitalize() for part in _alias.split(' ')))
+for _alias, _number in BOOK_NUMBERS.items():
+    BOOK_SHORT_NAMES.setdefault(_number, ' '.join(part.capitalize() for part in _alias.split(' ')))
+del _alias, _number
+
+
+def format_ref(book, chapter, verse):
+    """Ссылка вида «Ин 3:16», которую снова понимает RefParser"""
+    return f"{BOOK_SHORT_NAMES.get(book, str(book))} {chapter}:{verse}"
+
+
+class VerseSpan(NamedTuple):
+    """Непрерывный отрезок стихов внутри одной главы"""
+    book: int
+    chapter: int
+    verse_start: int
+    verse_end: int
+
+
+class BibleRef(NamedTuple):
+    """Разобранная ссылка: книга и отрезки стихов в порядке чтения"""
+    book: int
+    spans: tuple
+
+    @property
+    def is_single_verse(self):
+        return len(self.spans) == 1 and self.spans[0].verse_start == self.spans[0].verse_end
+
+
+# =============================================================================
+# НОРМАЛИЗАЦИЯ
+# =============================================================================
+_DASHES_RE = re.compile(r'[‐-―−]')
+_PUNCT_RE = re.compile(r'[^\w:;,\-\s]')
+_SPACES_RE = re.compile(r'\s+')
+_SEPARATOR_SPACES_RE = re.compile(r'\s*([:;,\-])\s*')
+_NUMBERED_BOOK_RE = re.compile(r'^([1-4])\s*(?=[^\W\d_])')
+_ITEM_RE = re.compile(r'(\d+)(?::(\d+))?(?:-(\d+)(?::(\d+))?)?$')
+
+# Быстрый путь для уже «чистых» ссылок «Книга C:V» и «Книга C:V-V»
+_FAST_RE = re.compile(r'((?:[1-4] ?)?[^\W\d_]+(?: [^\W\d_]+)*) ?([1-9]\d*):(\d+)(?:-(\d+))?$')
+
+
+def normalize(text):
+    """Приводит ссылку или название книги к канонической форме для поиска"""
+    text = text.lower().replace('ё', 'е')
+    text = _DASHES_RE.sub('-', text)
+    text = _PUNCT_RE.sub(' ', text)
+    text = _SPACES_RE.sub(' ', text).strip()
+    text = _SEPARATOR_SPACES_RE.sub(r'\1', text)
+    return _NUMBERED_BOOK_RE.sub(r'\1 ', text)
+
+
+# =============================================================================
+# ПАРСЕР
+# =============================================================================
+
+class _TrieNode:
+    __slots__ = ('children', 'book', 'books')
+
+    def __init__(self):
+        self.children = {}
+        self.book = None      # книга, если здесь заканчивается псевдоним
+        self.books = set()    # все книги, достижимые из узла
+
+
+class RefParser:
+    """
+    Парсер ссылок над префиксным деревом псевдонимов книг.
+
+    Дерево строится один раз и разворачивается в словарь «название или
+    однозначный префикс → книга», так что обычная ссылка разбирается одним
+    регулярным выражением и одним поиском в словаре. Обход дерева остаётся
+    запасным путём для строк с лишними символами. Результаты неизменяемы,
+    поэтому повторяющиеся ссылки плана отдаются из небольшого кэша.
+    """
+
+    # Минимальная длина префикса, принимаемого как сокращение
+    MIN_PREFIX = 2
+
+    def __init__(self, aliases=None, cache_size=16384):
+        self.cache_size = cache_size
+        self._cache = {}
+        self._root = _TrieNode()
+        for alias, book in (aliases or BOOK_ALIASES).items():
+            node = self._root
+            node.books.add(book)
+            for char in normalize(alias):
+                node = node.children.setdefault(char, _TrieNode())
+                node.books.add(book)
+            node.book = book
+
+        self._lookup = {}
+        stack = [('', self._root)]
+        while stack:
+            path, node = stack.pop()
+            if node.book is not None:
+                self._lookup[path] = node.book
+            elif len(node.books) == 1 and len(path) >= self.MIN_PREFIX:
+                self._lookup[path] = next(iter(node.books))
+            stack.extend((path + char, child) for char, child in node.children.items())
+
+    def match_book(self, text):
+        """
+        Ищет название книги в начале нормализованной строки.
+        Возвращает (номер книги, длина совпадения) или None.
+        """
+        node = self._root
+        best = None
+        length = len(text)
+        for i, char in enumerate(text):
+            node = node.children.get(char)
+            if node is None:
+                break
+            following = text[i + 1] if i + 1 < length else ' '
+            if following != ' ' and not following.isdigit():
+                continue
+            if node.book is not None:
+                best = (node.book, i + 1)
+            elif len(node.books) == 1 and i + 1 >= self.MIN_PREFIX:
+                best = (next(iter(node.books)), i + 1)
+        return best
+
+    def parse(self, ref):
+        """
+        Разбирает ссылку в BibleRef.
+        При ошибке бросает ValueError с описанием причины.
+        """
+        parsed = self._cache.get(ref)
+        if parsed is None:
+            parsed = self._parse_uncached(ref)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[ref] = parsed
+        return parsed
+
+    def _parse_uncached(self, ref):
+        fast = _FAST_RE.match(ref.lower().replace('ё', 'е').strip())
+        if fast:
+            name, chapter, verse_start, verse_end = fast.groups()
+            if name[0] in '1234' and name[1] != ' ':
+                name = f"{name[0]} {name[1:]}"
+            book = self._lookup.get(name)
+            if book is not None:
+                verse_start = int(verse_start)
+                verse_end = int(verse_end) if verse_end else verse_start
+                if not 1 <= verse_start <= verse_end or int(chapter) > MAX_CHAPTER:
+                    raise ValueError(f"неверный диапазон в '{ref}'")
+                return BibleRef(book, (VerseSpan(book, int(chapter), verse_start, verse_end),))
+
+        text = normalize(ref)
+        match = self.match_book(text)
+        if match is None:
+            raise ValueError(f"книга не найдена: '{ref}'")
+        book, length = match
+        locator = text[length:].strip()
+        if not locator:
+            raise ValueError(f"нет главы и стиха: '{ref}'")
+        if ' ' in locator:
+            # «Ин 3:16 17» — не стих 1617: пробелы между числами не склеиваются
+            raise ValueError(f"пробел вместо разделителя в '{ref}'")
+        return BibleRef(book, self._parse_locator(book, locator, ref))
+
+    def _parse_locator(self, book, locator, ref):
+        """Разбирает часть после названия книги в кортеж VerseSpan"""
+        spans = []
+        items = []
+        for group in locator.split(';'):
+            # После точки с запятой элемент снова начинается с главы
+            items.append(None)
+            items.extend(group.split(','))
+        chapter = None  # глава предыдущего элемента, если он указывал стих
+        for item in items:
+            if item is None:
+                chapter = None
+                continue
+            item_match = _ITEM_RE.match(item)
+            if not item_match:
+                raise ValueError(f"не удалось разобрать '{item}' в '{ref}'")
+            first, first_verse, second, second_verse = (
+                int(group) if group else None for group in item_match.groups()
+            )
+
+            if first_verse is None and chapter is not None and second_verse is None:
+                # «3:16,18» и «3:16,18-20»: числа — стихи текущей главы
+                start = (chapter, first)
+                end = (chapter, second if second is not None else first)
+            elif first_verse is None:
+                # Целые главы: «22», «22-23», «22-23:5»
+                start = (first, 1)
+                if second is None:
+                    end = (first, WHOLE_CHAPTER)
+                else:
+                    end = (second, second_verse or WHOLE_CHAPTER)
+                chapter = end[0] if second_verse is not None else None
+            else:
+                start = (first, first_verse)
+                if second is None:
+                    end = start
+                elif second_verse is None:
+                    end = (first, second)
+                else:
+                    end = (second, second_verse)
+                chapter = end[0]
+
+            spans.extend(_spans_between(book, start, end, ref))
+            if len(spans) > MAX_SPANS:
+                raise ValueError(f"слишком много отрезков в '{ref}'")
+
+        return tuple(spans)
+
+
+def _spans_between(book, start, end, ref):
+    """Разбивает диапазон (глава, стих)–(глава, стих) на отрезки по главам"""
+    if min(start + end) < 1 or start > end or end[0] > MAX_CHAPTER:
+        raise ValueError(f"неверный диапазон в '{ref}'")
+    start_chapter, start_verse = start
+    end_chapter, end_verse = end
+    if start_chapter == end_chapter:
+        return [VerseSpan(book, start_chapter, start_verse, end_verse)]
+    spans = [VerseSpan(book, start_chapter, start_verse, WHOLE_CHAPTER)]
+    spans.extend(VerseSpan(book, chapter, 1, WHOLE_CHAPTER) for chapter in range(start_chapter + 1, end_chapter))
+    spans.append(VerseSpan(book, end_chapter, 1, end_verse))
+    return spans
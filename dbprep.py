@@ -0,0 +1,257 @@
+"""
+Подготовка базы стихов: `python main.py prepare-db`.
+
+Все чтения бота — это глава: WHERE book = ? AND chapter = ? [AND verse
+BETWEEN ? AND ?]. Инструмент проверяет, что у таблицы verses есть индекс,
+начинающийся с (book, chapter, verse), и что строки лежат в таблице в
+порядке (book, chapter, verse): тогда стихи главы занимают соседние
+страницы и запрос главы читает одну-две страницы таблицы. С --covering в
+индекс добавляется text — запросы обслуживаются одним индексом, но база
+становится примерно вдвое больше. Затем ANALYZE и VACUUM.
+
+Подготовка идёт на копии (VACUUM INTO), которая заменяет базу через
+os.replace: процессы, уже открывшие базу (VerseStore открывает её как
+immutable), дочитывают прежний файл — перезапустите их после подготовки.
+Спутники .idx и .fts перестроятся сами: они окажутся старше базы.
+
+До и после подготовки печатаются запросы и прочитанные страницы на неделях
+плана для трёх способов чтения: запрос на ссылку (как прежний
+get_verse_from_db), запрос на главу недели (fetch_many без LRU) и LRU глав
+с prefetch недели (--passes прогонов, как повторные рендеры переводов,
+макетов и команд бота).
+"""
+import argparse
+import os
+import sqlite3
+from urllib.parse import quote
+
+import main as bot
+from schedule_index import week_refs
+from verse_store import VerseStore
+
+INDEX_COLUMNS = ['book', 'chapter', 'verse']
+INDEX_NAME = 'verses_book_chapter_verse'
+COVERING_INDEX_NAME = 'verses_book_chapter_verse_text'
+
+# Способы чтения в отчёте: (ключ, подпись)
+STRATEGIES = [('per_ref', 'запрос на ссылку'), ('per_week', 'запрос на главу недели'), ('chapter_lru', 'LRU глав')]
+
+
+# =============================================================================
+# ПРОВЕРКА БАЗЫ
+# =============================================================================
+
+def _connect_ro(db_path):
+    return sqlite3.connect(f"file:{quote(os.path.abspath(db_path))}?mode=ro", uri=True)
+
+
+def inspect(db_path):
+    """Состояние базы: размер в страницах, индексы verses, порядок строк, статистика"""
+    conn = _connect_ro(db_path)
+    try:
+        info = {
+            'page_size': conn.execute("PRAGMA page_size").fetchone()[0],
+            'page_count': conn.execute("PRAGMA page_count").fetchone()[0],
+            'freelist_count': conn.execute("PRAGMA freelist_count").fetchone()[0],
+            'index': None,
+            'covering_index': None,
+        }
+        for _, name, *_ in conn.execute("PRAGMA index_list(verses)").fetchall():
+            columns = [column for _, _, column in conn.execute(f'PRAGMA index_info("{name}")')]
+            if columns[:3] == INDEX_COLUMNS:
+                info['index'] = info['index'] or name
+                if 'text' in columns[3:]:
+                    info['covering_index'] = name
+
+        table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'verses'").fetchone()[0]
+        primary_key = [row for row in conn.execute("PRAGMA table_info(verses)") if row[5]]
+        info['without_rowid'] = 'WITHOUT ROWID' in table_sql.upper()
+        # INTEGER PRIMARY KEY — это сам rowid: порядок строк не переставить, не меняя id
+        info['rowid_alias'] = len(primary_key) == 1 and primary_key[0][2].upper() == 'INTEGER'
+        if info['without_rowid']:
+            info['out_of_order'] = 0
+        else:
+            info['out_of_order'] = conn.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT book, chapter, verse,
+                           LAG(book) OVER w AS prev_book, LAG(chapter) OVER w AS prev_chapter,
+                           LAG(verse) OVER w AS prev_verse
+                    FROM verses WINDOW w AS (ORDER BY rowid)
+                )
+                WHERE (book, chapter, verse) < (prev_book, prev_chapter, prev_verse)
+            """).fetchone()[0]
+        info['analyzed'] = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).fetchone()[0] > 0 and conn.execute(
+            "SELECT COUNT(*) FROM sqlite_stat1 WHERE tbl = 'verses'"
+        ).fetchone()[0] > 0
+        return info
+    finally:
+        conn.close()
+
+
+def describe(db_path, info):
+    yes_no = lambda value: 'да' if value else 'нет'  # noqa: E731
+    return (
+        f"📊 {db_path}: {info['page_count']} страниц по {info['page_size']} Б "
+        f"({info['page_count'] * info['page_size'] / 1024 / 1024:.1f} МБ), свободных {info['freelist_count']}; "
+        f"индекс (book, chapter, verse): {info['index'] or 'нет'}; покрывающий: {info['covering_index'] or 'нет'}; "
+        f"строки по порядку глав: {yes_no(not info['out_of_order'])}; ANALYZE: {yes_no(info['analyzed'])}"
+    )
+
+
+# =============================================================================
+# ПОДГОТОВКА
+# =============================================================================
+
+def prepare(db_path, covering=False):
+    """
+    Индекс, порядок строк, ANALYZE и VACUUM на копии базы, затем атомарная
+    замена. Возвращает список выполненных действий
+    """
+    info = inspect(db_path)
+    tmp_path = f"{db_path}.prepare"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    source = _connect_ro(db_path)
+    try:
+        source.execute("VACUUM INTO ?", (tmp_path,))
+    finally:
+        source.close()
+
+    actions = []
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    try:
+        if info['out_of_order'] and info['rowid_alias']:
+            print("⚠️ Строки verses не по порядку глав, но id — INTEGER PRIMARY KEY: порядок не меняем", flush=True)
+        elif info['out_of_order']:
+            conn.execute("BEGIN")
+            conn.execute("CREATE TEMP TABLE verses_sorted AS SELECT * FROM verses ORDER BY book, chapter, verse")
+            conn.execute("DELETE FROM verses")
+            conn.execute("INSERT INTO verses SELECT * FROM verses_sorted ORDER BY book, chapter, verse")
+            conn.execute("DROP TABLE verses_sorted")
+            conn.execute("COMMIT")
+            actions.append(f"строки переложены по порядку глав ({info['out_of_order']} не на месте)")
+        if covering and info['covering_index'] is None:
+            conn.execute(f"CREATE INDEX {COVERING_INDEX_NAME} ON verses(book, chapter, verse, text)")
+            actions.append(f"создан покрывающий индекс {COVERING_INDEX_NAME}")
+        elif info['index'] is None:
+            conn.execute(f"CREATE INDEX {INDEX_NAME} ON verses(book, chapter, verse)")
+            actions.append(f"создан индекс {INDEX_NAME}")
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+        actions.append("ANALYZE и VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return actions
+
+
+# =============================================================================
+# ЗАМЕРЫ
+# =============================================================================
+
+def _read_bytes():
+    """Байты, прочитанные процессом через read() (Linux), или None"""
+    try:
+        with open('/proc/self/io', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def plan_weeks(schedule):
+    """Отрезки ссылок по неделям плана: [[(книга, глава, с, по), ...], ...]"""
+    weeks = []
+    for row in schedule.rows:
+        spans = []
+        for ref in set(week_refs(row)):
+            try:
+                spans.extend(bot.REF_PARSER.parse(ref).spans)
+            except ValueError:
+                continue
+        weeks.append(spans)
+    return weeks
+
+
+def measure(db_path, weeks, chapter_cache=64, passes=2):
+    """
+    {способ: (запросов, страниц)} на неделях weeks; каждая неделя читается
+    passes раз подряд (рендеры одного дня). Каждый способ — на
+    свежем соединении (пустой кэш страниц), страницы — прочитанные байты
+    файла базы в единицах page_size (None, если платформа не сообщает)
+    """
+    page_size = inspect(db_path)['page_size']
+    result = {}
+    for strategy, _ in STRATEGIES:
+        store = VerseStore(db_path, pool_size=1, max_workers=1,
+                           chapter_cache=chapter_cache if strategy == 'chapter_lru' else 0)
+        started = _read_bytes()
+        try:
+            for spans in weeks:
+                if strategy == 'chapter_lru':
+                    store.prefetch(spans)
+                for _ in range(passes):
+                    if strategy == 'per_ref':
+                        for span in spans:
+                            store.fetch(*span)
+                    else:
+                        store.fetch_many(spans)
+        finally:
+            store.close()
+        pages = None if started is None else round((_read_bytes() - started) / page_size)
+        result[strategy] = (store.queries, pages)
+    return result
+
+
+# =============================================================================
+# КОМАНДА prepare-db
+# =============================================================================
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(prog='main.py prepare-db', description="Индекс, порядок строк и VACUUM базы стихов")
+    parser.add_argument('--db', default=bot.DB_PATH)
+    parser.add_argument('--csv', help="локальный CSV плана вместо загрузки Google Sheets (для замеров)")
+    parser.add_argument('--covering', action='store_true', help="индекс (book, chapter, verse, text)")
+    parser.add_argument('--check', action='store_true', help="только проверить и замерить, не меняя базу")
+    parser.add_argument('--chapter-cache', type=int, default=bot.VERSE_CHAPTER_CACHE or 64)
+    parser.add_argument('--passes', type=int, default=2, help="прогонов недель в замере")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"❌ База данных не найдена: {args.db}", flush=True)
+        return 1
+
+    schedule = bot.read_schedule(args.csv)
+    weeks = plan_weeks(schedule) if schedule is not None and len(schedule) else []
+    if not weeks:
+        print("⚠️ План недоступен — замеры запросов пропускаются", flush=True)
+
+    info = inspect(args.db)
+    print(describe(args.db, info), flush=True)
+    before = measure(args.db, weeks, args.chapter_cache, args.passes) if weeks else None
+
+    after = None
+    if not args.check:
+        for action in prepare(args.db, args.covering):
+            print(f"✅ {action}", flush=True)
+        print(describe(args.db, inspect(args.db)), flush=True)
+        after = measure(args.db, weeks, args.chapter_cache, args.passes) if weeks else None
+
+    if before is not None:
+        spans = sum(map(len, weeks))
+        print(f"\n📊 {len(weeks)} недель, {spans} отрезков ссылок, прогонов {args.passes}, "
+              f"LRU {args.chapter_cache} глав", flush=True)
+        if after:
+            print(f"   {'':<24} {'до подготовки':>19} {'после':>19}", flush=True)
+        print(f"   {'':<24}" + f" {'запросов':>9} {'страниц':>9}" * (2 if after else 1), flush=True)
+        for strategy, title in STRATEGIES:
+            line = f"   {title:<24}" + ''.join(
+                f" {queries:>9} {'—' if pages is None else pages:>9}"
+                for queries, pages in [before[strategy]] + ([after[strategy]] if after else [])
+            )
+            print(line, flush=True)
+    return 0
@@ -0,0 +1,359 @@
+"""
+Рассылка сообщений во множество чатов.
+
+Пул asyncio-воркеров разбирает очередь (chat_id, текст). Перед каждой
+отправкой берутся токены из двух ведёр: общего (лимит Telegram на бота,
+~30 сообщений/с) и ведра конкретного чата (1 сообщение/с в личный чат,
+20 в минуту в группу). RetryAfter приостанавливает общее ведро на
+указанное время, сетевые ошибки повторяются с экспоненциальной задержкой.
+
+Сообщение длиннее лимита Telegram движок делит на части (split) до
+отправки: каждая часть берёт токены обоих ведёр и повторяется отдельно,
+так что повтор продолжает с той части, что не ушла, а не шлёт сообщение
+заново. on_part сообщает число отправленных частей — outbox запоминает его,
+и после перезапуска рассылка продолжается с первой неотправленной части.
+
+С параметром spread отправки равномерно распределяются по окну: i-й чат
+получает срок (i + случайная доля) * spread / n от начала — нагрузка ровная,
+без пика в первую секунду, а задержка считается от срока каждого чата.
+"""
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta
+from typing import NamedTuple
+
+import pytz
+
+
+class Subscription(NamedTuple):
+    """Чат, локальное время отправки сообщения дня, перевод и макет ('' — по умолчанию)"""
+    chat_id: str
+    timezone: str
+    send_time: dt_time
+    translation: str = ''
+    layout: str = ''
+
+
+def load_subscriptions(chat_ids='', subscribers_file='', default_timezone='Europe/Moscow',
+                       default_time=dt_time(4, 0)):
+    """
+    Подписки из TELEGRAM_CHAT_ID (через запятую, время по умолчанию) и файла
+    подписчиков. Строка файла: «chat_id [часовой пояс] [ЧЧ:ММ] [перевод]
+    [layout=макет]», '#' — комментарий; поля после chat_id — в любом порядке:
+
+        123456789
+        -1001234567890  Asia/Novosibirsk
+        987654321       America/New_York  07:30  kjv
+        -1009876543210  layout=short
+
+    Неизвестный пояс или неверное время заменяются значениями по умолчанию.
+    Для повторяющегося chat_id действует первая строка.
+    """
+    result = [
+        Subscription(chat_id.strip(), default_timezone, default_time)
+        for chat_id in (chat_ids or '').split(',') if chat_id.strip()
+    ]
+    if subscribers_file and os.path.exists(subscribers_file):
+        with open(subscribers_file, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                fields = line.split('#', 1)[0].split()
+                if fields:
+                    result.append(_parse_subscription(fields, number, default_timezone, default_time))
+    unique = {}
+    for subscription in result:
+        unique.setdefault(subscription.chat_id, subscription)
+    return list(unique.values())
+
+
+def _parse_subscription(fields, number, default_timezone, default_time):
+    chat_id, timezone, send_time, translation, layout = fields[0], default_timezone, default_time, '', ''
+    for field in fields[1:5]:
+        if field.startswith('layout='):
+            layout = field[len('layout='):]
+        elif ':' in field and field[0].isdigit():
+            try:
+                send_time = datetime.strptime(field, '%H:%M').time()
+            except ValueError:
+                print(f"⚠️ Подписчики, строка {number}: неверное время '{field}'", flush=True)
+        elif field in pytz.all_timezones_set:
+            timezone = field
+        elif '/' in field:
+            print(f"⚠️ Подписчики, строка {number}: неизвестный часовой пояс '{field}'", flush=True)
+        else:
+            translation = field.lower()
+    return Subscription(chat_id, timezone, send_time, translation, layout)
+
+
+class DeliveryBucket(NamedTuple):
+    """Группа чатов с одинаковым часовым поясом, временем отправки, переводом и макетом"""
+    timezone: str
+    send_time: dt_time
+    translation: str = ''
+    layout: str = ''
+
+    @property
+    def key(self):
+        key = f"{self.timezone} {self.send_time:%H:%M}"
+        if self.translation:
+            key = f"{key} {self.translation}"
+        return f"{key} layout={self.layout}" if self.layout else key
+
+    def local_now(self):
+        return datetime.now(pytz.timezone(self.timezone))
+
+
+def group_by_bucket(subscriptions):
+    """{DeliveryBucket: [chat_id, ...]} в порядке подписок"""
+    buckets = {}
+    for subscription in subscriptions:
+        bucket = DeliveryBucket(
+            subscription.timezone, subscription.send_time, subscription.translation, subscription.layout,
+        )
+        buckets.setdefault(bucket, []).append(subscription.chat_id)
+    return buckets
+
+
+# Как часто (в секундах) движок убирает простаивающие вёдра чатов
+CHAT_BUCKET_SWEEP_INTERVAL = 60.0
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity подряд"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def idle(self, now):
+        """Ведро полно, не на паузе и не занято — оно неотличимо от нового"""
+        return (not self._lock.locked() and now >= self.blocked_until
+                and self.tokens + (now - self.updated) * self.rate >= self.capacity)
+
+    def pause(self, seconds):
+        """Запрещает выдачу токенов на seconds секунд (ответ RetryAfter)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DeliveryReport:
+    """Итоги одной рассылки: счётчики, пропускная способность и задержки"""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.failures = []      # (chat_id, текст ошибки)
+        self.latencies = []     # секунды от срока отправки (или начала рассылки) до доставки
+        self.started = time.monotonic()
+        self.duration = 0.0
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    @property
+    def throughput(self):
+        return self.sent / self.duration if self.duration else 0.0
+
+    def summary(self):
+        return (
+            f"📊 Доставлено {self.sent}, ошибок {self.failed}, повторов {self.retries} "
+            f"за {self.duration:.2f} с ({self.throughput:.1f} сообщ./с); "
+            f"задержка p50 {self.percentile(50):.2f} с, p95 {self.percentile(95):.2f} с, "
+            f"p99 {self.percentile(99):.2f} с"
+        )
+
+
+class DeliveryEngine:
+    """
+    Рассылка через send(chat_id, text) — корутину, которая бросает
+    исключения telegram.error (например, bot.send_message с parse_mode).
+    Один движок используется на весь процесс, чтобы лимиты чатов и
+    паузы RetryAfter сохранялись между запусками.
+    """
+
+    def __init__(self, send, workers=16, global_rate=25.0, private_rate=1.0, group_rate=20 / 60,
+                 max_attempts=5, base_backoff=1.0, split=None):
+        self.send = send
+        self.split = split or (lambda text: [text])
+        self.workers = workers
+        self.global_bucket = TokenBucket(global_rate)
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self._chat_buckets = {}
+        self._next_sweep = time.monotonic() + CHAT_BUCKET_SWEEP_INTERVAL
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            self._sweep_chat_buckets()
+            # Отрицательные id — группы и каналы
+            rate = self.group_rate if str(chat_id).startswith('-') else self.private_rate
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, capacity=1)
+        return bucket
+
+    def _sweep_chat_buckets(self):
+        """
+        Убирает вёдра чатов, простоявшие достаточно, чтобы наполниться:
+        иначе словарь растёт с каждым чатом, получившим хоть одно сообщение
+        (включая всех, кто писал боту команды)
+        """
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + CHAT_BUCKET_SWEEP_INTERVAL
+        for chat_id in [chat_id for chat_id, bucket in self._chat_buckets.items() if bucket.idle(now)]:
+            del self._chat_buckets[chat_id]
+
+    async def _send_with_retry(self, chat_id, text, report):
+        """Отправка одной части с повторами; возвращает (chat_id, None или текст ошибки)"""
+        # Пакет telegram тяжёлый — импортируется при первой рассылке, а не при запуске
+        from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter
+
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            await self._chat_bucket(chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                await self.send(chat_id, text)
+                return chat_id, None
+            except RetryAfter as e:
+                delay = _seconds(e.retry_after)
+                self.global_bucket.pause(delay)
+                error = e
+            except ChatMigrated as e:
+                chat_id = e.new_chat_id
+                delay = 0
+                error = e
+            except (BadRequest, Forbidden) as e:
+                return chat_id, str(e)
+            except NetworkError as e:
+                delay = self.base_backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                error = e
+            except Exception as e:
+                # Прочие ошибки не повторяем, но и не роняем всю рассылку
+                return chat_id, str(e)
+            if attempt < self.max_attempts:
+                report.retries += 1
+                await asyncio.sleep(delay)
+        return chat_id, str(error)
+
+    async def _send_parts(self, chat_id, parts, start, report, on_part=None):
+        """
+        Отправляет части parts, начиная с номера start; после каждой
+        отправленной части вызывает on_part(chat_id, отправлено частей).
+        Возвращает None или текст ошибки
+        """
+        target = chat_id
+        for number in range(start, len(parts)):
+            target, error = await self._send_with_retry(target, parts[number], report)
+            if error is not None:
+                return error
+            if on_part is not None:
+                await on_part(chat_id, number + 1)
+        return None
+
+    async def deliver(self, items, on_result=None, before_send=None, on_part=None, spread=0.0, seed=None):
+        """
+        Рассылает items — пары (chat_id, text) или тройки (chat_id, text,
+        уже отправлено частей).
+        before_send(chat_id) — необязательная корутина перед первой попыткой,
+        on_part(chat_id, parts_sent) — после каждой отправленной части,
+        on_result(chat_id, error) — после отправки (error is None при успехе).
+        spread — окно в секундах, по которому распределяются отправки; оно
+        не бывает короче, чем позволяет общий лимит. seed фиксирует порядок
+        чатов и сдвиги (например, дата рассылки), иначе они случайны.
+        """
+        report = DeliveryReport()
+        items = list(items)
+        due = [report.started] * len(items)
+        if spread > 0 and items:
+            rng = random.Random(seed)
+            rng.shuffle(items)
+            window = max(spread, len(items) / self.global_bucket.rate)
+            slot = window / len(items)
+            due = [report.started + (i + rng.random()) * slot for i in range(len(items))]
+        # Очередь по сроку: (срок части, номер, chat_id, адресат, части, номер части, срок чата).
+        # После части чат возвращается в очередь со сроком следующего токена
+        # своего ведра, и воркер тем временем обслуживает другие чаты
+        queue = asyncio.PriorityQueue()
+        # Рассылка обычно шлёт один текст всем чатам — делим его один раз
+        parts_of = {}
+        for number, ((chat_id, text, *rest), item_due) in enumerate(zip(items, due)):
+            parts = parts_of.get(text)
+            if parts is None:
+                parts = parts_of[text] = self.split(text)
+            queue.put_nowait((item_due, number, chat_id, chat_id, parts, rest[0] if rest else 0, item_due))
+
+        async def finish(chat_id, error, item_due):
+            if error is None:
+                report.sent += 1
+                report.latencies.append(time.monotonic() - item_due)
+            else:
+                report.failed += 1
+                report.failures.append((chat_id, error))
+            if on_result is not None:
+                await on_result(chat_id, error)
+
+        async def worker():
+            while True:
+                try:
+                    part_due, number, chat_id, target, parts, part, item_due = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                delay = part_due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if part_due == item_due and before_send is not None:
+                    await before_send(chat_id)
+                if part >= len(parts):
+                    await finish(chat_id, None, item_due)
+                    continue
+                target, error = await self._send_with_retry(target, parts[part], report)
+                if error is None and on_part is not None:
+                    await on_part(chat_id, part + 1)
+                if error is not None or part + 1 == len(parts):
+                    await finish(chat_id, error, item_due)
+                    continue
+                next_due = time.monotonic() + 1 / self._chat_bucket(target).rate
+                queue.put_nowait((next_due, number, chat_id, target, parts, part + 1, item_due))
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, queue.qsize()))))
+        report.duration = time.monotonic() - report.started
+        return report
+
+    async def send_one(self, chat_id, text):
+        """
+        Одно сообщение вне рассылки (ответ на команду) с теми же лимитами
+        и повторами. Возвращает None или текст ошибки
+        """
+        return await self._send_parts(chat_id, self.split(text), 0, DeliveryReport())
+
+
+def _seconds(retry_after):
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
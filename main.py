@@ -1,330 +1,462 @@
+from startup import STARTUP
 import os
-import json
 import asyncio
-import csv
+import hashlib
 from datetime import datetime, timedelta, time
 import pytz
-from telegram import Bot
-from telegram.error import TelegramError
-import httpx
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from aiohttp import web
-import sqlite3
+
+from delivery import DeliveryEngine, group_by_bucket, load_subscriptions
+from metrics import REGISTRY, log_event, timed
+from outbox import Outbox
+from api import PlanAPI
+from bible_ref import BOOK_ALIASES, RefParser
+from render_cache import RenderCache
+from schedule_index import ScheduleBuilder, ScheduleIndex, week_refs
+from templates import MessageRenderer, split_message
+from sheet_source import ConditionalFetcher, SheetRefresher
+from verse_store import VerseStore
+from text_index import TextIndex
+from verse_search import VerseSearch
+from webhook import WebhookBot
+from translations import Translation, TranslationRegistry
 
 # =============================================================================
 # КОНФИГУРАЦИЯ
 # =============================================================================
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')  # можно несколько через запятую
+SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE', '')  # дополнительные chat_id, по одному в строке
 GOOGLE_SHEET_ID = os.getenv('GOOGLE_SHEET_ID')
 GOOGLE_SHEET_GID = os.getenv('GOOGLE_SHEET_GID', '0')
 PORT = int(os.getenv('PORT', 8080))
 
-# Timezone для планировщика
+# Адреса внешних сервисов (переопределяются для локальных имитаций в benchmarks/)
+GOOGLE_SHEETS_URL = os.getenv('GOOGLE_SHEETS_URL', 'https://docs.google.com').rstrip('/')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
+
+# Рассылка: число воркеров и общий лимит сообщений в секунду
+DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', 16))
+DELIVERY_RATE = float(os.getenv('DELIVERY_RATE', 25))
+
+# Часовой пояс по умолчанию (подписчики без своего пояса в SUBSCRIBERS_FILE)
 TIMEZONE = pytz.timezone('Europe/Moscow')  # UTC+3
 
 # Путь к базе данных
-DB_PATH = 'synodal.sqlite'
+DB_PATH = os.getenv('DB_PATH', 'synodal.sqlite')
+
+# Каталог для кэша таблицы и отрендеренных недель
+CACHE_DIR = os.getenv('CACHE_DIR', 'cache')
+
+# Фоновое обновление снимка таблицы: интервал и таймаут загрузки (секунды),
+# число попыток с экспоненциальной задержкой. Рассылка читает только снимок
+SHEET_REFRESH_INTERVAL = float(os.getenv('SHEET_REFRESH_INTERVAL', 900))
+SHEET_FETCH_TIMEOUT = float(os.getenv('SHEET_FETCH_TIMEOUT', 30))
+SHEET_FETCH_ATTEMPTS = int(os.getenv('SHEET_FETCH_ATTEMPTS', 4))
+# Возраст снимка, после которого рассылка предупреждает об устаревшем плане
+SHEET_STALE_AFTER = float(os.getenv('SHEET_STALE_AFTER', 24 * 3600))
+
+# Outbox: состояние рассылок по (день, чат), переживает перезапуски
+OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'outbox.sqlite')
+
+# Время ежедневной рассылки по умолчанию (местное время подписчика)
+DAILY_JOB_TIME = time(4, 0)
+
+# Окно в секундах, по которому распределяются отправки одной группы
+# (часовой пояс + время) — вместо всплеска в одну секунду
+DELIVERY_WINDOW = float(os.getenv('DELIVERY_WINDOW', 60))
+
+# Режим индекса текста: '' — запросы к SQLite, 'memory' — весь перевод в памяти,
+# 'mmap' — файл-спутник VERSE_INDEX_PATH, общий для нескольких процессов
+VERSE_INDEX_MODE = os.getenv('VERSE_INDEX_MODE', '').strip().lower()
+VERSE_INDEX_PATH = os.getenv('VERSE_INDEX_PATH', f'{DB_PATH}.idx')
+
+# Дополнительные переводы: JSON-список описаний (см. translations.py).
+# Открытыми одновременно держится не больше MAX_OPEN_TRANSLATIONS баз
+TRANSLATIONS_FILE = os.getenv('TRANSLATIONS_FILE', 'translations.json')
+MAX_OPEN_TRANSLATIONS = int(os.getenv('MAX_OPEN_TRANSLATIONS', 2))
+
+# Собственные треки и макеты сообщений: JSON-файл (см. templates.py)
+TEMPLATES_FILE = os.getenv('TEMPLATES_FILE', 'templates.json')
+
+# Полнотекстовый поиск (/search): индекс FTS5 рядом с базой, строится при
+# первом запуске. Пустое значение отключает поиск
+VERSE_SEARCH_PATH = os.getenv('VERSE_SEARCH_PATH', f'{DB_PATH}.fts')
+
+# Интерактивный режим (/today, /week, /verse): публичный адрес сервиса,
+# на который Telegram шлёт обновления (WEBHOOK_URL/telegram). Пустое значение —
+# только рассылка. Секрет вебхука по умолчанию выводится из токена бота
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '').rstrip('/')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or hashlib.sha256(
+    f"webhook:{TELEGRAM_BOT_TOKEN}".encode('utf-8')).hexdigest()[:32]
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', 32))
+BOT_QUEUE_SIZE = int(os.getenv('BOT_QUEUE_SIZE', 10000))
+
+# LRU глав в хранилище стихов: глава читается одним запросом и
+# переиспользуется всеми ссылками недели (0 — отключить)
+VERSE_CHAPTER_CACHE = int(os.getenv('VERSE_CHAPTER_CACHE', 64))
+
+# Пул read-only соединений к базе стихов (соединения открываются лениво)
+VERSE_STORE = VerseStore(DB_PATH, chapter_cache=VERSE_CHAPTER_CACHE)
+
+# Источник текстов: VERSE_STORE или TextIndex (выбирается при запуске)
+VERSE_SOURCE = VERSE_STORE
+
+# Парсер ссылок (префиксное дерево по названиям и сокращениям книг)
+REF_PARSER = RefParser(BOOK_ALIASES)
+
+# Индекс полнотекстового поиска (загружается в main)
+VERSE_SEARCH = None
+
+# Реестр переводов; основной перевод читается через VERSE_SOURCE
+TRANSLATIONS = TranslationRegistry.from_file(
+    TRANSLATIONS_FILE,
+    default=Translation('synodal', 'Синодальный', 'ru', DB_PATH),
+    max_open=MAX_OPEN_TRANSLATIONS,
+)
 
 # =============================================================================
-# МАППИНГ КНИГ БИБЛИИ (в нижнем регистре для гибкого поиска)
+# ШАБЛОНЫ СООБЩЕНИЙ
 # =============================================================================
-BOOK_NUMBERS = {
-    'бытие': 1, 'бытия': 1, 'исход': 2, 'исхода': 2, 'левит': 3, 'левита': 3,
-    'числа': 4, 'чисел': 4, 'второзаконие': 5, 'второзакония': 5,
-    'иисус навин': 6, 'иисуса навина': 6, 'навин': 6,
-    'судьи': 7, 'судей': 7, 'руфь': 8, 'руфи': 8,
-    '1 царств': 9, '2 царств': 10, '3 царств': 11, '4 царств': 12,
-    '1 паралипоменон': 13, '2 паралипоменон': 14,
-    'ездра': 15, 'ездры': 15, 'неемия': 16, 'неемии': 16,
-    'есфирь': 17, 'есфири': 17, 'иов': 18, 'иова': 18,
-    'псалом': 19, 'псалтирь': 19, 'псалмы': 19,
-    'притчи': 20, 'екклесиаст': 21, 'екклесиаста': 21,
-    'песнь песней': 22, 'песни песней': 22,
-    'исаия': 23, 'исаии': 23, 'иеремия': 24, 'иеремии': 24,
-    'плач': 25, 'плач иеремии': 25,
-    'иезекииль': 26, 'иезекииля': 26, 'даниил': 27, 'даниила': 27,
-    'осия': 28, 'осии': 28, 'иоиль': 29, 'иоиля': 29,
-    'амос': 30, 'амоса': 30, 'авдий': 31, 'авдия': 31,
-    'иона': 32, 'ионы': 32, 'михей': 33, 'михея': 33,
-    'наум': 34, 'наума': 34, 'аввакум': 35, 'аввакума': 35,
-    'софония': 36, 'софонии': 36, 'аггей': 37, 'аггея': 37,
-    'захария': 38, 'захарии': 38, 'малахия': 39, 'малахии': 39,
-    # Новый Завет
-    'матфей': 40, 'матфея': 40, 'от матфея': 40,
-    'марк': 41, 'марка': 41, 'от марка': 41,
-    'лука': 42, 'луки': 42, 'от луки': 42,
-    'иоанн': 43, 'иоанна': 43, 'от иоанна': 43,
-    'деяния': 44, 'деяний': 44,
-    'римлянам': 45,
-    '1 коринфянам': 46, '2 коринфянам': 47,
-    'галатам': 48, 'ефесянам': 49, 'филиппийцам': 50, 'колоссянам': 51,
-    '1 фессалоникийцам': 52, '2 фессалоникийцам': 53,
-    '1 тимофею': 54, '2 тимофею': 55, 'титу': 56, 'филимону': 57,
-    'евреям': 58,
-    'иакова': 59, '1 петра': 60, '2 петра': 61,
-    '1 иоанна': 62, '2 иоанна': 63, '3 иоанна': 64,
-    'иуды': 65, 'откровение': 66, 'откровения': 66, 'апокалипсис': 66
-}
+# Треки (возрастные группы) находятся по столбцам days_json_<трек> таблицы;
+# встроенный макет default повторяет прежнее сообщение для 3-15 и 0-3 лет
+RENDERER = MessageRenderer.from_file(TEMPLATES_FILE)
 
 # =============================================================================
-# ШАБЛОН СООБЩЕНИЯ
+# КЭШИ
 # =============================================================================
-MESSAGE_TEMPLATE_COMBINED = """<i>{date_formatted}</i>
+# Условная загрузка CSV (ETag / Last-Modified / хэш содержимого)
+SHEET_FETCHER = ConditionalFetcher(CACHE_DIR)
+
+# Отрендеренные недели; смена треков или макетов меняет все ключи
+RENDER_CACHE = RenderCache(
+    os.path.join(CACHE_DIR, 'renders'),
+    salt=RENDERER.salt,
+)
+
+# Индекс недель плана (сохраняется на диск, поиск недели без сети)
+SCHEDULE_INDEX_PATH = os.path.join(CACHE_DIR, 'schedule.json')
+_SCHEDULE = None
+
+# Фоновое обновление снимка расписания (запускается в main)
+SHEET_REFRESHER = SheetRefresher(
+    lambda: fetch_schedule(),
+    SCHEDULE_INDEX_PATH,
+    interval=SHEET_REFRESH_INTERVAL,
+    attempts=SHEET_FETCH_ATTEMPTS,
+)
+
+# Метрики, которые не сводятся к длительности одной функции
+VERSE_REFS = REGISTRY.counter('verse_refs_total', "Ссылки, запрошенные из базы стихов", ['result'])
+DELIVERY_MESSAGES = REGISTRY.counter('delivery_messages_total', "Итоги отправки сообщений", ['result'])
+DELIVERY_RETRIES = REGISTRY.counter('delivery_retries_total', "Повторные попытки отправки")
+
+# telegram, httpx и apscheduler импортируются лениво (STARTUP.lazy_import):
+# до ответа /health загружаются только aiohttp и модули бота
+STARTUP.mark('import main')
 
-🚀 <b>ДЕТЯМ И ПОДРОСТКАМ 3-15 ЛЕТ</b>
+# =============================================================================
+# ФУНКЦИИ ДЛЯ РАБОТЫ С БИБЛИЕЙ
+# =============================================================================
 
-{ref_3_15}
+@timed('bible_ref_parse', "Разбор библейской ссылки", failed=lambda parsed: parsed is None)
+def parse_bible_ref(ref):
+    """
+    Парсит библейскую ссылку типа 'Исход 3:4', 'Псалтирь 22:1-3',
+    'Быт 1:30-2:3', 'Ин 3:16,18' или 'Пс 22'
+    Возвращает: BibleRef(book, spans) или None
+    """
+    try:
+        return REF_PARSER.parse(ref)
+    except Exception as e:
+        print(f"❌ Ошибка парсинга ссылки '{ref}': {e}", flush=True)
+        return None
 
-❤️ {verse_text_3_15}
 
-<b>Основная мысль урока</b> (можно подчеркнуть при рассуждении над текстом Библии):
+def _not_found_text(ref, parsed):
+    """Текст-заглушка для ненайденного стиха или диапазона"""
+    if parsed.is_single_verse:
+        return f"[Стих не найден: {ref}]"
+    return f"[Стихи не найдены: {ref}]"
 
-✅ {main_point_3_15}
 
-<b>Прочитать текст урока, дети 3-15 лет:</b>
-{lesson_url_3_15}
+def get_verse_from_db(ref):
+    """
+    Получает текст стиха из SQLite базы данных по ссылке
+    """
+    return get_verses_from_db([ref])[ref]
+
+
+def _fetch_spans(spans, translation=None, native=False):
+    """
+    Тексты отрезков: основной перевод — из VERSE_SOURCE, остальные — через
+    реестр (native=True — отрезки уже в нумерации перевода)
+    """
+    if not translation or translation == TRANSLATIONS.default:
+        return VERSE_SOURCE.fetch_many(spans)
+    return TRANSLATIONS.fetch_many(spans, translation, native)
+
 
+@timed('verse_lookup', "Получение текстов стихов из базы")
+def get_verses_from_db(refs, translation=None, errors=None):
+    """
+    Получает тексты сразу для нескольких ссылок (один запрос на главу)
+    в переводе translation (None — основной). Возвращает словарь {ref: текст}.
+    Ссылки, текст которых не удалось прочитать из БД (в словаре вместо
+    него заглушка), добавляются в список errors, если он передан
+    """
+    parsed_refs = {ref: parse_bible_ref(ref) for ref in set(refs)}
+    texts = {ref: f"[Не удалось найти текст для {ref}]" for ref, parsed in parsed_refs.items() if not parsed}
+    found = [span for parsed in parsed_refs.values() if parsed for span in parsed.spans]
+    
+    try:
+        fetched = _fetch_spans(found, translation)
+    except Exception as e:
+        print(f"❌ Ошибка чтения из БД для {len(found)} ссылок: {e}", flush=True)
+        fetched = None
+    
+    for ref, parsed in parsed_refs.items():
+        if not parsed:
+            VERSE_REFS.inc(labels=('unparsable',))
+            continue
+        if fetched is None:
+            VERSE_REFS.inc(labels=('error',))
+            texts[ref] = f"[Ошибка получения текста для {ref}]"
+            if errors is not None:
+                errors.append(ref)
+            continue
+        text = _join_spans(parsed, fetched)
+        VERSE_REFS.inc(labels=('found' if text else 'not_found',))
+        texts[ref] = text or _not_found_text(ref, parsed)
+    
+    return texts
 
-🧸 <b>ДЕТЯМ ОТ 0 ДО 3 ЛЕТ</b>
 
-{ref_0_3}
+def find_verses(refs, translation=None):
+    """
+    Тексты для ссылок из внешних запросов (API, команды бота):
+    {ref: текст или None}, без заглушек и без записи в лог.
+    Ссылки понимаются на языке перевода и по-русски
+    """
+    parsed_refs = {}
+    for ref in set(refs):
+        try:
+            parsed_refs[ref] = TRANSLATIONS.parse(ref, translation) if translation else (REF_PARSER.parse(ref), False)
+        except ValueError:
+            parsed_refs[ref] = (None, False)
+    # Ссылки на языке перевода — в его нумерации, русские — в синодальной
+    fetched = {
+        native: _fetch_spans(
+            [span for parsed, is_native in parsed_refs.values() if parsed and is_native == native
+             for span in parsed.spans],
+            translation,
+            native,
+        )
+        for native in (False, True)
+    }
+    return {
+        ref: _join_spans(parsed, fetched[native]) if parsed else None
+        for ref, (parsed, native) in parsed_refs.items()
+    }
 
-❤️ {verse_text_0_3}
-<i>{note_0_3}</i>
 
-<b>Основная мысль урока</b> (можно подчеркнуть при рассуждении над текстом Библии):
+def prefetch_verses(rows):
+    """
+    Загружает в LRU глав тексты всех ссылок недель rows (по запросу на
+    главу). Возвращает число прочитанных из базы глав
+    """
+    prefetch = getattr(VERSE_SOURCE, 'prefetch', None)
+    if prefetch is None:
+        # Индекс текста уже в памяти — загружать нечего
+        return 0
+    parsed_refs = (parse_bible_ref(ref) for row in rows for ref in set(week_refs(row)))
+    return prefetch([span for parsed in parsed_refs if parsed for span in parsed.spans])
 
-✅ {main_point_0_3}
 
-<b>Прочитать текст урока, дети 0-3 лет:</b>
-{lesson_url_0_3}"""
+def _join_spans(parsed, fetched):
+    """Склеивает найденные отрезки ссылки; None, если не найдено ничего"""
+    found_texts = [fetched[span] for span in parsed.spans if fetched[span] is not None]
+    return ' '.join(found_texts) if found_texts else None
 
-# =============================================================================
-# ФУНКЦИИ ДЛЯ РАБОТЫ С БИБЛИЕЙ
-# =============================================================================
 
-def parse_bible_ref(ref):
+def load_verse_index():
     """
-    Парсит библейскую ссылку типа 'Исход 3:4' или 'Псалтирь 22:1-3'
-    Возвращает: (book_number, chapter, verse_start, verse_end)
+    Загружает индекс текста согласно VERSE_INDEX_MODE.
+    Возвращает источник текстов (при ошибке — VERSE_STORE).
     """
+    if not VERSE_INDEX_MODE:
+        return VERSE_STORE
+    
     try:
-        ref = ref.strip()
-        # Разделяем книгу и главу:стих
-        parts = ref.split()
-        
-        # Обрабатываем случаи с номером книги (например, "1 Царств")
-        if parts[0].isdigit():
-            book_name = f"{parts[0]} {parts[1]}".lower()
-            chapter_verse = parts[2]
-        else:
-            book_name = parts[0].lower()
-            chapter_verse = parts[1]
-        
-        # Получаем номер книги
-        book_number = BOOK_NUMBERS.get(book_name)
-        
-        # Если не нашли точное совпадение, пробуем найти частичное
-        if not book_number:
-            for key, value in BOOK_NUMBERS.items():
-                if book_name in key or key in book_name:
-                    book_number = value
-                    break
-        
-        if not book_number:
-            print(f"⚠️ Книга '{book_name}' не найдена в маппинге", flush=True)
-            return None
-        
-        # Парсим главу и стихи
-        chapter_verse_parts = chapter_verse.split(':')
-        chapter = int(chapter_verse_parts[0])
-        
-        # Обрабатываем диапазон стихов (например, "1-3")
-        if '-' in chapter_verse_parts[1]:
-            verse_parts = chapter_verse_parts[1].split('-')
-            verse_start = int(verse_parts[0])
-            verse_end = int(verse_parts[1])
+        if VERSE_INDEX_MODE == 'mmap':
+            index = TextIndex.open_sidecar(DB_PATH, VERSE_INDEX_PATH)
+        elif VERSE_INDEX_MODE == 'memory':
+            index = TextIndex.from_db(DB_PATH)
         else:
-            verse_start = verse_end = int(chapter_verse_parts[1])
-        
-        return (book_number, chapter, verse_start, verse_end)
-    
+            print(f"⚠️ Неизвестный VERSE_INDEX_MODE: {VERSE_INDEX_MODE}, используем SQLite", flush=True)
+            return VERSE_STORE
+        print(f"✅ Индекс текста загружен ({VERSE_INDEX_MODE}): {len(index.offsets) - 1} стихов", flush=True)
+        return index
     except Exception as e:
-        print(f"❌ Ошибка парсинга ссылки '{ref}': {e}", flush=True)
-        return None
+        print(f"❌ Ошибка загрузки индекса текста: {e}, используем SQLite", flush=True)
+        return VERSE_STORE
 
 
-def get_verse_from_db(ref):
+def load_verse_search():
     """
-    Получает текст стиха из SQLite базы данных по ссылке
+    Открывает индекс поиска (при необходимости строит его из базы).
+    Возвращает VerseSearch или None, если поиск отключён или недоступен
     """
-    parsed = parse_bible_ref(ref)
-    if not parsed:
-        return f"[Не удалось найти текст для {ref}]"
-    
-    book_number, chapter, verse_start, verse_end = parsed
-    
+    if not VERSE_SEARCH_PATH:
+        return None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Получаем стихи
-        if verse_start == verse_end:
-            # Один стих
-            cursor.execute("""
-                SELECT text FROM verses 
-                WHERE book = ? AND chapter = ? AND verse = ?
-            """, (book_number, chapter, verse_start))
-            result = cursor.fetchone()
-            verse_text = result[0] if result else f"[Стих не найден: {ref}]"
-        else:
-            # Диапазон стихов
-            cursor.execute("""
-                SELECT text FROM verses 
-                WHERE book = ? AND chapter = ? AND verse BETWEEN ? AND ?
-                ORDER BY verse
-            """, (book_number, chapter, verse_start, verse_end))
-            results = cursor.fetchall()
-            verse_text = ' '.join([row[0] for row in results]) if results else f"[Стихи не найдены: {ref}]"
-        
-        conn.close()
-        return verse_text
-    
+        search = VerseSearch.open_sidecar(DB_PATH, VERSE_SEARCH_PATH)
+        print(f"✅ Индекс поиска загружен: {VERSE_SEARCH_PATH}", flush=True)
+        return search
     except Exception as e:
-        print(f"❌ Ошибка чтения из БД для '{ref}': {e}", flush=True)
-        return f"[Ошибка получения текста для {ref}]"
+        print(f"❌ Ошибка загрузки индекса поиска: {e}", flush=True)
+        return None
+
+
+@timed('verse_search', "Полнотекстовый поиск по стихам")
+async def search_verses(query, limit):
+    """
+    Стихи по словам запроса (список SearchHit) или None, пока индекс не загружен
+    """
+    if VERSE_SEARCH is None:
+        return None
+    return await VERSE_SEARCH.search_async(query, limit)
 
 
 # =============================================================================
 # ФУНКЦИИ ДЛЯ РАБОТЫ С GOOGLE SHEETS
 # =============================================================================
 
-async def load_google_sheet_data():
+@timed('sheet_load', "Неделя из снимка таблицы", failed=lambda week: not week, log=True)
+async def load_google_sheet_data(day=None):
     """
-    Загружает данные из Google Sheets (публичная таблица через CSV export)
+    Возвращает строку недели, содержащей day (по умолчанию — сегодня по
+    TIMEZONE), из локального снимка расписания. Сеть не используется:
+    снимок обновляет SHEET_REFRESHER. Только если снимка ещё нет (первый
+    запуск) — одно обновление с повторами
     """
-    csv_url = f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}/export?format=csv&gid={GOOGLE_SHEET_GID}"
-    
-    try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.get(csv_url, timeout=60.0)
-            response.raise_for_status()
-            
-            # Парсим CSV
-            lines = response.text.splitlines()
-            reader = csv.DictReader(lines)
-            rows = list(reader)
-            
-            if not rows:
-                print("⚠️ Google Sheets пустая или недоступна", flush=True)
-                return None
-            
-            # Приоритет 1: Ищем неделю по дате
-            today = datetime.now(TIMEZONE).date()
-            for row in rows:
-                start_date_str = row.get('start_date', '').strip()
-                if not start_date_str:
-                    continue
-                
-                try:
-                    # Парсим дату формата DD.MM.YYYY
-                    start_date = datetime.strptime(start_date_str, '%d.%m.%Y').date()
-                    end_date = start_date + timedelta(days=6)
-                    
-                    if start_date <= today <= end_date:
-                        print(f"✅ Нашли неделю по дате: {start_date_str} (сегодня {today})", flush=True)
-                        return row
-                except ValueError:
-                    print(f"⚠️ Неверный формат даты: {start_date_str}", flush=True)
-                    continue
-            
-            # Приоритет 2: Если по дате не нашли, ищем status=active
-            print(f"⚠️ Неделя по дате не найдена (сегодня {today}), ищем status=active", flush=True)
-            for row in rows:
-                if row.get('status', '').strip().lower() == 'active':
-                    print(f"✅ Нашли неделю по status=active", flush=True)
-                    return row
-            
-            print("❌ Не найдено ни одной недели (ни по дате, ни по status=active)", flush=True)
+    schedule = current_schedule()
+    if schedule is None:
+        print("⚠️ Снимка расписания ещё нет — загружаем таблицу", flush=True)
+        await SHEET_REFRESHER.refresh_once()
+        schedule = current_schedule()
+        if schedule is None:
             return None
+    age = SHEET_REFRESHER.staleness()
+    if age is not None and age > SHEET_STALE_AFTER:
+        reason = f": {SHEET_REFRESHER.last_error}" if SHEET_REFRESHER.last_error else ""
+        print(f"⚠️ Снимок таблицы не обновлялся {age / 3600:.1f} ч{reason}", flush=True)
+    return find_week(schedule, day or datetime.now(TIMEZONE).date())
+
+
+async def fetch_schedule():
+    """
+    Загружает таблицу, проверяет её и атомарно сохраняет снимок расписания.
+    CSV разбирается потоково по мере загрузки. На 304 таблица не
+    разбирается вовсе, а при том же хэше строки уже разобраны, но индекс
+    не собирается и снимок не перезаписывается. При ошибке сети, таблице
+    без недель или ошибке записи снимка бросает исключение — прежний
+    снимок остаётся
+    """
+    global _SCHEDULE
+    csv_url = f"{GOOGLE_SHEETS_URL}/spreadsheets/d/{GOOGLE_SHEET_ID}/export?format=csv&gid={GOOGLE_SHEET_GID}"
+    
+    # Сохранённый снимок — для сравнения хэша
+    current_schedule()
+    
+    builder = ScheduleBuilder()
+    httpx = STARTUP.lazy_import('httpx')
+    async with httpx.AsyncClient(follow_redirects=True) as client:
+        content_hash, changed = await SHEET_FETCHER.fetch(
+            client, csv_url, on_line=builder.feed_line, timeout=SHEET_FETCH_TIMEOUT,
+        )
     
+    if _SCHEDULE is not None and _SCHEDULE.content_hash == content_hash:
+        print("♻️ Таблица не изменилась, используем сохранённый индекс", flush=True)
+        return _SCHEDULE
+    
+    if builder.header is None:
+        # 304, но индекса нет — разбираем сохранённое тело ответа
+        schedule = ScheduleIndex.from_lines(SHEET_FETCHER.iter_cached_lines(), content_hash)
+    else:
+        schedule = builder.finish(content_hash)
+    
+    for number, error in schedule.errors:
+        print(f"⚠️ Строка {number}: {error}", flush=True)
+    if not len(schedule) and schedule.active is None:
+        raise ValueError("в таблице нет ни одной недели — снимок не обновлён")
+    
+    # Ошибка записи — неудачное обновление: снимок на диске остался прежним
+    schedule.save(SCHEDULE_INDEX_PATH)
+    print(f"✅ Расписание обновлено: {len(schedule)} недель", flush=True)
+    _SCHEDULE = schedule
+    return schedule
+
+
+async def load_schedule():
+    """
+    Обновляет снимок расписания (fetch_schedule) одной попыткой.
+    При ошибке возвращает сохранённый на диске снимок
+    """
+    try:
+        return await fetch_schedule()
     except Exception as e:
         print(f"❌ Ошибка загрузки Google Sheets: {e}", flush=True)
+        if _SCHEDULE is not None:
+            print("⚠️ Используем сохранённое расписание", flush=True)
+        return _SCHEDULE
+
+
+def read_schedule(csv_path=None):
+    """
+    Расписание для команд render и prepare-db: из локального CSV, если он
+    задан, иначе одна попытка load_schedule (с откатом на снимок)
+    """
+    if csv_path:
+        return ScheduleIndex.from_csv(csv_path)
+    return asyncio.run(load_schedule())
+
+def find_week(schedule, today):
+    """
+    Строка недели для даты today: по дате начала, иначе status=active
+    """
+    if not len(schedule) and schedule.active is None:
+        print("⚠️ Google Sheets пустая или недоступна", flush=True)
         return None
+    
+    # Приоритет 1: Ищем неделю по дате
+    row = schedule.find(today)
+    if row is not None:
+        print(f"✅ Нашли неделю по дате: {row['start_date'].strip()} (сегодня {today})", flush=True)
+        return row
+    
+    # Приоритет 2: Если по дате не нашли, ищем status=active
+    print(f"⚠️ Неделя по дате не найдена (сегодня {today}), ищем status=active", flush=True)
+    if schedule.active is not None:
+        print(f"✅ Нашли неделю по status=active", flush=True)
+        return schedule.active
+    
+    print("❌ Не найдено ни одной недели (ни по дате, ни по status=active)", flush=True)
+    return None
 
 
-def generate_messages_from_data(week_data):
+@timed('render_week', "Генерация сообщений недели", failed=lambda messages: not messages, log=True)
+def generate_messages_from_data(week_data, translation=None, layout=None, errors=None):
     """
     Генерирует 7 сообщений на основе данных недели.
-    Каждое сообщение содержит данные для двух возрастных групп: 0-3 и 3-15 лет.
+    Каждое сообщение содержит секции всех возрастных групп строки (треков),
+    оформленные макетом layout (None — макет по умолчанию).
+    Тексты стихов берутся из перевода translation (None — основной);
+    ссылки с ошибкой чтения БД попадают в errors (см. get_verses_from_db).
     """
     try:
-        # Парсим start_date
-        start_date_str = week_data.get('start_date', '').strip()
-        start_date = datetime.strptime(start_date_str, '%d.%m.%Y').date()
-        
-        # Получаем данные для 0-3 лет
-        lesson_url_0_3 = week_data.get('lesson_url_0_3', '').strip()
-        main_point_0_3 = week_data.get('main_point_0_3', '').strip()
-        days_json_0_3_str = week_data.get('days_json_0_3', '').strip()
-        
-        # Получаем данные для 3-15 лет
-        lesson_url_3_15 = week_data.get('lesson_url_3_15', '').strip()
-        main_point_3_15 = week_data.get('main_point_3_15', '').strip()
-        days_json_3_15_str = week_data.get('days_json_3_15', '').strip()
-        
-        # Парсим JSON с днями для обеих групп
-        days_data_0_3 = json.loads(days_json_0_3_str)
-        days_data_3_15 = json.loads(days_json_3_15_str)
-        
-        if len(days_data_0_3) != 7:
-            print(f"⚠️ В days_json_0_3 должно быть 7 элементов, найдено {len(days_data_0_3)}", flush=True)
-            return []
-        
-        if len(days_data_3_15) != 7:
-            print(f"⚠️ В days_json_3_15 должно быть 7 элементов, найдено {len(days_data_3_15)}", flush=True)
-            return []
-        
-        messages = []
-        weekdays_ru = ['понедельник', 'вторник', 'среда', 'четверг', 'пятница', 'суббота', 'воскресенье']
-        
-        for day_index in range(7):
-            # Вычисляем дату
-            current_date = start_date + timedelta(days=day_index)
-            date_formatted = f"{current_date.strftime('%d.%m.%Y')} – {weekdays_ru[day_index]}"
-            
-            # Получаем данные дня для 0-3 лет
-            day_data_0_3 = days_data_0_3[day_index]
-            ref_0_3 = day_data_0_3.get('ref', '').strip()
-            note_0_3 = day_data_0_3.get('note', '').strip()
-            verse_text_0_3 = get_verse_from_db(ref_0_3)
-            
-            # Получаем данные дня для 3-15 лет
-            day_data_3_15 = days_data_3_15[day_index]
-            ref_3_15 = day_data_3_15.get('ref', '').strip()
-            verse_text_3_15 = get_verse_from_db(ref_3_15)
-            
-            # Форматируем объединённое сообщение
-            message = MESSAGE_TEMPLATE_COMBINED.format(
-                date_formatted=date_formatted,
-                # Данные для 3-15 лет
-                ref_3_15=ref_3_15,
-                verse_text_3_15=verse_text_3_15,
-                main_point_3_15=main_point_3_15,
-                lesson_url_3_15=lesson_url_3_15,
-                # Данные для 0-3 лет
-                ref_0_3=ref_0_3,
-                verse_text_0_3=verse_text_0_3,
-                note_0_3=note_0_3,
-                main_point_0_3=main_point_0_3,
-                lesson_url_0_3=lesson_url_0_3
-            )
-            
-            messages.append(message)
-        
-        return messages
-    
+        # Все тексты недели одним пакетом (по запросу на главу)
+        return RENDERER.render_week(week_data, lambda refs: get_verses_from_db(refs, translation, errors), layout)
     except Exception as e:
         print(f"❌ Ошибка генерации сообщений: {e}", flush=True)
         import traceback
@@ -332,70 +464,302 @@ def generate_messages_from_data(week_data):
         return []
 
 
+def render_week_messages(week_data, translation=None, layout=None):
+    """
+    Возвращает 7 сообщений недели из кэша или рендерит и сохраняет их.
+    Неделя с ошибками чтения БД не кэшируется: заглушки не должны
+    пережить исправление базы
+    """
+    extra = {'_translation': translation, '_layout': layout}
+    key = RENDER_CACHE.key({**week_data, **{name: value for name, value in extra.items() if value}})
+    messages = RENDER_CACHE.get(key)
+    if messages:
+        print(f"♻️ Сообщения недели взяты из кэша ({key[:8]})", flush=True)
+        return messages
+    
+    errors = []
+    messages = generate_messages_from_data(week_data, translation, layout, errors)
+    if errors:
+        print(f"⚠️ Неделя не сохранена в кэш: ошибки чтения БД для {len(errors)} ссылок", flush=True)
+    elif messages:
+        try:
+            RENDER_CACHE.put(key, messages)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить кэш недели: {e}", flush=True)
+    return messages
+
+
 # =============================================================================
 # TELEGRAM ФУНКЦИИ
 # =============================================================================
 
-async def send_telegram_message(bot, chat_id, message):
+_BOT = None
+_DELIVERY_ENGINE = None
+_OUTBOX = None
+
+
+def get_bot():
     """
-    Отправляет сообщение в Telegram с HTML форматированием
+    Единственный экземпляр Bot на процесс с общим пулом HTTP-соединений
     """
-    try:
-        await bot.send_message(
-            chat_id=chat_id,
-            text=message,
-            parse_mode='HTML'
+    global _BOT
+    if _BOT is None:
+        telegram = STARTUP.lazy_import('telegram')
+        request = STARTUP.lazy_import('telegram.request')
+        _BOT = telegram.Bot(
+            token=TELEGRAM_BOT_TOKEN,
+            base_url=f"{TELEGRAM_API_URL}/bot",
+            request=request.HTTPXRequest(connection_pool_size=DELIVERY_WORKERS),
         )
-        print(f"✅ Сообщение отправлено в Telegram", flush=True)
-        return True
-    except TelegramError as e:
-        print(f"❌ Ошибка отправки в Telegram: {e}", flush=True)
-        return False
+    return _BOT
+
+
+def get_delivery_engine():
+    """
+    Движок рассылки (один на процесс, чтобы сохранялись лимиты чатов)
+    """
+    global _DELIVERY_ENGINE
+    if _DELIVERY_ENGINE is None:
+        _DELIVERY_ENGINE = DeliveryEngine(
+            send_telegram_message,
+            workers=DELIVERY_WORKERS,
+            global_rate=DELIVERY_RATE,
+            split=split_message,
+        )
+    return _DELIVERY_ENGINE
+
+
+def get_outbox():
+    """
+    Outbox рассылок (открывается при первом обращении)
+    """
+    global _OUTBOX
+    if _OUTBOX is None:
+        _OUTBOX = Outbox(OUTBOX_PATH)
+    return _OUTBOX
+
+
+@timed('telegram_send', "Отправка сообщения в Telegram")
+async def send_telegram_message(chat_id, message):
+    """
+    Отправляет сообщение в Telegram с HTML форматированием. Длинные
+    сообщения движок рассылки заранее делит на части (split_message).
+    Ошибки telegram.error обрабатывает движок рассылки (повторы, RetryAfter)
+    """
+    await get_bot().send_message(
+        chat_id=chat_id,
+        text=message,
+        parse_mode='HTML'
+    )
+
+
+async def deliver_pending(day, bucket, spread=0.0):
+    """
+    Досылает незавершённые сообщения дня группы bucket (DeliveryBucket.key)
+    из outbox, распределяя отправки по окну spread секунд.
+    Возвращает DeliveryReport
+    """
+    outbox = get_outbox()
+    pending = outbox.pending(day, bucket)
+    print(f"📤 Рассылка за {day}: {len(pending)} чат(ов) в очереди", flush=True)
+    
+    async def before_send(chat_id):
+        outbox.mark_sending(day, chat_id)
+    
+    async def on_part(chat_id, parts_sent):
+        outbox.mark_part(day, chat_id, parts_sent)
+    
+    async def on_result(chat_id, error):
+        outbox.mark_result(day, chat_id, error)
+    
+    report = await get_delivery_engine().deliver(
+        pending, on_result=on_result, before_send=before_send, on_part=on_part, spread=spread, seed=day,
+    )
+    for chat_id, error in report.failures:
+        print(f"❌ Ошибка отправки в Telegram (чат {chat_id}): {error}", flush=True)
+    print(report.summary(), flush=True)
+    DELIVERY_MESSAGES.inc(report.sent, labels=('sent',))
+    DELIVERY_MESSAGES.inc(report.failed, labels=('failed',))
+    DELIVERY_RETRIES.inc(report.retries)
+    log_event('delivery', day=day, sent=report.sent, failed=report.failed, retries=report.retries,
+              p50_ms=round(report.percentile(50) * 1000, 1), p99_ms=round(report.percentile(99) * 1000, 1))
+    
+    if outbox.complete(day, bucket):
+        outbox.prune()
+    print(f"📦 Outbox за {day}, группа {bucket}: {outbox.counts(day, bucket)}", flush=True)
+    return report
 
 
 # =============================================================================
 # ОСНОВНАЯ ЗАДАЧА
 # =============================================================================
 
+# Одна задача на группу за раз; разные группы работают параллельно
+_BUCKET_LOCKS = {}
+
+# Фоновые задачи (догоняющие рассылки): event loop хранит на них лишь
+# слабые ссылки, без этого множества задачу может собрать сборщик мусора
+_BACKGROUND_TASKS = set()
+
+
+def spawn(coroutine):
+    """Запускает корутину фоновой задачей и держит ссылку до её завершения"""
+    task = asyncio.create_task(coroutine)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    return task
+
+
+def current_buckets():
+    """Подписчики, сгруппированные по (часовой пояс, время отправки, перевод, макет)"""
+    subscriptions = load_subscriptions(TELEGRAM_CHAT_ID, SUBSCRIBERS_FILE, TIMEZONE.zone, DAILY_JOB_TIME)
+    unknown = {
+        subscription.translation for subscription in subscriptions
+        if subscription.translation and subscription.translation not in TRANSLATIONS.translations
+    }
+    if unknown:
+        print(f"⚠️ Неизвестные переводы у подписчиков: {', '.join(sorted(unknown))} — отправляем основной", flush=True)
+        subscriptions = [
+            subscription._replace(translation='') if subscription.translation in unknown else subscription
+            for subscription in subscriptions
+        ]
+    unknown = {
+        subscription.layout for subscription in subscriptions
+        if subscription.layout and subscription.layout not in RENDERER.layouts
+    }
+    if unknown:
+        print(f"⚠️ Неизвестные макеты у подписчиков: {', '.join(sorted(unknown))} — отправляем основной", flush=True)
+        subscriptions = [
+            subscription._replace(layout='') if subscription.layout in unknown else subscription
+            for subscription in subscriptions
+        ]
+    return group_by_bucket(subscriptions)
+
+
 async def daily_job():
     """
-    Основная ежедневная задача: загрузить данные, сгенерировать сообщения, отправить
+    Рассылка всем группам сразу (ручной запуск и тесты); по расписанию
+    каждая группа запускается своей задачей bucket_job
+    """
+    for bucket in current_buckets():
+        await bucket_job(bucket)
+
+
+async def bucket_job(bucket):
+    """
+    Ежедневная задача группы: загрузить данные, сгенерировать сообщение
+    местного дня один раз на группу и разослать его с разбросом по окну
     """
+    lock = _BUCKET_LOCKS.setdefault(bucket, asyncio.Lock())
+    async with lock:
+        # Список подписчиков перечитывается: файл мог измениться с момента планирования
+        chat_ids = current_buckets().get(bucket, [])
+        if chat_ids:
+            await _run_bucket_job(bucket, chat_ids)
+
+
+async def _run_bucket_job(bucket, chat_ids):
+    now = bucket.local_now()
+    day = now.date().isoformat()
     print("\n" + "="*50, flush=True)
-    print(f"🕐 Запуск ежедневной задачи: {datetime.now(TIMEZONE)}", flush=True)
+    print(f"🕐 Рассылка группы {bucket.key}: {now} ({len(chat_ids)} чат(ов))", flush=True)
     print("="*50, flush=True)
     
-    # Загружаем данные из Google Sheets
-    week_data = await load_google_sheet_data()
-    if not week_data:
-        print("❌ Не удалось загрузить данные недели. Пропускаем отправку.", flush=True)
-        return
-    
-    # Генерируем сообщения
-    messages = generate_messages_from_data(week_data)
-    if not messages:
-        print("❌ Не удалось сгенерировать сообщения. Пропускаем отправку.", flush=True)
-        return
+    outbox = get_outbox()
+    rendered = outbox.rendered(day, bucket.key)
     
-    # Определяем какой день недели сегодня (0=понедельник, 6=воскресенье)
-    today_weekday = datetime.now(TIMEZONE).weekday()
-    today_message = messages[today_weekday]
+    if rendered is not None:
+        # Перезапуск посреди рассылки: сообщение уже в outbox, досылаем остаток
+        today_message = rendered[0]
+        print(f"♻️ Сообщение за {day} уже в outbox, досылаем незавершённые отправки", flush=True)
+    else:
+        # Неделя, содержащая местную дату группы, — из снимка таблицы
+        week_data = await load_google_sheet_data(now.date())
+        if not week_data:
+            print("❌ Не удалось загрузить данные недели. Пропускаем отправку.", flush=True)
+            return
+        
+        # Генерируем сообщения (чтение БД — в пуле потоков, не блокируя event loop)
+        messages = await VERSE_SOURCE.run(
+            render_week_messages, week_data, bucket.translation or None, bucket.layout or None,
+        )
+        if not messages:
+            print("❌ Не удалось сгенерировать сообщения. Пропускаем отправку.", flush=True)
+            return
+        
+        # Определяем какой день недели сегодня (0=понедельник, 6=воскресенье)
+        today_weekday = now.weekday()
+        today_message = messages[today_weekday]
+        
+        print(f"\n📤 Отправляем сообщение для дня {today_weekday + 1} ({['пн','вт','ср','чт','пт','сб','вс'][today_weekday]}):", flush=True)
+        print("-" * 50, flush=True)
+        print(today_message[:200] + "...", flush=True)
+        print("-" * 50, flush=True)
     
-    print(f"\n📤 Отправляем сообщение для дня {today_weekday + 1} ({['пн','вт','ср','чт','пт','сб','вс'][today_weekday]}):", flush=True)
-    print("-" * 50, flush=True)
-    print(today_message[:200] + "...", flush=True)
-    print("-" * 50, flush=True)
+    # Фиксируем сообщение в outbox до отправки; подписчики, добавленные после
+    # рендера, получают то же сообщение, уже поставленные в очередь не трогаются
+    outbox.enqueue(day, bucket.key, chat_ids, today_message)
     
-    # Отправляем в Telegram
-    bot = Bot(token=TELEGRAM_BOT_TOKEN)
-    success = await send_telegram_message(bot, TELEGRAM_CHAT_ID, today_message)
+    # Отправляем в Telegram, распределяя чаты по окну
+    report = await deliver_pending(day, bucket.key, spread=DELIVERY_WINDOW)
     
-    if success:
+    if not report.failed:
         print("✅ Задача выполнена успешно!", flush=True)
     else:
         print("❌ Задача завершилась с ошибкой", flush=True)
 
 
+def _is_unfinished(bucket):
+    """
+    Наступило ли местное время группы, а её сегодняшняя рассылка не
+    отрендерена или не завершена (одна строка renders, без чтения outbox)
+    """
+    now = bucket.local_now()
+    if now.time() < bucket.send_time:
+        return False
+    rendered = get_outbox().rendered(now.date().isoformat(), bucket.key)
+    return rendered is None or not rendered[1]
+
+
+async def catch_up_job():
+    """
+    Запуск после старта: группы, чья сегодняшняя рассылка пропущена (процесс
+    спал во время отправки) или прервана перезапуском, выполняются сейчас
+    """
+    for bucket in current_buckets():
+        if _is_unfinished(bucket):
+            print(f"⏰ Рассылка группы {bucket.key} не завершена — запускаем догоняющую задачу", flush=True)
+            spawn(bucket_job(bucket))
+
+
+def sync_bucket_jobs(scheduler):
+    """
+    Приводит задачи планировщика к текущим группам подписчиков: по cron-задаче
+    на каждую пару (часовой пояс, время), лишние задачи удаляются
+    """
+    buckets = current_buckets()
+    wanted = {f"daily:{bucket.key}": bucket for bucket in buckets}
+    for job in scheduler.get_jobs():
+        if job.id.startswith('daily:') and job.id not in wanted:
+            job.remove()
+            print(f"🗑️ Задача {job.id} удалена: в группе не осталось подписчиков", flush=True)
+    for job_id, bucket in wanted.items():
+        if scheduler.get_job(job_id) is not None:
+            continue
+        scheduler.add_job(
+            bucket_job,
+            trigger='cron',
+            args=[bucket],
+            hour=bucket.send_time.hour,
+            minute=bucket.send_time.minute,
+            timezone=pytz.timezone(bucket.timezone),
+            id=job_id,
+            misfire_grace_time=3600,
+            coalesce=True
+        )
+        print(f"✅ Рассылка {bucket.key}: {len(buckets[bucket])} чат(ов)", flush=True)
+
+
 # =============================================================================
 # ВЕБ-СЕРВЕР (для Render)
 # =============================================================================
@@ -408,6 +772,67 @@ async def handle_root(request):
     """Root endpoint"""
     return web.Response(text="Telegram Bible Bot is running!")
 
+async def handle_metrics(request):
+    """Метрики в текстовом формате Prometheus"""
+    return web.Response(body=REGISTRY.render().encode('utf-8'),
+                        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+
+async def set_webhook():
+    """Регистрирует вебхук команд в Telegram (повторная регистрация безвредна)"""
+    try:
+        await get_bot().set_webhook(
+            url=f"{WEBHOOK_URL}/telegram",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=['message'],
+            max_connections=min(100, BOT_WORKERS),
+        )
+        print(f"✅ Вебхук команд: {WEBHOOK_URL}/telegram", flush=True)
+    except Exception as e:
+        print(f"❌ Не удалось зарегистрировать вебхук: {e}", flush=True)
+
+
+def current_schedule():
+    """
+    Индекс расписания без обращения к сети (из памяти или с диска)
+    """
+    global _SCHEDULE
+    if _SCHEDULE is None:
+        _SCHEDULE = ScheduleIndex.load(SCHEDULE_INDEX_PATH)
+    return _SCHEDULE
+
+
+def create_app():
+    """
+    Веб-приложение: /, /health, /metrics, API плана (/verse, /verses, /day, /week, /search)
+    и вебхук команд бота /telegram (если задан WEBHOOK_URL)
+    """
+    app = web.Application()
+    app.router.add_get('/', handle_root)
+    app.router.add_get('/health', handle_health)
+    app.router.add_get('/metrics', handle_metrics)
+    
+    plan_api = PlanAPI(
+        lookup_verses=lambda refs, translation: VERSE_SOURCE.run(find_verses, refs, translation),
+        get_schedule=current_schedule,
+        render_week=lambda row, translation: VERSE_SOURCE.run(render_week_messages, row, translation),
+        search_verses=search_verses,
+        list_translations=lambda: list(TRANSLATIONS.translations.values()),
+    )
+    plan_api.register(app)
+    
+    if WEBHOOK_URL:
+        # Ответы на команды идут через движок рассылки: общие лимиты Telegram
+        WebhookBot(
+            send=lambda chat_id, text: get_delivery_engine().send_one(chat_id, text),
+            plan_api=plan_api,
+            today=lambda: datetime.now(TIMEZONE).date(),
+            secret=WEBHOOK_SECRET,
+            workers=BOT_WORKERS,
+            max_queue=BOT_QUEUE_SIZE,
+        ).register(app)
+    return app
+
 
 # =============================================================================
 # ГЛАВНАЯ ФУНКЦИЯ
@@ -422,7 +847,7 @@ async def main():
     print("="*50, flush=True)
     
     # Проверка переменных окружения
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID or not GOOGLE_SHEET_ID:
+    if not TELEGRAM_BOT_TOKEN or not (TELEGRAM_CHAT_ID or SUBSCRIBERS_FILE) or not GOOGLE_SHEET_ID:
         print("❌ Отсутствуют обязательные переменные окружения!", flush=True)
         return
     
@@ -433,36 +858,64 @@ async def main():
     
     print(f"✅ База данных найдена: {DB_PATH}", flush=True)
     
-    # Создаём веб-приложение
-    app = web.Application()
-    app.router.add_get('/', handle_root)
-    app.router.add_get('/health', handle_health)
+    global VERSE_SOURCE, VERSE_SEARCH
     
-    # Запускаем веб-сервер
+    # Веб-сервер — первым: /health должен отвечать как можно раньше после
+    # холодного старта, всё остальное догружается, пока он уже работает
+    app = create_app()
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', PORT)
     await site.start()
-    print(f"✅ Веб-сервер запущен на порту {PORT}", flush=True)
+    STARTUP.mark('health')
+    print(f"✅ Веб-сервер запущен на порту {PORT} ({STARTUP.elapsed() * 1000:.0f} мс от старта)", flush=True)
+    
+    # Тяжёлые зависимости, индекс текста и прогрев базы — в потоке,
+    # event loop тем временем отвечает на запросы
+    scheduler_module = await asyncio.to_thread(STARTUP.lazy_import, 'apscheduler.schedulers.asyncio')
+    await asyncio.to_thread(STARTUP.lazy_import, 'httpx')
+    # Снимок таблицы обновляется в фоне: рассылка от сети не зависит
+    SHEET_REFRESHER.start()
+    await asyncio.to_thread(STARTUP.lazy_import, 'telegram')
+    VERSE_SOURCE = await asyncio.to_thread(load_verse_index)
+    await asyncio.to_thread(VERSE_STORE.warm)
+    # Главы текущей и следующей недели — в LRU до первой рассылки и команд
+    schedule = current_schedule()
+    if schedule is not None:
+        today = datetime.now(TIMEZONE).date()
+        weeks = [schedule.find(today), schedule.find(today + timedelta(days=7))]
+        await asyncio.to_thread(prefetch_verses, [row for row in weeks if row is not None])
+    STARTUP.mark('warm db')
+    
+    # Индекс поиска строится в потоке, пока сервер уже отвечает
+    VERSE_SEARCH = await asyncio.to_thread(load_verse_search)
+    STARTUP.mark('search index')
+    
+    if WEBHOOK_URL:
+        await set_webhook()
     
     # Создаём планировщик
-    scheduler = AsyncIOScheduler(timezone=TIMEZONE)
-    
-    # Добавляем ежедневную задачу в 04:00
-    scheduler.add_job(
-        daily_job,
-        trigger='cron',
-        hour=4,
-        minute=00,
-        id='daily_bible_message'
-    )
+    scheduler = scheduler_module.AsyncIOScheduler(timezone=TIMEZONE)
+    
+    # Ежедневные задачи — по одной на группу (часовой пояс, время);
+    # группы пересчитываются каждые 10 минут, если файл подписчиков изменился
+    sync_bucket_jobs(scheduler)
+    scheduler.add_job(sync_bucket_jobs, trigger='interval', minutes=10, args=[scheduler], id='sync_buckets')
     
     scheduler.start()
-    print(f"✅ Планировщик запущен. Задача будет выполняться каждый день в 04:00 UTC+3", flush=True)
+    print(f"✅ Планировщик запущен: {len(current_buckets())} групп(ы) рассылки", flush=True)
+    
+    # Догоняем пропущенную или прерванную сегодняшнюю рассылку
+    spawn(catch_up_job())
     
     # Опционально: запустить задачу сразу для теста
     #await daily_job()
     
+    STARTUP.mark('scheduler')
+    breakdown, fields = STARTUP.report()
+    print(f"⏱️ Запуск: {breakdown}", flush=True)
+    log_event('startup', **fields)
+    
     print("\n" + "="*50, flush=True)
     print("✅ Бот полностью запущен и работает!", flush=True)
     print("="*50, flush=True)
@@ -474,7 +927,18 @@ async def main():
     except (KeyboardInterrupt, SystemExit):
         print("\n👋 Остановка бота...", flush=True)
         scheduler.shutdown()
+        await SHEET_REFRESHER.stop()
         await runner.cleanup()
+        if _BOT is not None:
+            await _BOT.shutdown()
+        if _OUTBOX is not None:
+            _OUTBOX.close()
+        if VERSE_SOURCE is not VERSE_STORE:
+            VERSE_SOURCE.close()
+        if VERSE_SEARCH is not None:
+            VERSE_SEARCH.close()
+        TRANSLATIONS.close()
+        VERSE_STORE.close()
 
 
 if __name__ == "__main__":
@@ -482,4 +946,14 @@ if __name__ == "__main__":
     sys.stdout.reconfigure(line_buffering=True)
     sys.stderr.reconfigure(line_buffering=True)
     
+    # python main.py render — пре-рендер и проверка всего плана
+    if len(sys.argv) > 1 and sys.argv[1] == 'render':
+        from prerender import run
+        sys.exit(run(sys.argv[2:]))
+    
+    # python main.py prepare-db — индекс, порядок строк и VACUUM базы стихов
+    if len(sys.argv) > 1 and sys.argv[1] == 'prepare-db':
+        from dbprep import run
+        sys.exit(run(sys.argv[2:]))
+    
     asyncio.run(main())
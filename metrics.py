@@ -0,0 +1,233 @@
+"""
+Лёгкая инструментация горячих путей.
+
+Счётчики и гистограммы живут в памяти процесса и отдаются на /metrics в
+текстовом формате Prometheus. Замер — это два вызова perf_counter, bisect
+по границам корзин и короткая блокировка (функции вызываются и из пула
+потоков), то есть 1–2 мкс на вызов: инструментацию можно не выключать
+(benchmarks/bench_metrics.py).
+
+Крупные операции (загрузка таблицы, рендер недели, итог рассылки) дополнительно
+пишут по JSON-строке в stdout — их удобно фильтровать в логах хостинга.
+Отключается переменной окружения JSON_LOGS=0.
+"""
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# Границы корзин гистограмм длительности, секунды
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+JSON_LOGS = os.getenv('JSON_LOGS', '1').strip().lower() not in ('0', 'false', 'no', '')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in zip(names, values)
+    )
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонный счётчик, опционально с метками"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, labels=()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (накопление — при выводе)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # метки -> [счётчики корзин..., +Inf], сумма, количество
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels=()):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def collect(self):
+        with self._lock:
+            items = sorted((labels, (list(counts), total, count))
+                           for labels, (counts, total, count) in self._series.items())
+        names = self.labelnames + ('le',)
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield (f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} "
+                       f"{cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(total)}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+class Gauge:
+    """Текущее значение: задаётся set() или вычисляется function() при выводе"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, function=None):
+        self.name = name
+        self.help = help
+        self.function = function
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        return self.function() if self.function is not None else self._value
+
+    def collect(self):
+        value = self.value()
+        if value is not None:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class Registry:
+    """Набор метрик процесса"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Метрика {name} уже зарегистрирована как {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help, labelnames, buckets)
+
+    def gauge(self, name, help, function=None):
+        return self._register(Gauge, name, help, function)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus 0.0.4"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def log_event(event, **fields):
+    """Одна JSON-строка в stdout: {"ts", "event", ...поля}"""
+    if not JSON_LOGS:
+        return
+    record = {'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'), 'event': event}
+    record.update(fields)
+    print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
+
+
+def timed(name, help, failed=None, log=False, registry=REGISTRY):
+    """
+    Декоратор: длительность вызовов в гистограмму {name}_seconds, неудачи —
+    в счётчик {name}_failures_total. Неудача — исключение или failed(result).
+    При log=True каждый вызов пишет JSON-строку (для редких крупных операций).
+    Работает и с обычными функциями, и с корутинами.
+    """
+    histogram = registry.histogram(f"{name}_seconds", f"{help}: длительность, с")
+    failures = registry.counter(f"{name}_failures_total", f"{help}: неудачные вызовы")
+
+    def finish(started, ok, error=None):
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed)
+        if not ok:
+            failures.inc()
+        if log:
+            fields = {'duration_ms': round(elapsed * 1000, 3), 'ok': ok}
+            if error is not None:
+                fields['error'] = f"{type(error).__name__}: {error}"
+            log_event(name, **fields)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    finish(started, False, e)
+                    raise
+                finish(started, not (failed and failed(result)))
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                finish(started, False, e)
+                raise
+            finish(started, not (failed and failed(result)))
+            return result
+        return wrapper
+
+    return decorator
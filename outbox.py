@@ -0,0 +1,186 @@
+"""
+Надёжная очередь исходящих сообщений (outbox) в отдельной SQLite-базе.
+
+Сообщение дня рендерится один раз на группу рассылки (день, группа) и
+записывается в renders, а строки outbox — на пару (день, чат) до отправки;
+каждая строка проходит состояния:
+
+    pending → sending → sent
+                      → failed
+
+Повторный запуск задачи не создаёт дублей (INSERT OR IGNORE по первичному
+ключу), а после перезапуска процесса отправляются только незавершённые
+строки, а длинное сообщение — с первой неотправленной части (parts_sent).
+Частичный индекс по (день, группа, чат) покрывает лишь
+pending/sending, поэтому восстановление группы не читает ни доставленные
+строки, ни строки других групп.
+
+Строки в состоянии sending после падения процесса считаются неотправленными
+и отправляются снова: Telegram не поддерживает ключи идемпотентности, и
+мы выбираем «не меньше одного раза», сужая окно отметкой прямо перед вызовом API.
+"""
+import sqlite3
+import time
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    day TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    message TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    bucket TEXT NOT NULL DEFAULT '',
+    parts_sent INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, chat_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS renders (
+    day TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    message TEXT NOT NULL,
+    rendered_at REAL NOT NULL,
+    completed_at REAL,
+    PRIMARY KEY (day, bucket)
+) WITHOUT ROWID;
+"""
+
+INDEXES = """
+DROP INDEX IF EXISTS outbox_unfinished;
+DROP TABLE IF EXISTS days;
+CREATE INDEX IF NOT EXISTS outbox_bucket_unfinished ON outbox (day, bucket, chat_id)
+    WHERE state IN ('pending', 'sending');
+"""
+
+# Столбцы, добавленные после первой версии схемы: (имя, определение)
+MIGRATIONS = [('bucket', "TEXT NOT NULL DEFAULT ''"), ('parts_sent', "INTEGER NOT NULL DEFAULT 0")]
+
+
+class Outbox:
+    """Outbox поверх SQLite в режиме WAL; используется из потока event loop"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")}
+        for name, definition in MIGRATIONS:
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE outbox ADD COLUMN {name} {definition}")
+        self.conn.executescript(INDEXES)
+
+    def close(self):
+        self.conn.close()
+
+    def rendered(self, day, bucket):
+        """
+        Сообщение дня группы и завершена ли её рассылка: (message, completed)
+        или None, если сообщение ещё не рендерилось
+        """
+        row = self.conn.execute(
+            "SELECT message, completed_at FROM renders WHERE day = ? AND bucket = ?", (day, bucket),
+        ).fetchone()
+        return None if row is None else (row[0], row[1] is not None)
+
+    def enqueue(self, day, bucket, chat_ids, message):
+        """
+        Запоминает сообщение дня группы и ставит его в очередь для всех чатов
+        одной транзакцией. Уже существующие пары (день, чат) не трогаются;
+        новые чаты снова открывают завершённую рассылку группы.
+        Возвращает число новых строк
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(
+                "INSERT OR IGNORE INTO renders (day, bucket, message, rendered_at) VALUES (?, ?, ?, ?)",
+                (day, bucket, message, now),
+            )
+            # Сообщение группы за день одно: поздние чаты получают уже записанное
+            (message,) = self.conn.execute(
+                "SELECT message FROM renders WHERE day = ? AND bucket = ?", (day, bucket),
+            ).fetchone()
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO outbox (day, chat_id, message, updated_at, bucket) VALUES (?, ?, ?, ?, ?)",
+                ((day, str(chat_id), message, now, bucket) for chat_id in chat_ids),
+            )
+            added = self.conn.total_changes - before
+            if added:
+                self.conn.execute(
+                    "UPDATE renders SET completed_at = NULL WHERE day = ? AND bucket = ?", (day, bucket),
+                )
+        return added
+
+    def pending(self, day, bucket):
+        """
+        Незавершённые строки группы за день: [(chat_id, message, parts_sent)] —
+        только по частичному индексу, без доставленных строк и строк других групп
+        """
+        return self.conn.execute(
+            "SELECT chat_id, message, parts_sent FROM outbox INDEXED BY outbox_bucket_unfinished "
+            "WHERE day = ? AND bucket = ? AND state IN ('pending', 'sending') ORDER BY chat_id",
+            (day, bucket),
+        ).fetchall()
+
+    def mark_sending(self, day, chat_id):
+        self.conn.execute(
+            "UPDATE outbox SET state = ?, attempts = attempts + 1, updated_at = ? WHERE day = ? AND chat_id = ?",
+            (SENDING, time.time(), day, str(chat_id)),
+        )
+
+    def mark_part(self, day, chat_id, parts_sent):
+        """Запоминает, сколько частей сообщения уже доставлено в чат"""
+        self.conn.execute(
+            "UPDATE outbox SET parts_sent = ?, updated_at = ? WHERE day = ? AND chat_id = ?",
+            (parts_sent, time.time(), day, str(chat_id)),
+        )
+
+    def mark_result(self, day, chat_id, error=None):
+        """Фиксирует результат отправки: sent или failed с текстом ошибки"""
+        self.conn.execute(
+            "UPDATE outbox SET state = ?, error = ?, updated_at = ? WHERE day = ? AND chat_id = ?",
+            (SENT if error is None else FAILED, error, time.time(), day, str(chat_id)),
+        )
+
+    def complete(self, day, bucket):
+        """Отмечает рассылку группы завершённой, если не осталось незавершённых строк"""
+        unfinished = self.conn.execute(
+            "SELECT 1 FROM outbox INDEXED BY outbox_bucket_unfinished "
+            "WHERE day = ? AND bucket = ? AND state IN ('pending', 'sending') LIMIT 1",
+            (day, bucket),
+        ).fetchone()
+        if unfinished:
+            return False
+        self.conn.execute(
+            "UPDATE renders SET completed_at = ? WHERE day = ? AND bucket = ?", (time.time(), day, bucket),
+        )
+        return True
+
+    def counts(self, day, bucket=None):
+        """{состояние: число строк} за день (или за день одной группы)"""
+        if bucket is None:
+            query, args = "SELECT state, COUNT(*) FROM outbox WHERE day = ? GROUP BY state", (day,)
+        else:
+            query = "SELECT state, COUNT(*) FROM outbox WHERE day = ? AND bucket = ? GROUP BY state"
+            args = (day, bucket)
+        return dict(self.conn.execute(query, args).fetchall())
+
+    def prune(self, keep_days=30):
+        """Удаляет строки старше keep_days последних дней"""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            cutoff = self.conn.execute(
+                "SELECT DISTINCT day FROM renders ORDER BY day DESC LIMIT 1 OFFSET ?", (keep_days,)
+            ).fetchone()
+            if cutoff:
+                self.conn.execute("DELETE FROM outbox WHERE day <= ?", cutoff)
+                self.conn.execute("DELETE FROM renders WHERE day <= ?", cutoff)
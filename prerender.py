@@ -0,0 +1,156 @@
+"""
+Пакетный пре-рендер всего плана: `python main.py render`.
+
+Все недели таблицы рендерятся параллельно в пуле процессов. Процессы
+читают тексты через общий mmap-индекс (text_index), поэтому перевод
+загружается в память один раз на всю машину. Результат пишется в
+zip-архив (по JSON-файлу на неделю), а отчёт проверки перечисляет
+неразбираемые ссылки и ненайденные стихи — то, что раньше всплывало
+только в 04:00. Сообщения длиннее лимита Telegram отмечаются как split:
+при отправке они уйдут несколькими частями (templates.split_message).
+"""
+import argparse
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import main as bot
+from schedule_index import DATE_FORMAT, DAYS_PREFIX
+from templates import TELEGRAM_MESSAGE_LIMIT, split_message, visible_length
+from text_index import TextIndex
+from verse_store import VerseStore
+
+# Виды замечаний, которые не считаются ошибкой плана
+NOTICE_KINDS = {'split'}
+
+
+# =============================================================================
+# РАБОТА В ПРОЦЕССАХ ПУЛА
+# =============================================================================
+
+def _init_worker(db_path, index_path):
+    """Открывает источник текстов в процессе пула"""
+    bot.VERSE_SOURCE = TextIndex.load(index_path) if index_path else VerseStore(db_path, pool_size=1, max_workers=1)
+
+
+def render_week(row):
+    """
+    Рендерит неделю и проверяет её ссылки.
+    Возвращает (start_date, сообщения, [(вид проблемы, объект, подробности)])
+    """
+    start_date = row.get('start_date', '').strip()
+    issues = []
+    refs = set()
+    for column, value in row.items():
+        if not column.startswith(DAYS_PREFIX):
+            continue
+        try:
+            refs.update(day.get('ref', '').strip() for day in json.loads(value))
+        except (ValueError, AttributeError, TypeError) as e:
+            issues.append(('invalid_json', column, str(e)))
+
+    for ref in sorted(refs):
+        try:
+            parsed = bot.REF_PARSER.parse(ref)
+        except ValueError as e:
+            issues.append(('unparsable_ref', ref, str(e)))
+            continue
+        fetched = bot.VERSE_SOURCE.fetch_many(parsed.spans)
+        if all(text is None for text in fetched.values()):
+            issues.append(('missing_verse', ref, ''))
+
+    messages = bot.generate_messages_from_data(row)
+    if not messages:
+        issues.append(('render_failed', start_date, ''))
+    for day_index, message in enumerate(messages):
+        length = visible_length(message)
+        if length > TELEGRAM_MESSAGE_LIMIT:
+            parts = len(split_message(message))
+            issues.append(('split', f"день {day_index + 1}", f"{length} > {TELEGRAM_MESSAGE_LIMIT}, частей: {parts}"))
+    return start_date, messages, issues
+
+
+# =============================================================================
+# КОМАНДА render
+# =============================================================================
+
+def write_archive(path, results):
+    """Zip-архив: {YYYY-MM-DD}.json со списком сообщений на каждую неделю"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for start_date, messages, _ in results:
+            if not messages:
+                continue
+            name = datetime.strptime(start_date, DATE_FORMAT).date().isoformat()
+            archive.writestr(f"{name}.json", json.dumps(messages, ensure_ascii=False))
+    os.replace(tmp_path, path)
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(prog='main.py render', description="Пре-рендер и проверка всего плана")
+    parser.add_argument('--csv', help="локальный CSV вместо загрузки Google Sheets")
+    parser.add_argument('--archive', default=os.path.join(bot.CACHE_DIR, 'plan_archive.zip'))
+    parser.add_argument('--report', help="сохранить отчёт проверки в JSON")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--sql', action='store_true', help="читать стихи из SQLite, а не из mmap-индекса")
+    args = parser.parse_args(argv)
+
+    timings = {}
+    started = time.perf_counter()
+    schedule = bot.read_schedule(args.csv)
+    timings['загрузка таблицы'] = time.perf_counter() - started
+    if schedule is None or not len(schedule):
+        print("❌ В таблице нет недель для рендеринга", flush=True)
+        return 1
+
+    started = time.perf_counter()
+    index_path = None
+    if not args.sql:
+        TextIndex.open_sidecar(bot.DB_PATH, bot.VERSE_INDEX_PATH).close()
+        index_path = bot.VERSE_INDEX_PATH
+    timings['индекс текста'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    workers = max(1, min(args.workers, len(schedule)))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(bot.DB_PATH, index_path)) as pool:
+        results = list(pool.map(render_week, schedule.rows, chunksize=max(1, len(schedule) // (workers * 4))))
+    timings['рендеринг'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    write_archive(args.archive, results)
+    timings['запись архива'] = time.perf_counter() - started
+
+    issues = [
+        {'week': start_date, 'kind': kind, 'item': item, 'details': details}
+        for start_date, _, week_issues in results
+        for kind, item, details in week_issues
+    ]
+    issues.extend({'week': None, 'kind': 'sheet_row', 'item': number, 'details': error}
+                  for number, error in schedule.errors)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(issues, f, ensure_ascii=False, indent=2)
+
+    rendered = sum(1 for _, messages, _ in results if messages)
+    print(f"\n✅ Отрендерено недель: {rendered} из {len(schedule)} ({workers} процессов) → {args.archive} "
+          f"({os.path.getsize(args.archive) / 1024:.0f} КБ)", flush=True)
+    for stage, seconds in timings.items():
+        print(f"⏱️ {stage:<18} {seconds * 1000:9.1f} мс", flush=True)
+
+    notices = [issue for issue in issues if issue['kind'] in NOTICE_KINDS]
+    problems = [issue for issue in issues if issue['kind'] not in NOTICE_KINDS]
+    for title, items in (("ℹ️ Сообщения уйдут частями", notices), ("⚠️ Найдено проблем", problems)):
+        if items:
+            print(f"\n{title}: {len(items)}", flush=True)
+            for issue in items:
+                print(f"   {issue['week'] or '—'}  {issue['kind']:<15} {issue['item']}  {issue['details']}", flush=True)
+    if problems:
+        return 1
+    print("✅ Проблем не найдено", flush=True)
+    return 0
@@ -0,0 +1,67 @@
+"""
+Кэш отрендеренных недель на диске.
+
+Ключ — хэш строки недели из таблицы (вместе с версией шаблона), значение —
+готовые 7 сообщений. Неделя рендерится один раз, остальные дни берут
+сообщения из кэша без обращений к базе стихов.
+"""
+import hashlib
+import json
+import os
+import threading
+
+
+class RenderCache:
+    """Каталог JSON-файлов {ключ}.json со списками сообщений"""
+
+    def __init__(self, directory, salt='', max_entries=64):
+        self.directory = directory
+        self.salt = salt
+        self.max_entries = max_entries
+
+    def key(self, week_data):
+        """Хэш содержимого строки недели и соли (версии шаблона)"""
+        payload = json.dumps(week_data, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(f"{self.salt}\n{payload}".encode('utf-8')).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Список сообщений или None, если недели нет в кэше"""
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)['messages']
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError) as e:
+            print(f"⚠️ Повреждённая запись кэша {key}: {e}", flush=True)
+            return None
+
+    def put(self, key, messages):
+        """Атомарно сохраняет сообщения недели и удаляет самые старые записи"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # API может рендерить одну неделю в нескольких потоках сразу
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'messages': messages}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._prune()
+
+    def _prune(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    entries.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+                except FileNotFoundError:
+                    pass
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, name in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,201 @@
+"""
+Индекс расписания: недели плана, отсортированные по дате начала.
+
+ScheduleBuilder разбирает CSV построчно, по мере поступления ответа, и
+проверяет каждую строку один раз: дату start_date и все столбцы days_json_*
+(валидный JSON из 7 дней). Строки с ошибками в days_json_* остаются в
+индексе — ошибки копятся в errors, чтобы о них узнали до рендеринга.
+Туда же попадают недели, пересекающиеся с предыдущей: для дня в пересечении
+действует строка, стоящая в таблице выше. Готовый ScheduleIndex хранит
+порядковые номера дат начала в отсортированном списке, поэтому поиск
+недели, содержащей день, — это bisect, а сам индекс сохраняется на диск
+и работает без сети.
+"""
+import bisect
+import csv
+import json
+import os
+from datetime import date, datetime
+
+DATE_FORMAT = '%d.%m.%Y'
+DAYS_PREFIX = 'days_json_'
+WEEK_LENGTH = 7
+
+
+class ScheduleBuilder:
+    """Потоковый разбор CSV: feed_line() на каждую строку ответа, затем finish()"""
+
+    def __init__(self):
+        self.header = None
+        self.rows = []      # (ordinal даты начала, номер строки, строка)
+        self.active = None  # первая строка со status=active
+        self.errors = []    # (номер строки, описание)
+        self._pending = []
+        self._quotes = 0
+        self._line_number = 0
+
+    def feed_line(self, line):
+        """
+        Принимает одну строку текста (без перевода строки). Поля в кавычках
+        могут занимать несколько строк — запись собирается, пока число
+        кавычек нечётное.
+        """
+        self._pending.append(line)
+        self._quotes += line.count('"')
+        if self._quotes % 2:
+            return
+        record = '\n'.join(self._pending)
+        self._pending.clear()
+        self._quotes = 0
+        self._line_number += 1
+        if not record.strip():
+            return
+        fields = next(csv.reader([record]))
+        if self.header is None:
+            self.header = [name.strip() for name in fields]
+            return
+        self._add_row(dict(zip(self.header, fields)))
+
+    def _add_row(self, row):
+        number = self._line_number
+        if self.active is None and row.get('status', '').strip().lower() == 'active':
+            self.active = row
+
+        start_date_str = row.get('start_date', '').strip()
+        if not start_date_str:
+            return
+        try:
+            start_date = datetime.strptime(start_date_str, DATE_FORMAT).date()
+        except ValueError:
+            self.errors.append((number, f"неверный формат даты: {start_date_str}"))
+            return
+
+        for column, value in row.items():
+            if not column.startswith(DAYS_PREFIX):
+                continue
+            try:
+                days = json.loads(value)
+            except ValueError as e:
+                self.errors.append((number, f"{column}: невалидный JSON ({e})"))
+                continue
+            if not isinstance(days, list) or len(days) != WEEK_LENGTH:
+                self.errors.append((number, f"{column}: должно быть {WEEK_LENGTH} элементов"))
+
+        self.rows.append((start_date.toordinal(), number, row))
+
+    def finish(self, content_hash=None):
+        if self._pending:
+            self.errors.append((self._line_number + 1, "незакрытая кавычка в конце файла"))
+        self.rows.sort(key=lambda item: (item[0], item[1]))
+        for (previous, previous_number, _), (ordinal, number, _) in zip(self.rows, self.rows[1:]):
+            if ordinal - previous < WEEK_LENGTH:
+                self.errors.append((number, f"неделя пересекается с неделей из строки {previous_number}"))
+        return ScheduleIndex(
+            [ordinal for ordinal, _, _ in self.rows],
+            [row for _, _, row in self.rows],
+            active=self.active,
+            errors=self.errors,
+            content_hash=content_hash,
+            numbers=[number for _, number, _ in self.rows],
+        )
+
+
+class ScheduleIndex:
+    """Отсортированные недели плана с поиском за O(log n)"""
+
+    def __init__(self, starts, rows, active=None, errors=(), content_hash=None, numbers=None):
+        self.starts = starts
+        self.rows = rows
+        # Номера строк в таблице: при пересечении недель побеждает верхняя
+        self.numbers = numbers if numbers is not None else list(range(len(rows)))
+        self.active = active
+        self.errors = list(errors)
+        self.content_hash = content_hash
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def from_lines(cls, lines, content_hash=None):
+        builder = ScheduleBuilder()
+        for line in lines:
+            builder.feed_line(line)
+        return builder.finish(content_hash)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Индекс из локального CSV в формате выгрузки Google Sheets"""
+        with open(path, encoding='utf-8', newline='') as f:
+            return cls.from_lines(line.rstrip('\r\n') for line in f)
+
+    def week_of(self, day):
+        """
+        (дата начала, строка) недели, содержащей day, или None.
+        При пересечении недель берётся та, что выше в таблице
+        """
+        ordinal = day.toordinal()
+        # Кандидаты — недели, начавшиеся не раньше чем за WEEK_LENGTH - 1 дней
+        low = bisect.bisect_right(self.starts, ordinal - WEEK_LENGTH)
+        high = bisect.bisect_right(self.starts, ordinal)
+        if low == high:
+            return None
+        position = min(range(low, high), key=self.numbers.__getitem__)
+        return date.fromordinal(self.starts[position]), self.rows[position]
+
+    def find(self, day):
+        """Строка недели, содержащей day, или None"""
+        week = self.week_of(day)
+        return week[1] if week else None
+
+    # -------------------------------------------------------------------------
+    # Сохранение на диск
+    # -------------------------------------------------------------------------
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'content_hash': self.content_hash,
+                'starts': self.starts,
+                'rows': self.rows,
+                'numbers': self.numbers,
+                'active': self.active,
+                'errors': self.errors,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Индекс с диска или None, если файла нет или он повреждён"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(data['starts'], data['rows'], data.get('active'),
+                       [tuple(error) for error in data.get('errors', [])], data.get('content_hash'),
+                       data.get('numbers'))
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError) as e:
+            print(f"⚠️ Повреждённый индекс расписания {path}: {e}", flush=True)
+            return None
+
+
+def week_refs(row):
+    """
+    Все ссылки строки недели по всем столбцам days_json_* (в порядке дней).
+    Столбцы с ошибками пропускаются: о них уже сообщает ScheduleBuilder
+    """
+    refs = []
+    for column, value in row.items():
+        if not column.startswith(DAYS_PREFIX) or not value:
+            continue
+        try:
+            days = json.loads(value)
+        except ValueError:
+            continue
+        if isinstance(days, list):
+            refs.extend(str(day.get('ref', '')).strip() for day in days if isinstance(day, dict))
+    return refs
@@ -0,0 +1,192 @@
+"""
+Загрузка CSV-экспорта Google Sheets с условными запросами.
+
+Сохраняем на диск последнее тело ответа вместе с ETag / Last-Modified и
+хэшем содержимого. Следующий запрос отправляется с If-None-Match /
+If-Modified-Since: ответ 304 (или 200 с тем же хэшем) означает, что таблица
+не менялась, и вызывающий код может не разбирать её заново.
+
+Тело читается потоково: каждая строка сразу передаётся разборщику,
+хэшируется и дописывается во временный файл, так что ответ целиком
+в памяти не держится.
+
+SheetRefresher отвязывает загрузку таблицы от времени рассылки: фоновая
+задача раз в interval секунд обновляет локальный снимок расписания с
+повторами и экспоненциальной задержкой, а рассылка читает только снимок.
+Возраст снимка — время с последнего успешного обновления (mtime файла
+снимка, поэтому он переживает перезапуск).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+from metrics import REGISTRY
+
+
+class ConditionalFetcher:
+    """Условная загрузка одного URL с состоянием в каталоге state_dir"""
+
+    def __init__(self, state_dir, name='sheet'):
+        self.state_dir = state_dir
+        self.body_path = os.path.join(state_dir, f"{name}.csv")
+        self.meta_path = os.path.join(state_dir, f"{name}.json")
+        self._meta = None
+
+    def _load_meta(self):
+        if self._meta is None:
+            try:
+                with open(self.meta_path, encoding='utf-8') as f:
+                    self._meta = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._meta = {}
+            if not os.path.exists(self.body_path):
+                self._meta = {}
+        return self._meta
+
+    def _save_meta(self, meta):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+        self._meta = meta
+
+    def iter_cached_lines(self):
+        """Строки последнего сохранённого тела ответа (пусто, если его нет)"""
+        try:
+            with open(self.body_path, encoding='utf-8', newline='') as f:
+                for line in f:
+                    yield line.rstrip('\r\n')
+        except FileNotFoundError:
+            return
+
+    async def fetch(self, client, url, on_line=None, timeout=60.0):
+        """
+        Загружает url через httpx.AsyncClient, передавая каждую строку
+        в on_line(line). Возвращает (хэш содержимого, изменился ли текст);
+        при ответе 304 строки не передаются.
+        """
+        meta = self._load_meta()
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        async with client.stream('GET', url, headers=headers, timeout=timeout) as response:
+            if response.status_code == 304:
+                return meta['sha256'], False
+            response.raise_for_status()
+
+            os.makedirs(self.state_dir, exist_ok=True)
+            tmp_path = f"{self.body_path}.tmp"
+            digest = hashlib.sha256()
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                async for line in response.aiter_lines():
+                    line = line.rstrip('\r\n')
+                    digest.update(line.encode('utf-8'))
+                    digest.update(b'\n')
+                    f.write(line)
+                    f.write('\n')
+                    if on_line is not None:
+                        on_line(line)
+            new_meta = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'sha256': digest.hexdigest(),
+            }
+
+        changed = new_meta['sha256'] != meta.get('sha256')
+        if changed:
+            os.replace(tmp_path, self.body_path)
+        else:
+            os.remove(tmp_path)
+        if new_meta != meta:
+            self._save_meta(new_meta)
+        return new_meta['sha256'], changed
+
+
+class SheetRefresher:
+    """
+    Фоновое обновление снимка. refresh() — корутина, которая загружает
+    таблицу, проверяет её и атомарно сохраняет снимок в snapshot_path,
+    а при ошибке сети или негодной таблице бросает исключение (прежний
+    снимок остаётся)
+    """
+
+    def __init__(self, refresh, snapshot_path, interval=900.0, attempts=4, base_backoff=5.0, max_backoff=300.0,
+                 registry=REGISTRY):
+        self.refresh = refresh
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self.attempts = attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.last_error = None
+        self._lock = asyncio.Lock()
+        self._task = None
+        self.fetches = registry.histogram('sheet_fetch_seconds', "Фоновая загрузка таблицы: длительность попытки, с")
+        self.results = registry.counter('sheet_refresh_total', "Попытки обновления снимка таблицы", ['result'])
+        registry.gauge('sheet_snapshot_age_seconds', "Время с последнего успешного обновления снимка, с",
+                       self.staleness)
+
+    def staleness(self):
+        """Секунды с последнего успешного обновления или None, если снимка нет"""
+        try:
+            return max(0.0, time.time() - os.path.getmtime(self.snapshot_path))
+        except OSError:
+            return None
+
+    async def refresh_once(self):
+        """
+        Обновление с повторами: задержка base_backoff * 2^(попытка-1) со
+        случайным разбросом, не больше max_backoff. True при успехе
+        """
+        async with self._lock:
+            for attempt in range(1, self.attempts + 1):
+                started = time.perf_counter()
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    self.fetches.observe(time.perf_counter() - started)
+                    self.results.inc(labels=('error',))
+                    self.last_error = str(e) or type(e).__name__
+                    if attempt == self.attempts:
+                        break
+                    delay = min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                    print(f"⚠️ Обновление таблицы, попытка {attempt}/{self.attempts}: {self.last_error}; "
+                          f"повтор через {delay:.0f} с", flush=True)
+                    await asyncio.sleep(delay)
+                    continue
+                self.fetches.observe(time.perf_counter() - started)
+                self.results.inc(labels=('ok',))
+                self.last_error = None
+                # Неизменившаяся таблица не переписывает снимок — отмечаем проверку
+                if os.path.exists(self.snapshot_path):
+                    os.utime(self.snapshot_path)
+                return True
+
+        age = self.staleness()
+        age_text = 'снимка нет' if age is None else f"снимку {age / 3600:.1f} ч"
+        print(f"❌ Таблица не обновлена (попыток: {self.attempts}): {self.last_error} ({age_text})", flush=True)
+        return False
+
+    async def run(self):
+        """Обновление сразу и затем каждые interval секунд"""
+        while True:
+            await self.refresh_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
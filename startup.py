@@ -0,0 +1,76 @@
+"""
+Замеры запуска процесса и ленивый импорт тяжёлых зависимостей.
+
+main.py импортирует этот модуль первым, поэтому отсчёт идёт почти от
+начала работы интерпретатора. Тяжёлые библиотеки (telegram, httpx,
+apscheduler) импортируются через lazy_import уже после того, как /health
+отвечает: время каждого импорта попадает в разбивку, которую main печатает
+в конце запуска (и пишет JSON-строкой startup).
+"""
+import importlib
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # не Unix
+    resource = None
+
+
+class StartupTimer:
+    """Этапы запуска: (название, длительность в секундах) в порядке завершения"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self._last = self.started
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        """Секунды с начала отсчёта"""
+        return time.perf_counter() - self.started
+
+    def mark(self, name):
+        """Завершает этап name: его длительность — время с предыдущей отметки"""
+        now = time.perf_counter()
+        with self._lock:
+            self.phases.append((name, now - self._last))
+            self._last = now
+
+    def lazy_import(self, module):
+        """Модуль по имени; первый импорт замеряется и попадает в разбивку"""
+        loaded = sys.modules.get(module)
+        if loaded is not None:
+            return loaded
+        started = time.perf_counter()
+        loaded = importlib.import_module(module)
+        with self._lock:
+            now = time.perf_counter()
+            self.phases.append((f"import {module}", now - started))
+            self._last = max(self._last, now)
+        return loaded
+
+    def report(self):
+        """Разбивка одной строкой для печати и словарь для JSON-лога"""
+        with self._lock:
+            phases = list(self.phases)
+        fields = {name: round(seconds * 1000, 1) for name, seconds in phases}
+        fields['total_ms'] = round(self.elapsed() * 1000, 1)
+        rss = peak_rss_mb()
+        if rss is not None:
+            fields['peak_rss_mb'] = round(rss, 1)
+        text = ' · '.join(f"{name} {seconds * 1000:.0f} мс" for name, seconds in phases)
+        return text, fields
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса в МБ (None, если платформа не сообщает)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+STARTUP = StartupTimer()
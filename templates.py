@@ -0,0 +1,333 @@
+"""
+Шаблоны сообщений плана.
+
+План может содержать любое число возрастных групп («треков»). Трек — это
+суффикс столбцов таблицы: days_json_<трек>, lesson_url_<трек>,
+main_point_<трек> (0_3, 3_15, teens, adults, ...). Треки находятся по
+столбцам строки недели, так что новая группа появляется в сообщениях,
+как только в таблицу добавлены её столбцы.
+
+Макет (layout) — шаблон сообщения дня: заголовок и секция, которая
+повторяется для каждого трека. Шаблоны разбираются один раз при загрузке
+в список (литерал, поле); сборка сообщения — один проход с join, без
+str.format. Все значения из таблицы и тексты стихов экранируются для
+HTML-режима Telegram, разметку задают только шаблоны.
+
+Собственные треки и макеты описываются в JSON-файле (TEMPLATES_FILE):
+
+    {
+      "tracks": {"teens": {"title": "ПОДРОСТКАМ", "emoji": "🔥", "label": "подростки", "order": 1}},
+      "layouts": {"short": {"section": "{emoji} <b>{ref}</b>\\n{verse_text}", "separator": "\\n\\n"}}
+    }
+
+Сообщение длиннее лимита Telegram делится split_message на части по
+абзацам, строкам или словам; открытые теги закрываются в конце части и
+открываются заново в начале следующей.
+"""
+import hashlib
+import html
+import json
+import re
+import string
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from schedule_index import DATE_FORMAT, DAYS_PREFIX, WEEK_LENGTH
+
+# Лимит Telegram на длину текста после разбора HTML-разметки
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Меняется, когда код сборки меняет результат при тех же шаблонах
+# (входит в соль кэша рендера)
+RENDER_VERSION = 2
+
+WEEKDAYS_RU = ['понедельник', 'вторник', 'среда', 'четверг', 'пятница', 'суббота', 'воскресенье']
+
+DEFAULT_HEADER = "<i>{date_formatted}</i>\n\n"
+
+DEFAULT_SECTION = """{emoji} <b>{title}</b>
+
+{ref}
+
+❤️ {verse_text}{note_line}
+
+<b>Основная мысль урока</b> (можно подчеркнуть при рассуждении над текстом Библии):
+
+✅ {main_point}
+
+<b>Прочитать текст урока, {label}:</b>
+{lesson_url}"""
+
+DEFAULT_SEPARATOR = "\n\n\n"
+
+
+# =============================================================================
+# КОМПИЛЯЦИЯ ШАБЛОНОВ
+# =============================================================================
+
+class CompiledTemplate:
+    """Шаблон, разобранный один раз: пары (литерал, имя поля или None)"""
+
+    def __init__(self, source):
+        self.source = source
+        self.parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(source):
+            if field is not None and (not field or spec or conversion):
+                raise ValueError(f"Поле шаблона должно быть именем без форматирования: {source!r}")
+            self.parts.append((literal, field))
+        self.fields = frozenset(field for _, field in self.parts if field)
+
+    def render(self, values):
+        """Подставляет values (уже экранированные); отсутствующие поля — пустая строка"""
+        return ''.join([literal + values.get(field, '') if field else literal for literal, field in self.parts])
+
+
+class Track(NamedTuple):
+    """Возрастная группа: суффикс столбцов таблицы и оформление её секции"""
+    key: str
+    title: str
+    emoji: str = '📖'
+    label: str = ''
+    show_note: bool = True
+    order: int = 100
+
+
+# Сообщение по умолчанию: сначала 3-15 лет, затем 0-3 (заметка — только у малышей)
+BUILTIN_TRACKS = {
+    '3_15': Track('3_15', 'ДЕТЯМ И ПОДРОСТКАМ 3-15 ЛЕТ', '🚀', 'дети 3-15 лет', show_note=False, order=0),
+    '0_3': Track('0_3', 'ДЕТЯМ ОТ 0 ДО 3 ЛЕТ', '🧸', 'дети 0-3 лет', show_note=True, order=1),
+}
+
+
+class Layout:
+    """Макет сообщения дня; шаблоны компилируются при создании"""
+
+    def __init__(self, name, header=DEFAULT_HEADER, section=DEFAULT_SECTION, separator=DEFAULT_SEPARATOR, tracks=None):
+        self.name = name
+        self.header = CompiledTemplate(header)
+        self.section = CompiledTemplate(section)
+        self.separator = separator
+        self.tracks = list(tracks) if tracks else None  # порядок и отбор треков; None — все
+
+    def describe(self):
+        return {'name': self.name, 'header': self.header.source, 'section': self.section.source,
+                'separator': self.separator, 'tracks': self.tracks}
+
+
+# =============================================================================
+# СБОРКА СООБЩЕНИЙ
+# =============================================================================
+
+def _escape(value):
+    return html.escape(str(value), quote=False)
+
+
+class MessageRenderer:
+    """Треки и макеты; рендер недели по строке таблицы"""
+
+    def __init__(self, tracks=None, layouts=None, default='default'):
+        self.tracks = dict(BUILTIN_TRACKS)
+        self.tracks.update(tracks or {})
+        self.layouts = {default: Layout(default)}
+        self.layouts.update(layouts or {})
+        self.default = default
+        self.salt = hashlib.sha256(json.dumps(
+            [RENDER_VERSION, [track for _, track in sorted(self.tracks.items())],
+             [layout.describe() for _, layout in sorted(self.layouts.items())]],
+            ensure_ascii=False,
+        ).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_file(cls, path):
+        """Встроенные треки и макет default плюс описания из JSON-файла (если он есть)"""
+        config = {}
+        if path:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    config = json.load(f)
+            except FileNotFoundError:
+                pass
+        tracks = {key: Track(key, **fields) for key, fields in config.get('tracks', {}).items()}
+        layouts = {name: Layout(name, **fields) for name, fields in config.get('layouts', {}).items()}
+        return cls(tracks, layouts)
+
+    def layout(self, name=None):
+        """Макет по имени; ValueError для неизвестного"""
+        layout = self.layouts.get(name or self.default)
+        if layout is None:
+            raise ValueError(f"Неизвестный макет: {name}")
+        return layout
+
+    def track(self, key):
+        """Описание трека; для незнакомого суффикса — оформление по умолчанию"""
+        track = self.tracks.get(key)
+        if track is None:
+            track = Track(key, key.replace('_', '-').upper(), label=key.replace('_', '-'))
+        return track
+
+    def tracks_of(self, row, layout):
+        """Треки строки (непустые столбцы days_json_*) в порядке макета"""
+        present = [
+            column[len(DAYS_PREFIX):] for column, value in row.items()
+            if column.startswith(DAYS_PREFIX) and value and value.strip()
+        ]
+        if layout.tracks is not None:
+            return [self.track(key) for key in layout.tracks if key in present]
+        return sorted((self.track(key) for key in present), key=lambda track: (track.order, track.key))
+
+    def render_week(self, row, fetch_verses, layout=None):
+        """
+        7 сообщений недели по строке таблицы. fetch_verses(refs) -> {ref: текст}
+        вызывается один раз на всю неделю. ValueError при ошибке в данных
+        """
+        layout = self.layout(layout)
+        start_date = datetime.strptime(row.get('start_date', '').strip(), DATE_FORMAT).date()
+        tracks = self.tracks_of(row, layout)
+        if not tracks:
+            raise ValueError(f"В строке недели нет треков ({DAYS_PREFIX}*)")
+
+        # Разбор дней и постоянные поля секции — один раз на трек
+        sections = []
+        refs = []
+        for track in tracks:
+            column = f"{DAYS_PREFIX}{track.key}"
+            days = json.loads(row[column])
+            if len(days) != WEEK_LENGTH:
+                raise ValueError(f"В {column} должно быть {WEEK_LENGTH} элементов, найдено {len(days)}")
+            suffix = f"_{track.key}"
+            static = {
+                column_name[:-len(suffix)]: _escape(value.strip())
+                for column_name, value in row.items()
+                if column_name.endswith(suffix) and not column_name.startswith(DAYS_PREFIX) and value
+            }
+            static.update(emoji=track.emoji, title=_escape(track.title), label=_escape(track.label))
+            days = [{key: str(value).strip() for key, value in day.items()} for day in days]
+            refs.extend(day.get('ref', '') for day in days)
+            sections.append((track, static, days))
+
+        verse_texts = fetch_verses(refs)
+
+        messages = []
+        for day_index in range(WEEK_LENGTH):
+            current_date = start_date + timedelta(days=day_index)
+            parts = []
+            for track, static, days in sections:
+                day = days[day_index]
+                values = dict(static)
+                values.update((key, _escape(value)) for key, value in day.items())
+                values['verse_text'] = _escape(verse_texts.get(day.get('ref', ''), ''))
+                note = values.get('note', '')
+                values['note_line'] = f"\n<i>{note}</i>" if track.show_note and note else ''
+                parts.append(layout.section.render(values))
+            header = layout.header.render({
+                'date': current_date.strftime(DATE_FORMAT),
+                'weekday': WEEKDAYS_RU[day_index],
+                'date_formatted': f"{current_date.strftime(DATE_FORMAT)} – {WEEKDAYS_RU[day_index]}",
+            })
+            messages.append(header + layout.separator.join(parts))
+        return messages
+
+
+# =============================================================================
+# ДЕЛЕНИЕ ДЛИННЫХ СООБЩЕНИЙ
+# =============================================================================
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_TOKEN_RE = re.compile(r'(<[^>]+>|&#?\w+;)')
+_SEPARATORS = ('\n\n', '\n', ' ')
+
+
+def visible_length(message):
+    """
+    Длина сообщения так, как её считает Telegram: без тегов, сущности —
+    один символ, в единицах UTF-16 (эмодзи — два)
+    """
+    return len(html.unescape(_TAG_RE.sub('', message)).encode('utf-16-le')) // 2
+
+
+def split_message(message, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Части сообщения не длиннее limit; короткое сообщение возвращается как есть"""
+    if len(message) <= limit or visible_length(message) <= limit:
+        return [message]
+    chunks = []
+    current = ''
+    length = 0
+    for piece in _pieces(message, limit, _SEPARATORS):
+        piece_length = visible_length(piece)
+        if current and length + piece_length > limit:
+            chunks.append(current)
+            current, length = '', 0
+        current += piece
+        length += piece_length
+    chunks.append(current)
+    return _balance_tags(chunks)
+
+
+def _pieces(text, limit, separators):
+    """Куски text не длиннее limit, разрезанные по первому подходящему разделителю вне тегов"""
+    if visible_length(text) <= limit:
+        return [text]
+    if not separators:
+        return _hard_split(text, limit)
+    separator = separators[0]
+    parts = []
+    current = ''
+    for token in _TOKEN_RE.split(text):
+        if token.startswith('<') or token.startswith('&'):
+            current += token
+            continue
+        pieces = token.split(separator)
+        for piece in pieces[:-1]:
+            parts.append(current + piece + separator)
+            current = ''
+        current += pieces[-1]
+    if current:
+        parts.append(current)
+    result = []
+    for part in parts:
+        result.extend(_pieces(part, limit, separators[1:]))
+    return result
+
+
+def _hard_split(text, limit):
+    """Последний случай — слово длиннее лимита: режем по символам, не разрывая теги и сущности"""
+    parts = []
+    current = ''
+    length = 0
+    for token in _TOKEN_RE.split(text):
+        atoms = [token] if token.startswith('<') or token.startswith('&') else list(token)
+        for atom in atoms:
+            atom_length = visible_length(atom)
+            if current and length + atom_length > limit:
+                parts.append(current)
+                current, length = '', 0
+            current += atom
+            length += atom_length
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _tag_name(tag):
+    return tag.strip('</>').split()[0].lower() if tag.strip('</>') else ''
+
+
+def _balance_tags(chunks):
+    """Закрывает теги, открытые в конце части, и открывает их заново в следующей"""
+    result = []
+    carry = []
+    for chunk in chunks:
+        opened = list(carry)
+        for tag in _TAG_RE.findall(chunk):
+            if tag.startswith('</'):
+                name = _tag_name(tag)
+                for position in range(len(opened) - 1, -1, -1):
+                    if _tag_name(opened[position]) == name:
+                        del opened[position]
+                        break
+            elif not tag.endswith('/>'):
+                opened.append(tag)
+        if visible_length(chunk.strip()):
+            result.append(''.join(carry) + chunk.strip() + ''.join(f"</{_tag_name(tag)}>" for tag in reversed(opened)))
+        carry = opened
+    return result
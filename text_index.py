@@ -0,0 +1,218 @@
+"""
+Компактный индекс текста перевода в памяти процесса.
+
+Весь перевод лежит в одном непрерывном UTF-8 буфере: каждый стих записан
+с завершающим пробелом, а массив offsets хранит начало каждого слота.
+Слоты пронумерованы плотным порядковым номером (книга, глава, стих):
+
+    book_base[book]          — номер первой главы книги в chapter_start
+    chapter_start[k]         — порядковый номер стиха 1 главы k
+    offsets[ordinal]         — смещение стиха в буфере
+
+Отсутствующие стихи — слоты нулевой длины, поэтому диапазон
+«Псалтирь 22:1-3» — это один срез буфера без SQL и без склейки строк.
+Индекс сохраняется в файл-спутник и открывается через mmap, так что
+несколько процессов делят одни и те же страницы page cache.
+"""
+import array
+import asyncio
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+
+MAGIC = b'MBPTIX01'
+HEADER = struct.Struct('<8sIIII')  # magic, len(book_base), len(chapter_start), len(offsets), len(buffer)
+SEPARATOR = b' '
+
+
+class TextIndex:
+    """
+    Индекс стихов с тем же интерфейсом чтения, что и VerseStore:
+    fetch / fetch_many / run / fetch_async / fetch_many_async / close.
+    """
+
+    def __init__(self, book_base, chapter_start, offsets, buffer, mapped=None):
+        self.book_base = book_base
+        self.chapter_start = chapter_start
+        self.offsets = offsets
+        self.buffer = buffer
+        self._mapped = mapped
+
+    # -------------------------------------------------------------------------
+    # Построение и сериализация
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_db(cls, db_path):
+        """Загружает весь перевод из таблицы verses одним проходом"""
+        conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT book, chapter, verse, text FROM verses WHERE verse > 0 ORDER BY book, chapter, verse"
+            ).fetchall()
+            max_verse = dict(((book, chapter), verse) for book, chapter, verse in conn.execute(
+                "SELECT book, chapter, MAX(verse) FROM verses GROUP BY book, chapter"
+            ))
+        finally:
+            conn.close()
+
+        max_book = max((book for book, _ in max_verse), default=0)
+        chapters_in_book = [0] * (max_book + 1)
+        for book, chapter in max_verse:
+            chapters_in_book[book] = max(chapters_in_book[book], chapter)
+
+        book_base = array.array('I', [0] * (max_book + 2))
+        chapter_start = array.array('I')
+        ordinal = 0
+        for book in range(max_book + 1):
+            book_base[book] = len(chapter_start)
+            for chapter in range(1, chapters_in_book[book] + 1):
+                chapter_start.append(ordinal)
+                ordinal += max_verse.get((book, chapter), 0)
+        book_base[max_book + 1] = len(chapter_start)
+        chapter_start.append(ordinal)
+
+        offsets = array.array('I', [0] * (ordinal + 1))
+        buffer = bytearray()
+        position = 0
+        for book, chapter, verse, text in rows:
+            slot = chapter_start[book_base[book] + chapter - 1] + verse - 1
+            # Заполняем смещения пропущенных слотов (стихи нулевой длины)
+            while position <= slot:
+                offsets[position] = len(buffer)
+                position += 1
+            buffer += text.encode('utf-8') + SEPARATOR
+        while position <= ordinal:
+            offsets[position] = len(buffer)
+            position += 1
+
+        return cls(book_base, chapter_start, offsets, bytes(buffer))
+
+    def save(self, path):
+        """Атомарно записывает индекс в файл-спутник"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self.book_base), len(self.chapter_start),
+                                len(self.offsets), len(self.buffer)))
+            for arr in (self.book_base, self.chapter_start, self.offsets):
+                f.write(_to_little_endian(arr).tobytes())
+            f.write(self.buffer)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Открывает файл-спутник через mmap без копирования в память процесса"""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_books, n_chapters, n_offsets, n_buffer = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            mapped.close()
+            raise ValueError(f"Неверный формат индекса: {path}")
+
+        view = memoryview(mapped)
+        position = HEADER.size
+        arrays = []
+        for count in (n_books, n_chapters, n_offsets):
+            chunk = view[position:position + count * 4]
+            arrays.append(chunk.cast('I') if sys.byteorder == 'little' else _from_little_endian(chunk))
+            position += count * 4
+        buffer = view[position:position + n_buffer]
+        return cls(*arrays, buffer, mapped=mapped)
+
+    @classmethod
+    def open_sidecar(cls, db_path, index_path):
+        """
+        Открывает файл-спутник; если его нет или он старше базы —
+        сначала перестраивает из базы.
+        """
+        if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(db_path):
+            cls.from_db(db_path).save(index_path)
+        return cls.load(index_path)
+
+    def close(self):
+        if self._mapped is not None:
+            self.book_base = self.chapter_start = self.offsets = self.buffer = None
+            self._mapped.close()
+            self._mapped = None
+
+    # -------------------------------------------------------------------------
+    # Поиск
+    # -------------------------------------------------------------------------
+
+    def chapter_slots(self, book_number, chapter):
+        """(первый слот, число стихов) главы или None"""
+        if not 0 <= book_number < len(self.book_base) - 1:
+            return None
+        base = self.book_base[book_number]
+        if not 1 <= chapter <= self.book_base[book_number + 1] - base:
+            return None
+        first = self.chapter_start[base + chapter - 1]
+        return first, self.chapter_start[base + chapter] - first
+
+    def fetch(self, book_number, chapter, verse_start, verse_end):
+        """Текст стиха или диапазона — один срез буфера"""
+        slots = self.chapter_slots(book_number, chapter)
+        if slots is None:
+            return None
+        first, count = slots
+        verse_start = max(verse_start, 1)
+        verse_end = min(verse_end, count)
+        if verse_start > verse_end:
+            return None
+        start = self.offsets[first + verse_start - 1]
+        end = self.offsets[first + verse_end]
+        if start == end:
+            return None
+        return bytes(self.buffer[start:end - len(SEPARATOR)]).decode('utf-8')
+
+    def fetch_many(self, refs):
+        return {ref: self.fetch(*ref) for ref in set(refs)}
+
+    async def run(self, func, *args):
+        """
+        Выполняет func(*args) в пуле потоков по умолчанию: через run с event
+        loop уносится и работа помимо поиска (рендер недели с кэшем на диске,
+        чтение других переводов из SQLite)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    # Поиск по индексу — микросекунды, отдельный поток не нужен
+    async def fetch_async(self, book_number, chapter, verse_start, verse_end):
+        return self.fetch(book_number, chapter, verse_start, verse_end)
+
+    async def fetch_many_async(self, refs):
+        return self.fetch_many(refs)
+
+
+def _to_little_endian(arr):
+    if sys.byteorder == 'little':
+        return arr
+    swapped = array.array(arr.typecode, arr)
+    swapped.byteswap()
+    return swapped
+
+
+def _from_little_endian(chunk):
+    arr = array.array('I', chunk.tobytes())
+    arr.byteswap()
+    return arr
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Сборка файла-спутника с индексом текста")
+    parser.add_argument('db_path', nargs='?', default='synodal.sqlite')
+    parser.add_argument('index_path', nargs='?')
+    args = parser.parse_args()
+    index_path = args.index_path or f"{args.db_path}.idx"
+
+    started = time.perf_counter()
+    index = TextIndex.from_db(args.db_path)
+    index.save(index_path)
+    print(f"✅ Индекс записан: {index_path} ({os.path.getsize(index_path) / 1024 / 1024:.1f} МБ, "
+          f"{len(index.offsets) - 1} стихов, {time.perf_counter() - started:.2f} с)", flush=True)
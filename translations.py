@@ -0,0 +1,290 @@
+"""
+Реестр переводов Библии.
+
+Каждый перевод — отдельная база стихов той же схемы, что synodal.sqlite
+(или её mmap-индекс text_index). Описания переводов лежат в JSON-файле:
+
+    [
+      {"code": "ubio", "name": "Огієнка", "language": "uk", "path": "ubio.sqlite"},
+      {"code": "kjv", "name": "King James", "language": "en", "path": "kjv.sqlite",
+       "index": "mmap", "versification": "kjv"}
+    ]
+
+Источник текста открывается при первом обращении и живёт в LRU-кэше из
+max_open переводов; вытесненный перевод закрывается (после того как его
+отпустит последний читатель), так что неиспользуемые переводы почти не
+занимают памяти. Поиск перевода, парсера и правил нумерации — обращения
+к словарям, поэтому стоимость запроса не зависит от числа переводов.
+
+Ссылки плана записаны в синодальной нумерации. Versification переводит
+их в нумерацию перевода: встроенная таблица kjv покрывает сдвиг глав
+Псалтири (Пс 9–147) и Рим 14:24–26 → 16:25–27; сдвиг стихов из-за
+надписаний псалмов в неё не входит и добавляется правилами из JSON.
+"""
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from bible_ref import LANGUAGE_ALIASES, WHOLE_CHAPTER, RefParser, VerseSpan
+from text_index import TextIndex
+from verse_store import VerseStore
+
+
+# =============================================================================
+# НУМЕРАЦИЯ СТИХОВ
+# =============================================================================
+
+class VerseMap(NamedTuple):
+    """
+    Стихи verse_start..verse_end главы в синодальной нумерации → глава и сдвиг
+    стиха в переводе; target_end — последний стих перевода, который даёт правило
+    """
+    book: int
+    chapter: int
+    verse_start: int
+    verse_end: int
+    target_chapter: int
+    verse_delta: int
+    target_end: int = WHOLE_CHAPTER
+
+
+class Versification:
+    """Правила перевода синодальной нумерации в нумерацию перевода"""
+
+    def __init__(self, name, rules=()):
+        self.name = name
+        self._rules = {}
+        for rule in rules:
+            self._rules.setdefault((rule.book, rule.chapter), []).append(VerseMap(*rule))
+        for chapter_rules in self._rules.values():
+            chapter_rules.sort(key=lambda rule: rule.verse_start)
+
+    @classmethod
+    def from_json(cls, path):
+        """
+        Правила из файла: список [книга, глава, стих_от, стих_до, глава_перевода,
+        сдвиг] и необязательный последний стих перевода
+        """
+        with open(path, encoding='utf-8') as f:
+            return cls(path, [VerseMap(*rule) for rule in json.load(f)])
+
+    def map_span(self, span):
+        """
+        Отрезки перевода для отрезка плана. Части, не покрытые правилами,
+        остаются как есть; отрезок на стыке правил делится на несколько
+        """
+        rules = self._rules.get((span.book, span.chapter))
+        if not rules:
+            return (span,)
+        result = []
+        position = span.verse_start
+        for rule in rules:
+            if rule.verse_end < position or rule.verse_start > span.verse_end:
+                continue
+            if rule.verse_start > position:
+                result.append(span._replace(verse_start=position, verse_end=rule.verse_start - 1))
+                position = rule.verse_start
+            end = min(span.verse_end, rule.verse_end)
+            target_end = min(rule.target_end, end if end == WHOLE_CHAPTER else end + rule.verse_delta)
+            # Стихи, которым в переводе нет номера (надписания), пропускаются
+            target_start = max(1, position + rule.verse_delta)
+            if target_start <= target_end:
+                result.append(VerseSpan(span.book, rule.target_chapter, target_start, target_end))
+            position = end + 1
+            if position > span.verse_end:
+                break
+        if position <= span.verse_end:
+            result.append(span._replace(verse_start=position))
+        return tuple(result)
+
+
+def _kjv_rules():
+    psalms = 19
+    rules = [
+        (psalms, 9, 1, 21, 9, -1),
+        (psalms, 9, 22, WHOLE_CHAPTER, 10, -21),
+        (psalms, 113, 1, 8, 114, 0),
+        (psalms, 113, 9, WHOLE_CHAPTER, 115, -8),
+        # Пс 114 и 146 — только начало глав 116 и 147 KJV, продолжение — Пс 115 и 147
+        (psalms, 114, 1, WHOLE_CHAPTER, 116, 0, 9),
+        (psalms, 115, 1, WHOLE_CHAPTER, 116, 9),
+        (psalms, 146, 1, WHOLE_CHAPTER, 147, 0, 11),
+        (psalms, 147, 1, WHOLE_CHAPTER, 147, 11),
+        (45, 14, 24, 26, 16, 1),
+    ]
+    rules.extend((psalms, chapter, 1, WHOLE_CHAPTER, chapter + 1, 0) for chapter in range(10, 113))
+    rules.extend((psalms, chapter, 1, WHOLE_CHAPTER, chapter + 1, 0) for chapter in range(116, 146))
+    return [VerseMap(*rule) for rule in rules]
+
+
+VERSIFICATIONS = {
+    'synodal': Versification('synodal'),
+    'kjv': Versification('kjv', _kjv_rules()),
+}
+
+
+# =============================================================================
+# РЕЕСТР
+# =============================================================================
+
+class Translation(NamedTuple):
+    """
+    Описание перевода. index: 'sqlite', 'mmap' (файл <path>.idx) или 'memory';
+    versification: имя встроенной таблицы (VERSIFICATIONS) или путь к JSON с правилами
+    """
+    code: str
+    name: str
+    language: str
+    path: str
+    index: str = 'sqlite'
+    versification: str = 'synodal'
+
+
+class _OpenSource:
+    """Открытый источник текста и число читателей, которые его держат"""
+
+    def __init__(self, source):
+        self.source = source
+        self.users = 0
+        self.evicted = False
+
+
+class TranslationRegistry:
+    """Переводы по коду, ленивое открытие источников и LRU из max_open открытых"""
+
+    def __init__(self, translations, default, max_open=2):
+        self.translations = {translation.code: translation for translation in translations}
+        self.translations.setdefault(default.code, default)
+        self.default = default.code
+        self.max_open = max_open
+        self._open = OrderedDict()   # код -> _OpenSource
+        self._parsers = {}
+        self._versifications = dict(VERSIFICATIONS)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, default, max_open=2):
+        """Реестр из JSON-файла; без файла в нём только перевод по умолчанию"""
+        translations = []
+        if path:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    translations = [Translation(**item) for item in json.load(f)]
+            except FileNotFoundError:
+                pass
+        return cls(translations, default, max_open)
+
+    def get(self, code=None):
+        """Описание перевода; ValueError для неизвестного кода"""
+        translation = self.translations.get(code or self.default)
+        if translation is None:
+            raise ValueError(f"Неизвестный перевод: {code}")
+        return translation
+
+    # -------------------------------------------------------------------------
+    # Ссылки и нумерация
+    # -------------------------------------------------------------------------
+
+    def parser(self, language):
+        """RefParser для языка (строится при первом обращении)"""
+        parser = self._parsers.get(language)
+        if parser is None:
+            aliases = LANGUAGE_ALIASES.get(language, LANGUAGE_ALIASES['ru'])
+            parser = self._parsers.setdefault(language, RefParser(aliases))
+        return parser
+
+    def parse(self, ref, code=None):
+        """
+        Разбирает ссылку на языке перевода, затем по-русски (ссылки плана).
+        Возвращает (BibleRef, native): native — ссылка на языке перевода и уже
+        в его нумерации. ValueError, если не подошёл ни один парсер
+        """
+        language = self.get(code).language
+        if language != 'ru':
+            try:
+                return self.parser(language).parse(ref), True
+            except ValueError:
+                pass
+        return self.parser('ru').parse(ref), False
+
+    def versification(self, code=None):
+        name = self.get(code).versification
+        versification = self._versifications.get(name)
+        if versification is None:
+            versification = self._versifications.setdefault(name, Versification.from_json(name))
+        return versification
+
+    # -------------------------------------------------------------------------
+    # Источники текста
+    # -------------------------------------------------------------------------
+
+    def _open_source(self, translation):
+        if translation.index == 'mmap':
+            return TextIndex.open_sidecar(translation.path, f"{translation.path}.idx")
+        if translation.index == 'memory':
+            return TextIndex.from_db(translation.path)
+        return VerseStore(translation.path, pool_size=2, max_workers=2)
+
+    @contextmanager
+    def source(self, code=None):
+        """
+        Источник текста перевода на время блока with. Открывается лениво;
+        вытесненный из LRU источник закрывается, когда его отпустят все читатели
+        """
+        translation = self.get(code)
+        to_close = []
+        with self._lock:
+            entry = self._open.get(translation.code)
+            if entry is None:
+                entry = self._open[translation.code] = _OpenSource(self._open_source(translation))
+                while len(self._open) > self.max_open:
+                    _, evicted = self._open.popitem(last=False)
+                    evicted.evicted = True
+                    if evicted.users == 0:
+                        to_close.append(evicted.source)
+            else:
+                self._open.move_to_end(translation.code)
+            entry.users += 1
+        for source in to_close:
+            source.close()
+
+        try:
+            yield entry.source
+        finally:
+            with self._lock:
+                entry.users -= 1
+                close = entry.evicted and entry.users == 0
+            if close:
+                entry.source.close()
+
+    def fetch_many(self, spans, code=None, native=False):
+        """
+        {отрезок: текст или None} в переводе code. Отрезки плана переводятся
+        в нумерацию перевода (если правило разбило отрезок, части склеиваются);
+        native=True — отрезки уже в нумерации перевода
+        """
+        if native:
+            mapped = {span: (span,) for span in set(spans)}
+        else:
+            versification = self.versification(code)
+            mapped = {span: versification.map_span(span) for span in set(spans)}
+        with self.source(code) as source:
+            fetched = source.fetch_many([part for parts in mapped.values() for part in parts])
+        result = {}
+        for span, parts in mapped.items():
+            texts = [fetched[part] for part in parts if fetched[part] is not None]
+            result[span] = ' '.join(texts) if texts else None
+        return result
+
+    def open_codes(self):
+        """Коды переводов, источники которых сейчас открыты"""
+        return list(self._open)
+
+    def close(self):
+        with self._lock:
+            entries = list(self._open.values())
+            self._open.clear()
+        for entry in entries:
+            entry.source.close()
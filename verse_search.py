@@ -0,0 +1,188 @@
+"""
+Полнотекстовый поиск по стихам.
+
+Индекс FTS5 строится один раз из таблицы verses и лежит в отдельной
+базе-спутнике (synodal.sqlite.fts), основная база не меняется. В индекс
+пишется свёрнутый текст стиха: нижний регистр, ё → е, пунктуация → пробел;
+запрос сворачивается так же, поэтому «Возлюбил», «возлюбил,» и «ВОЗЛЮБИЛ»
+находят одно и то же. Оригинальный текст хранится рядом (UNINDEXED) и
+возвращается как есть.
+
+Синтаксис запроса:
+    бог любовь            — все слова (в любом порядке)
+    "так возлюбил"        — фраза целиком
+    любов* благодат*      — слова по префиксу (любовь, любовью, ...)
+
+Результаты ранжируются по bm25, при равенстве — в порядке книг.
+"""
+import os
+import re
+import sqlite3
+from typing import NamedTuple
+
+from bible_ref import format_ref
+from verse_store import VerseStore
+
+_FOLD_RE = re.compile(r'\W+')
+_WORD_RE = re.compile(r'(\w+)(\*?)')
+_QUERY_RE = re.compile(r'"([^"]*)"?|(\S+)')
+
+# Префиксные индексы FTS5 ускоряют короткие запросы «слово*» (3–4 буквы)
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE verses_fts USING fts5(
+        body, book UNINDEXED, chapter UNINDEXED, verse UNINDEXED, text UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 0', prefix = '3 4'
+    )
+"""
+
+SQL_SEARCH = """
+    SELECT book, chapter, verse, text, rank FROM verses_fts
+    WHERE verses_fts MATCH ?
+    ORDER BY rank, rowid
+    LIMIT ?
+"""
+
+
+def fold(text):
+    """Свёртка текста для индекса: регистр, ё/е, пунктуация"""
+    return _FOLD_RE.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+
+def build_match(query):
+    """
+    Переводит запрос пользователя в выражение FTS5 MATCH.
+    Каждое слово берётся в кавычки, так что операторы FTS5 в тексте
+    запроса не действуют. ValueError, если в запросе нет слов
+    """
+    terms = []
+    for phrase, word in _QUERY_RE.findall(query):
+        if phrase:
+            tokens = _tokens(phrase)
+            if tokens:
+                terms.append(' + '.join(tokens))
+        elif word:
+            terms.extend(_tokens(word))
+    if not terms:
+        raise ValueError("Пустой поисковый запрос")
+    return ' '.join(terms)
+
+
+def _tokens(text):
+    """Слова в кавычках FTS5; «*» на конце слова — поиск по префиксу"""
+    return [
+        f'"{word}"*' if star else f'"{word}"'
+        for word, star in _WORD_RE.findall(text.lower().replace('ё', 'е'))
+    ]
+
+
+class SearchHit(NamedTuple):
+    """Найденный стих"""
+    ref: str
+    book: int
+    chapter: int
+    verse: int
+    text: str
+    score: float
+
+
+class VerseSearch:
+    """Поиск по индексу-спутнику; соединения и потоки — как у VerseStore"""
+
+    def __init__(self, index_path, pool_size=2, max_workers=2):
+        self.index_path = index_path
+        self._store = VerseStore(index_path, pool_size=pool_size, max_workers=max_workers)
+
+    # -------------------------------------------------------------------------
+    # Построение индекса
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def build(db_path, index_path):
+        """Строит индекс из таблицы verses и атомарно заменяет файл-спутник"""
+        tmp_path = f"{index_path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        source = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+        target = sqlite3.connect(tmp_path)
+        try:
+            target.execute("PRAGMA journal_mode = OFF")
+            target.execute("PRAGMA synchronous = OFF")
+            target.execute(FTS_SCHEMA)
+            rows = source.execute(
+                "SELECT book, chapter, verse, text FROM verses WHERE verse > 0 ORDER BY book, chapter, verse"
+            )
+            with target:
+                target.executemany(
+                    "INSERT INTO verses_fts (body, book, chapter, verse, text) VALUES (?, ?, ?, ?, ?)",
+                    ((fold(text), book, chapter, verse, text) for book, chapter, verse, text in rows),
+                )
+                target.execute("INSERT INTO verses_fts (verses_fts) VALUES ('optimize')")
+            target.execute("VACUUM")
+        finally:
+            source.close()
+            target.close()
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def open_sidecar(cls, db_path, index_path, **kwargs):
+        """
+        Открывает индекс-спутник; если его нет или он старше базы —
+        сначала перестраивает из базы.
+        """
+        if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(db_path):
+            cls.build(db_path, index_path)
+        return cls(index_path, **kwargs)
+
+    def close(self):
+        self._store.close()
+
+    # -------------------------------------------------------------------------
+    # Поиск
+    # -------------------------------------------------------------------------
+
+    def search(self, query, limit=20):
+        """Список SearchHit, лучшие совпадения первыми; ValueError на пустой запрос"""
+        match = build_match(query)
+        with self._store.connection() as conn:
+            rows = conn.execute(SQL_SEARCH, (match, limit)).fetchall()
+        return [
+            SearchHit(format_ref(book, chapter, verse), book, chapter, verse, text, -rank)
+            for book, chapter, verse, text, rank in rows
+        ]
+
+    async def run(self, func, *args):
+        return await self._store.run(func, *args)
+
+    async def search_async(self, query, limit=20):
+        return await self.run(self.search, query, limit)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Полнотекстовый поиск по стихам")
+    parser.add_argument('--db', default='synodal.sqlite')
+    parser.add_argument('--index', help="файл индекса (по умолчанию <db>.fts)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('build', help="построить индекс заново")
+    query_parser = commands.add_parser('query', help="найти стихи")
+    query_parser.add_argument('query', nargs='+')
+    query_parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+    index_path = args.index or f"{args.db}.fts"
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        VerseSearch.build(args.db, index_path)
+        print(f"✅ Индекс поиска записан: {index_path} ({os.path.getsize(index_path) / 1024 / 1024:.1f} МБ, "
+              f"{time.perf_counter() - started:.2f} с)", flush=True)
+    else:
+        search = VerseSearch.open_sidecar(args.db, index_path)
+        started = time.perf_counter()
+        hits = search.search(' '.join(args.query), args.limit)
+        elapsed = time.perf_counter() - started
+        for hit in hits:
+            print(f"{hit.ref:<14} {hit.text}", flush=True)
+        print(f"🔎 Найдено: {len(hits)} за {elapsed * 1000:.1f} мс", flush=True)
+        search.close()
@@ -0,0 +1,235 @@
+"""
+Хранилище текстов Библии поверх SQLite.
+
+Вместо открытия нового соединения на каждую ссылку держим небольшой пул
+долгоживущих read-only соединений (mode=ro, immutable=1). Запросы — константные
+строки, поэтому sqlite3 переиспользует подготовленные выражения из кэша
+каждого соединения. Асинхронный фасад выполняет чтения в ограниченном пуле
+потоков, чтобы не блокировать event loop (а вместе с ним и /health).
+
+Ссылки недели кучкуются в нескольких главах, поэтому глава читается
+целиком одним запросом и держится в небольшом LRU (chapter_cache глав):
+повторные рендеры недели (другие переводы, макеты, команды бота) и
+prefetch() всего плана не ходят в базу за уже прочитанными главами.
+Счётчики queries / cache_hits / cache_misses отдаёт stats().
+"""
+import asyncio
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from urllib.parse import quote
+import sqlite3
+
+# Один запрос и для одиночного стиха, и для диапазона:
+# подготовленное выражение кэшируется соединением по тексту SQL.
+SQL_VERSE_RANGE = """
+    SELECT verse, text FROM verses
+    WHERE book = ? AND chapter = ? AND verse BETWEEN ? AND ?
+    ORDER BY verse
+"""
+
+# Глава целиком — для LRU глав
+SQL_CHAPTER = """
+    SELECT verse, text FROM verses
+    WHERE book = ? AND chapter = ?
+    ORDER BY verse
+"""
+
+
+class VerseStore:
+    """
+    Пул read-only соединений к базе стихов с пакетным и асинхронным API.
+
+    Ссылка здесь — кортеж (book_number, chapter, verse_start, verse_end),
+    тот же, что возвращает parse_bible_ref. Методы возвращают текст стиха
+    (диапазон склеивается через пробел) или None, если стихов нет.
+    """
+
+    def __init__(self, db_path, pool_size=4, max_workers=4, cached_statements=32, chapter_cache=64):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.cached_statements = cached_statements
+        self.chapter_cache = chapter_cache  # 0 — без LRU, запрос диапазона на главу
+        self._chapters = OrderedDict()       # (книга, глава) -> [(стих, текст)]
+        self._chapters_lock = threading.Lock()
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='verse-store')
+
+    # -------------------------------------------------------------------------
+    # Пул соединений
+    # -------------------------------------------------------------------------
+
+    def _connect(self):
+        uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro&immutable=1"
+        return sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+
+    @contextmanager
+    def connection(self):
+        """Берёт соединение из пула (создаёт лениво, не больше pool_size)"""
+        if self._closed:
+            raise RuntimeError("VerseStore закрыт")
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def warm(self):
+        """
+        Открывает все соединения пула и готовит в каждом запросы стиха и главы,
+        чтобы первые настоящие запросы не платили за открытие базы
+        """
+        with ExitStack() as stack:
+            for _ in range(self.pool_size):
+                conn = stack.enter_context(self.connection())
+                conn.execute(SQL_VERSE_RANGE, (1, 1, 1, 1)).fetchall()
+                conn.execute(SQL_CHAPTER, (0, 0)).fetchall()
+
+    def close(self):
+        """Закрывает пул потоков и все соединения"""
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    # -------------------------------------------------------------------------
+    # Синхронное API
+    # -------------------------------------------------------------------------
+
+    def fetch(self, book_number, chapter, verse_start, verse_end):
+        """Текст одного стиха или диапазона стихов внутри главы"""
+        if self.chapter_cache:
+            ref = (book_number, chapter, verse_start, verse_end)
+            return self.fetch_many([ref])[ref]
+        with self.connection() as conn:
+            self.queries += 1
+            rows = conn.execute(SQL_VERSE_RANGE, (book_number, chapter, verse_start, verse_end)).fetchall()
+        return ' '.join(text for _, text in rows) if rows else None
+
+    def fetch_many(self, refs):
+        """
+        Пакетное получение: не больше одного запроса на каждую пару (книга,
+        глава), главы из LRU — без запросов. Возвращает словарь {ref: текст или None}.
+        """
+        by_chapter = _group_by_chapter(refs)
+        result = {}
+        if self.chapter_cache:
+            chapters = self._load_chapters(by_chapter)
+        else:
+            chapters = {}
+            with self.connection() as conn:
+                for (book_number, chapter), chapter_refs in by_chapter.items():
+                    low = min(ref[2] for ref in chapter_refs)
+                    high = max(ref[3] for ref in chapter_refs)
+                    self.queries += 1
+                    chapters[(book_number, chapter)] = conn.execute(
+                        SQL_VERSE_RANGE, (book_number, chapter, low, high),
+                    ).fetchall()
+        for key, chapter_refs in by_chapter.items():
+            verses = chapters[key]
+            for ref in chapter_refs:
+                texts = [text for verse, text in verses if ref[2] <= verse <= ref[3]]
+                result[ref] = ' '.join(texts) if texts else None
+        return result
+
+    def prefetch(self, refs):
+        """
+        Загружает в LRU главы ссылок refs (например, всех недель плана)
+        одним проходом по главам. Возвращает число прочитанных из базы глав
+        """
+        if not self.chapter_cache:
+            return 0
+        misses = self.cache_misses
+        self._load_chapters(_group_by_chapter(refs))
+        return self.cache_misses - misses
+
+    def stats(self):
+        """Счётчики запросов к базе и обращений к LRU глав"""
+        return {
+            'queries': self.queries,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cached_chapters': len(self._chapters),
+        }
+
+    def _load_chapters(self, keys):
+        """{(книга, глава): [(стих, текст)]} из LRU, недостающие — запросом главы"""
+        chapters = {}
+        with self._chapters_lock:
+            for key in keys:
+                verses = self._chapters.get(key)
+                if verses is not None:
+                    self._chapters.move_to_end(key)
+                    chapters[key] = verses
+            self.cache_hits += len(chapters)
+        missing = [key for key in keys if key not in chapters]
+        if not missing:
+            return chapters
+        with self.connection() as conn:
+            for book_number, chapter in missing:
+                chapters[(book_number, chapter)] = conn.execute(SQL_CHAPTER, (book_number, chapter)).fetchall()
+        with self._chapters_lock:
+            self.queries += len(missing)
+            self.cache_misses += len(missing)
+            for key in missing:
+                self._chapters[key] = chapters[key]
+                self._chapters.move_to_end(key)
+            while len(self._chapters) > self.chapter_cache:
+                self._chapters.popitem(last=False)
+        return chapters
+
+    # -------------------------------------------------------------------------
+    # Асинхронный фасад
+    # -------------------------------------------------------------------------
+
+    async def run(self, func, *args):
+        """Выполняет func(*args) в пуле потоков хранилища"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def fetch_async(self, book_number, chapter, verse_start, verse_end):
+        return await self.run(self.fetch, book_number, chapter, verse_start, verse_end)
+
+    async def fetch_many_async(self, refs):
+        return await self.run(self.fetch_many, list(refs))
+
+
+def _group_by_chapter(refs):
+    """{(книга, глава): [ref, ...]} без повторов ссылок"""
+    by_chapter = {}
+    for ref in set(refs):
+        book_number, chapter, _, _ = ref
+        by_chapter.setdefault((book_number, chapter), []).append(ref)
+    return by_chapter
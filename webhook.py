@@ -0,0 +1,187 @@
+"""
+Интерактивный режим: команды пользователей через вебхук Telegram.
+
+Telegram присылает обновления POST-запросом на /telegram того же
+aiohttp-сервера, что и /health, — опрос getUpdates не нужен, и процесс не
+тратит CPU, пока никто не пишет. Обработчик вебхука только кладёт
+обновление в ограниченную очередь и сразу отвечает 200; ответы готовит и
+отправляет фиксированный пул воркеров, так что одновременно в работе не
+больше workers команд. Переполненная очередь отвечает 503 — Telegram
+повторит доставку позже.
+
+Команды:
+    /today, /tomorrow  — сообщение плана на сегодня / завтра
+    /week              — 7 сообщений текущей недели
+    /verse Ин 3:16     — текст стиха (/verse kjv John 3:16 — в переводе kjv)
+    /start, /help      — справка
+
+Сообщения недель и тексты стихов берутся из кэшей PlanAPI (общих с HTTP
+API), при промахе — из кэша рендера и источника текстов; таблица Google
+Sheets по командам не загружается.
+"""
+import asyncio
+import hmac
+import html
+import time
+from datetime import timedelta
+
+from aiohttp import web
+
+from api import APIError
+from metrics import REGISTRY
+
+# Заголовок с секретом, заданным в setWebhook(secret_token=...)
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+HELP_TEXT = (
+    "<b>Команды</b>\n"
+    "/today — чтение на сегодня\n"
+    "/tomorrow — чтение на завтра\n"
+    "/week — вся неделя\n"
+    "/verse Ин 3:16 — текст стиха"
+)
+
+
+class WebhookBot:
+    """
+    Приём обновлений и ответы на команды. Зависимости:
+        send(chat_id, text) -> None или текст ошибки (корутина)
+        plan_api            -> PlanAPI (кэшированные verses() и week())
+        today()             -> сегодняшняя дата по часовому поясу плана
+    """
+
+    def __init__(self, send, plan_api, today, secret='', workers=32, max_queue=10000, registry=REGISTRY):
+        self.send = send
+        self.plan_api = plan_api
+        self.today = today
+        self.secret = secret
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks = []
+        self._commands = {
+            '/start': self.command_help,
+            '/help': self.command_help,
+            '/today': self.command_today,
+            '/tomorrow': self.command_tomorrow,
+            '/week': self.command_week,
+            '/verse': self.command_verse,
+        }
+        self.updates = registry.counter('bot_updates_total', "Обновления Telegram через вебхук", ['result'])
+        self.replies = registry.histogram(
+            'bot_reply_seconds', "Ответ на команду: от получения обновления до отправки", ['command'],
+        )
+
+    def register(self, app, path='/telegram'):
+        app.router.add_post(path, self.handle_update)
+        app.on_startup.append(self._start_workers)
+        app.on_cleanup.append(self._stop_workers)
+
+    async def _start_workers(self, app):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _stop_workers(self, app):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # -------------------------------------------------------------------------
+    # Приём обновлений
+    # -------------------------------------------------------------------------
+
+    async def handle_update(self, request):
+        if self.secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret):
+            raise web.HTTPForbidden(text="Неверный секрет вебхука")
+        try:
+            update = await request.json()
+        except ValueError:
+            update = None
+        if not isinstance(update, dict):
+            raise web.HTTPBadRequest(text="Ожидается JSON-обновление Telegram")
+        try:
+            self.queue.put_nowait((update, time.monotonic()))
+        except asyncio.QueueFull:
+            self.updates.inc(labels=('dropped',))
+            raise web.HTTPServiceUnavailable(text="Очередь команд переполнена")
+        return web.Response(text='ok')
+
+    async def _worker(self):
+        while True:
+            update, received = await self.queue.get()
+            try:
+                await self.process(update, received)
+            except Exception as e:
+                self.updates.inc(labels=('error',))
+                update_id = update.get('update_id') if isinstance(update, dict) else None
+                print(f"❌ Ошибка обработки обновления {update_id}: {e}", flush=True)
+            finally:
+                self.queue.task_done()
+
+    async def process(self, update, received=None):
+        """Отвечает на команду из обновления; прочие обновления пропускаются"""
+        message = update.get('message') or {}
+        chat_id = (message.get('chat') or {}).get('id')
+        command, _, argument = (message.get('text') or '').strip().partition(' ')
+        # /today@имя_бота — так команды приходят в группах
+        command = command.split('@', 1)[0].lower()
+        handler = self._commands.get(command)
+        if chat_id is None or handler is None:
+            self.updates.inc(labels=('ignored',))
+            return
+
+        for reply in await handler(argument.strip()):
+            error = await self.send(chat_id, reply)
+            if error is not None:
+                self.updates.inc(labels=('failed',))
+                print(f"❌ Не удалось ответить на {command} (чат {chat_id}): {error}", flush=True)
+                return
+        self.updates.inc(labels=('handled',))
+        if received is not None:
+            self.replies.observe(time.monotonic() - received, labels=(command[1:],))
+
+    # -------------------------------------------------------------------------
+    # Команды: каждая возвращает список сообщений для ответа
+    # -------------------------------------------------------------------------
+
+    async def command_help(self, argument):
+        return [HELP_TEXT]
+
+    async def command_today(self, argument):
+        return await self._day(self.today())
+
+    async def command_tomorrow(self, argument):
+        return await self._day(self.today() + timedelta(days=1))
+
+    async def command_week(self, argument):
+        ok, result = await self._week(self.today())
+        return list(result[1]) if ok else [result]
+
+    async def command_verse(self, argument):
+        if not argument:
+            return ["Укажите ссылку, например: /verse Ин 3:16"]
+        translation = None
+        code, _, rest = argument.partition(' ')
+        if rest.strip() and code in {item.code for item in self.plan_api.list_translations()}:
+            translation, argument = code, rest.strip()
+        text = (await self.plan_api.verses([argument], translation))[argument]
+        if text is None:
+            return [f"Стих не найден: {html.escape(argument)}"]
+        # Длинный ответ делит на части движок рассылки (split_message)
+        return [f"<b>{html.escape(argument)}</b>\n{html.escape(text)}"]
+
+    async def _day(self, day):
+        ok, result = await self._week(day)
+        if not ok:
+            return [result]
+        start, messages = result
+        return [messages[(day - start).days]]
+
+    async def _week(self, day):
+        """(True, (начало недели, сообщения)) или (False, текст ответа-ошибки)"""
+        try:
+            week = await self.plan_api.week(day)
+        except APIError as e:
+            return False, f"⚠️ {e.message}"
+        if week is None:
+            return False, f"На {day.strftime('%d.%m.%Y')} в плане нет чтения"
+        return True, week